@@ -1,22 +1,29 @@
+import logging
 import pandas as pd
-import random as rnd
+from data_io import load_tfgs_presentados
+from mapping import build_profesor_departamento, extraer_correos
 
-def agrupar_tfgs_por_departamentos(path,filename):
+logger = logging.getLogger(__name__)
+
+def agrupar_tfgs_por_departamentos(libro, path, filename="TFGs_presentados_enviar.xlsx", ruta_exportar=None,
+                                   profesor_departamento=None):
     """
     Vamos a crear una base de datos de profesores agrupados por el departamento al que pertenecen
 
     Nos será útil para determinar de qué departamento es ciertos TFGs para asignarle así un tribunal más o menos afín
-    """
-
-    #path = "C:/Users/A/Desktop/TFG/src/data/"
-
-    # Escribimos dobles barras invertidas al final para que lo entiende python
-
-    #filename = "disponibilidad_TFG.xlsx"
-
-    file = path + filename
 
-    # file = "C:/Users/Jon/Nextcloud/TFG_Coordinación/Tribunales/disponibilidad_TFG.xlsx"
+    Args:
+        libro (LibroExcel): libro de disponibilidad ya cargado (ver data_io.load_disponibilidad)
+        path (str): ruta a la carpeta con los archivos
+        filename (str): nombre del archivo de TFGs presentados
+        ruta_exportar (str, optional): si se indica, se escribe también la agrupación
+            en este Excel (antes TFGs_por_dptos.xlsx) como artefacto de depuración
+        profesor_departamento (dict, optional): índice correo → departamento
+            (ver mapping.build_profesor_departamento); se construye si no se pasa
+
+    Returns:
+        dict: departamento → list[dict] con los TFGs (columnas 0-7 del Excel de TFGs)
+    """
 
     """ 
     Las claves de las columnas
@@ -29,38 +36,20 @@ def agrupar_tfgs_por_departamentos(path,filename):
     11 - 13 = tercer día
     """
 
-    df = pd.ExcelFile(file)
-    # Se imprimen los departamentos
-    print(df.sheet_names)
-
-    profesores = dict()
-    # Se recorren todas las hojas (todos los departamentos) excepto la última
-    for sheetname in df.sheet_names[:-1]:
-        # Se lee la hoja en cuestión
-        # Tiene tres filas de encabezado antes de empezar con los datos: Nombre, correo y número de veces que ha participado
-        pf = pd.read_excel(file, header=[0,1,2], sheet_name=sheetname)
-        # keys = pf.keys()
-        dpto = list()
-        # pf.shape devuelve una tupla con el número de filas y columnas, pf.shape[0], número de filas
-        for i in range(pf.shape[0]):
-            # Se incluyen todos los profesores (segunda columna) de un departamento
-            # pf.keys()[1] = Correo @fi.upm.es
-            # pf.keys()[1][i] Intentaría acceder al iésimo carácter del nombre de la columna
-            dpto.append(pf[pf.keys()[1]][i])
-        # Se incluye la lista de profesores por departamento
-        profesores.update({sheetname: dpto})
-
-    # Se crea una lista de los departamentos
-    dptos = profesores.keys()
+    # Se muestran los departamentos
+    logger.debug("Hojas de disponibilidad: %s", libro.sheet_names)
+
+    # Índice correo → departamento (una entrada por profesor, búsqueda O(1))
+    if profesor_departamento is None:
+        profesor_departamento, _ = build_profesor_departamento(libro)
+
+    # Se crea una lista de los departamentos (todas las hojas excepto la última)
+    dptos = libro.sheet_names[:-1]
 
     """
     Cargamos nuevo fichero donde están los TFGs que se han presentado en este semestre
     """
 
-    filename = "TFGs_presentados_enviar.xlsx"
-
-    file = path + filename
-
     """
     Claves de las columnas:
         0 = Entrega (ID)
@@ -73,16 +62,11 @@ def agrupar_tfgs_por_departamentos(path,filename):
         7 = Grado
     """
 
-    st = pd.read_excel(file, header=0)
+    st = load_tfgs_presentados(path, filename)
 
     # Cargamos todos los TFGs que tienen que defender este semestre
 
-    defensas = list()
-    for i in range(st.shape[0]):
-        tfg = dict()
-        for key in st.keys()[:8]:
-            tfg.update({key: st[key][i]})
-        defensas.append(tfg)
+    defensas = st.iloc[:, :8].to_dict('records')
 
     # Agrupamos por los departamentos los TFGs
 
@@ -90,18 +74,19 @@ def agrupar_tfgs_por_departamentos(path,filename):
     for dpto in dptos:
         defensas_gather.update( {dpto: list()} ) # Crea una lista por cada departamento para agrupar los tfgs
 
+    columna_tutores = st.keys()[6]
     for tfg in defensas:
-        found = False
-        #print("\n\tTutor de la propuesta: ", tfg[st.keys()[6]])
-        for dpto in dptos:
-            for prof in profesores[dpto]:   # Se recorren todos los profesores por cada departamento
-                if prof in tfg[st.keys()[6]]:   # Se ve si el profesor es tutor de un trabajo
-                    found = True
-                    #print("\t\tTrabajo tutorizado por el profesor ", prof, " del departamento ", dpto)
-                    defensas_gather[dpto].append(tfg)
-                    break
-            if found: 
+        # Se extraen una sola vez los correos de tutor (y cotutor) y se resuelve
+        # el departamento del primero que aparezca en el índice
+        dpto = None
+        for correo in extraer_correos(tfg[columna_tutores]):
+            dpto = profesor_departamento.get(correo)
+            if dpto is not None:
                 break
+        if dpto is None:
+            dpto = _buscar_por_subcadena(tfg[columna_tutores], profesor_departamento)
+        if dpto is not None:
+            defensas_gather[dpto].append(tfg)
 
     #print("\n\n\n")
 
@@ -111,10 +96,42 @@ def agrupar_tfgs_por_departamentos(path,filename):
         #print(" El departamento ", key," ha dirigido ", len(defensas_gather[key]), " trabajos.")
 
 
-    filename = "TFGs_por_dptos.xlsx"
+    # Opcionalmente se vuelca la agrupación a Excel (solo como artefacto de depuración)
+    if ruta_exportar:
+        exportar_tfgs_por_dptos(defensas_gather, ruta_exportar)
 
-    file = path + filename
+    return defensas_gather
 
+
+def _buscar_por_subcadena(campo, profesor_departamento):
+    """
+    Búsqueda original (correo contenido en el campo de tutores) para los TFGs
+    cuyo campo no se ha podido separar en correos conocidos, con el mismo orden
+    que antes (hojas y filas de la disponibilidad).
+
+    Returns:
+        str or None: departamento del primer profesor encontrado
+    """
+    if not isinstance(campo, str):
+        return None
+    for correo, dpto in profesor_departamento.items():
+        if correo in campo:
+            logger.debug("Tutor %s encontrado por subcadena en %r", correo, campo)
+            return dpto
+    return None
+
+
+def exportar_tfgs_por_dptos(defensas_gather, file):
+    """
+    Escribe los TFGs agrupados en un Excel con una hoja por departamento.
+
+    El pipeline ya no necesita este fichero (los registros se pasan en memoria
+    a asignacion.cargar_estudiantes); se conserva para depuración/consulta.
+
+    Args:
+        defensas_gather (dict): departamento → list[dict] con los TFGs del departamento
+        file (str): ruta del archivo Excel a generar
+    """
     # writer = pd.ExcelWriter(file, engine = 'openpyxl')
     writer = pd.ExcelWriter(file, engine = 'xlsxwriter')
 
@@ -123,4 +140,4 @@ def agrupar_tfgs_por_departamentos(path,filename):
         df = pd.DataFrame(defensas_gather[dpto])
         df.to_excel(writer, sheet_name=dpto)
 
-    writer.close()
\ No newline at end of file
+    writer.close()
@@ -1,32 +1,114 @@
 """
 API FastAPI para procesar tribunales desde la web.
-Recibe Excel de entrada, ejecuta el pipeline y devuelve ZIP con CSV resultados.
+Recibe Excel de entrada, encola el pipeline como trabajo asíncrono y sirve
+el ZIP con CSV resultados cuando termina.
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, RedirectResponse
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import tempfile
 import shutil
 import os
-from pathlib import Path
-import zipfile
+import hashlib
 import json
-import io
+from pathlib import Path
+from typing import Optional
 
-# Importar funciones del pipeline
-from main import run_pipeline
+# Cola de trabajos que ejecuta el pipeline y caché de resultados
+from cache import CacheResultados, clave_resultado, zip_privado
+from trabajos import GestorTrabajos, COMPLETADO, ERROR
+from configuracion import ConfiguracionPipeline
+from data_io import columnas_disponibilidad, comprobar_franjas
+from main import configurar_logging
 
 # ============================================================================
 # CONFIGURACIÓN
 # ============================================================================
+# Nivel de logging del pipeline: TRIBUNALES_LOG=DEBUG|INFO|WARNING (INFO por defecto)
+configurar_logging()
+
+# Tamaño máximo de cada Excel subido (MB) y tamaño de los bloques de copia
+MAX_SUBIDA_MB = int(os.environ.get("MAX_SUBIDA_MB", "20"))
+MAX_SUBIDA_BYTES = MAX_SUBIDA_MB * 1024 * 1024
+TAM_BLOQUE_SUBIDA = 1024 * 1024
+
+# Rutas con subida de ficheros → número de ficheros (el cuerpo admite uno de
+# MAX_SUBIDA_BYTES por fichero más un bloque para los campos del formulario)
+FICHEROS_POR_RUTA = {"/procesar": 2, "/reparar": 3}
+
+
+class LimiteSubidaMiddleware:
+    """
+    Rechaza con 413 las subidas demasiado grandes antes de que Starlette
+    parsee el formulario multipart (que guardaría los ficheros completos en
+    temporales): si Content-Length ya declara más de lo admitido no se lee el
+    cuerpo, y si no lo declara (chunked) se corta al superar el límite.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        num_ficheros = FICHEROS_POR_RUTA.get(scope.get("path")) if scope["type"] == "http" else None
+        if num_ficheros is None or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        limite = num_ficheros * MAX_SUBIDA_BYTES + TAM_BLOQUE_SUBIDA
+        demasiado_grande = HTTPException(
+            status_code=413,
+            detail=f"La petición supera el tamaño máximo de {MAX_SUBIDA_MB} MB por archivo"
+        )
+        longitud = dict(scope["headers"]).get(b"content-length", b"")
+        if longitud.isdigit() and int(longitud) > limite:
+            await _responder_error(demasiado_grande, scope, receive, send)
+            return
+
+        recibidos = 0
+        respuesta_iniciada = False
+
+        async def recibir():
+            nonlocal recibidos
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > limite:
+                    # FastAPI la propaga tal cual desde el parseo del formulario
+                    raise demasiado_grande
+            return mensaje
+
+        async def enviar(mensaje):
+            nonlocal respuesta_iniciada
+            respuesta_iniciada = True
+            await send(mensaje)
+
+        try:
+            await self.app(scope, recibir, enviar)
+        except HTTPException as e:
+            if e is not demasiado_grande or respuesta_iniciada:
+                raise
+            await _responder_error(e, scope, receive, send)
+
+
+async def _responder_error(error, scope, receive, send):
+    """Envía un HTTPException como respuesta JSON ({"detail": ...})."""
+    respuesta = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+    await respuesta(scope, receive, send)
+
+
 app = FastAPI(
     title="API Tribunales TFG",
     description="Asignación automática de tribunales para TFGs",
     version="1.0.0"
 )
 
+# Límite de subida antes del parseo; CORS se añade después para quedar por fuera
+# (también las respuestas 413 del límite llevan sus cabeceras)
+app.add_middleware(LimiteSubidaMiddleware)
+
 # Configurar CORS para permitir requests desde localhost:5173 (Vite)
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +118,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Caché de ZIP de resultados (tamaño máximo en MB), procesos del pool y
+# segundos que se recuerda el estado de un trabajo terminado
+RESULTADOS_DIR = os.environ.get(
+    "RESULTADOS_DIR",
+    os.path.join(tempfile.gettempdir(), f"tribunales_resultados_{os.getuid()}" if hasattr(os, "getuid")
+                 else "tribunales_resultados")
+)
+CACHE_MAX_MB = int(os.environ.get("CACHE_MAX_MB", "500"))
+API_WORKERS = int(os.environ.get("API_WORKERS", "2"))
+TRABAJOS_TTL_S = float(os.environ.get("TRABAJOS_TTL_S", "3600"))
+
+gestor = GestorTrabajos(
+    CacheResultados(RESULTADOS_DIR, max_bytes=CACHE_MAX_MB * 1024 * 1024),
+    max_workers=API_WORKERS,
+    ttl_trabajos=TRABAJOS_TTL_S
+)
+
+# Un .xlsx es un ZIP: empieza por la cabecera local "PK\x03\x04"
+FIRMA_XLSX = b"PK\x03\x04"
+
+# Nombres de las subidas dentro del directorio de entrada de un trabajo
+FICHERO_DISPONIBILIDAD = "disponibilidad_TFG.xlsx"
+FICHERO_TFGS = "TFGs_presentados_enviar.xlsx"
+ASIGNACION_PREVIA = "asignacion_previa.zip"
+
+
+def _escribir_bloque(f, h, bloque):
+    """Escribe un bloque de una subida y lo añade a su hash (bloqueante)."""
+    h.update(bloque)
+    f.write(bloque)
+
+
+async def _guardar_subida(subida, destino):
+    """
+    Copia un fichero subido a disco por bloques, validando la firma ZIP (la de
+    un .xlsx o un ZIP de resultados) y el tamaño máximo sobre la marcha, y
+    calcula su hash mientras se copia. La escritura y el hash de cada bloque
+    se hacen en el pool de hilos para no bloquear el bucle de eventos (el resto
+    de peticiones, como las consultas a /jobs, siguen atendiéndose).
+
+    Args:
+        subida (UploadFile): fichero recibido
+        destino (Path): ruta donde guardarlo
+
+    Returns:
+        str: hash SHA-256 (hex) del contenido
+
+    Raises:
+        HTTPException: 415 si no es un xlsx/ZIP, 413 si supera MAX_SUBIDA_MB
+    """
+    h = hashlib.sha256()
+    total = 0
+    f = await run_in_threadpool(open, destino, "wb")
+    try:
+        while True:
+            bloque = await subida.read(TAM_BLOQUE_SUBIDA)
+            if not bloque:
+                break
+            if total == 0 and not bloque.startswith(FIRMA_XLSX):
+                raise HTTPException(
+                    status_code=415,
+                    detail=f"{subida.filename} no es un archivo Excel (.xlsx) ni un ZIP de resultados"
+                )
+            total += len(bloque)
+            if total > MAX_SUBIDA_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{subida.filename} supera el tamaño máximo de {MAX_SUBIDA_MB} MB"
+                )
+            await run_in_threadpool(_escribir_bloque, f, h, bloque)
+    finally:
+        await run_in_threadpool(f.close)
+    if total == 0:
+        raise HTTPException(status_code=415, detail=f"{subida.filename} está vacío")
+    return h.hexdigest()
+
 
 # ============================================================================
 # ENDPOINTS
@@ -47,95 +205,208 @@ async def health_check():
     return {"status": "ok", "mensaje": "API de tribunales activa"}
 
 
-@app.post("/procesar")
+def _leer_configuracion(configuracion):
+    """Convierte el campo JSON `configuracion` en ConfiguracionPipeline (422 si no es válido)."""
+    try:
+        return ConfiguracionPipeline.desde_dict(json.loads(configuracion) if configuracion else {})
+    except ValueError as e:   # incluye json.JSONDecodeError
+        raise HTTPException(status_code=422, detail=f"Configuración no válida: {e}")
+
+
+async def _comprobar_franjas(ruta_disponibilidad, config):
+    """
+    Comprueba que las franjas de la configuración existen en todas las hojas del
+    Excel de disponibilidad (422 si no). Solo se lee el encabezado; si el libro
+    no se puede leer se deja pasar y el trabajo terminará con el error de lectura.
+    """
+    try:
+        columnas = await run_in_threadpool(columnas_disponibilidad, str(ruta_disponibilidad))
+    except Exception:
+        return
+    try:
+        for hoja, num_columnas in columnas.items():
+            comprobar_franjas(num_columnas, config.init_franja, config.num_franjas, hoja)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Configuración no válida: {e}")
+
+
+async def _encolar(subidas, seed, perfilar, config, reparar=False):
+    """
+    Guarda las subidas en un directorio de entrada nuevo y encola el trabajo.
+
+    El tamaño total de la petición ya lo ha limitado LimiteSubidaMiddleware
+    antes del parseo; aquí se comprueba cada fichero (firma y MAX_SUBIDA_MB).
+
+    Args:
+        subidas (list): pares (UploadFile, nombre de fichero en el directorio de entrada)
+        seed (int): semilla
+        perfilar (bool): medir memoria y funciones
+        config (ConfiguracionPipeline): parámetros del pipeline
+        reparar (bool): reparar la asignación subida como ASIGNACION_PREVIA en lugar
+                        de ejecutar el pipeline completo
+
+    Returns:
+        dict: job_id, estado y URLs para consultar el estado y descargar el resultado
+    """
+    temp_input_dir = gestor.nuevo_directorio_entrada()
+    
+    try:
+        # 1. Guardar archivos subidos por bloques (con validación y hash)
+        huellas = []
+        for subida, nombre in subidas:
+            huellas.append(await _guardar_subida(subida, Path(temp_input_dir) / nombre))
+        await _comprobar_franjas(Path(temp_input_dir) / FICHERO_DISPONIBILIDAD, config)
+        
+        # 2. Encolar el trabajo (el directorio de entrada lo borra el gestor)
+        parametros = {"seed": seed, "perfilar": perfilar, "configuracion": config.a_dict()}
+        asignacion_previa = None
+        if reparar:
+            parametros["reparacion"] = True
+            asignacion_previa = os.path.join(temp_input_dir, ASIGNACION_PREVIA)
+        clave = clave_resultado(huellas, parametros)
+        job_id = gestor.enviar(temp_input_dir, seed, clave, perfilar, config, asignacion_previa)
+    
+    except HTTPException:
+        shutil.rmtree(temp_input_dir, ignore_errors=True)
+        raise
+
+    except Exception as e:
+        shutil.rmtree(temp_input_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Error encolando: {str(e)}")
+    
+    finally:
+        # Cerrar explícitamente los uploads (ignorar bloqueos en Windows)
+        for subida, _ in subidas:
+            try:
+                await subida.close()
+            except Exception:
+                pass
+
+    info = gestor.estado(job_id)
+    return {
+        "job_id": job_id,
+        "estado": info["estado"],
+        "url_estado": f"/jobs/{job_id}",
+        "url_resultado": f"/jobs/{job_id}/resultado",
+    }
+
+
+@app.post("/procesar", status_code=202)
 async def procesar_tribunales(
     disponibilidad: UploadFile = File(...),
     tfgs: UploadFile = File(...),
-    seed: int = 42
+    seed: int = 42,
+    perfilar: bool = False,
+    configuracion: Optional[str] = Form(None)
 ):
     """
-    Procesa los archivos Excel de disponibilidad y TFGs.
-    Devuelve ZIP con CSVs generados.
+    Encola el procesamiento de los archivos Excel de disponibilidad y TFGs.
+    Responde en cuanto los ficheros están guardados; el pipeline se ejecuta
+    en el pool de procesos de `gestor`. Si ya se procesaron los mismos
+    ficheros con los mismos parámetros, el trabajo sale completado de la caché.
     
     Parameters:
         - disponibilidad: Excel con disponibilidad de profesores
         - tfgs: Excel con TFGs presentados
         - seed: Semilla para reproducibilidad (default: 42)
+        - perfilar: incluir memoria por etapa y cProfile en estadisticas.json
+        - configuracion: campo de formulario con un objeto JSON de parámetros de
+          ConfiguracionPipeline, p. ej. {"max_alumnos": 5, "modo": "exacto"};
+          los que falten toman su valor por defecto (422 si no es válida)
     
     Returns:
-        - ZIP file con CSVs + estadísticas.json
+        - job_id y URLs para consultar el estado y descargar el resultado
     """
-    temp_input_dir = None
-    temp_output_dir = None
-    
-    try:
-        # 1. Crear directorios temporales
-        temp_input_dir = tempfile.mkdtemp()
-        temp_output_dir = tempfile.mkdtemp()
-        
-        # 2. Guardar archivos subidos
-        disponibilidad_path = Path(temp_input_dir) / "disponibilidad_TFG.xlsx"
-        tfgs_path = Path(temp_input_dir) / "TFGs_presentados_enviar.xlsx"
-        
-        with open(disponibilidad_path, "wb") as f:
-            f.write(await disponibilidad.read())
-        
-        with open(tfgs_path, "wb") as f:
-            f.write(await tfgs.read())
-        
-        # 3. Ejecutar pipeline
-        stats = run_pipeline(str(temp_input_dir) + "/", str(temp_output_dir) + "/", seed=seed)
-        
-        # 4. Crear ZIP en memoria
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-            # Agregar CSVs
-            for csv_file in Path(temp_output_dir).glob("asignaciones_*.csv"):
-                with open(csv_file, "rb") as f:
-                    zipf.writestr(csv_file.name, f.read())
-            # Agregar estadísticas
-            stats_json = json.dumps(stats, indent=2, ensure_ascii=False)
-            zipf.writestr("estadisticas.json", stats_json)
-        
-        zip_buffer.seek(0)
-        
-        return StreamingResponse(
-            iter([zip_buffer.getvalue()]),
-            media_type="application/zip",
-            headers={"Content-Disposition": "attachment; filename=resultados_tribunales.zip"}
-        )
+    config = _leer_configuracion(configuracion)
+    return await _encolar(
+        [(disponibilidad, FICHERO_DISPONIBILIDAD), (tfgs, FICHERO_TFGS)],
+        seed, perfilar, config
+    )
+
+
+@app.post("/reparar", status_code=202)
+async def reparar_tribunales(
+    previo: UploadFile = File(...),
+    disponibilidad: UploadFile = File(...),
+    tfgs: UploadFile = File(...),
+    perfilar: bool = False,
+    configuracion: Optional[str] = Form(None)
+):
+    """
+    Encola la reparación incremental de una asignación ya publicada: a partir
+    del ZIP de resultados anterior y de los Excel actualizados solo se tocan
+    los tribunales afectados por los cambios (ver reparacion.py). El resultado
+    se consulta y descarga igual que el de /procesar.
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error procesando: {str(e)}")
+    Parameters:
+        - previo: ZIP de resultados devuelto por /jobs/{job_id}/resultado
+        - disponibilidad: Excel actualizado con disponibilidad de profesores
+        - tfgs: Excel actualizado con TFGs presentados
+        - perfilar: incluir memoria por etapa y cProfile en estadisticas.json
+        - configuracion: como en /procesar (miembros y plazas por tribunal, franjas)
     
-    finally:
-        # Cerrar explícitamente los uploads y limpiar temporales (ignorar bloqueos en Windows)
-        try:
-            await disponibilidad.close()
-        except Exception:
-            pass
-        try:
-            await tfgs.close()
-        except Exception:
-            pass
+    Returns:
+        - job_id y URLs para consultar el estado y descargar el resultado
+    """
+    config = _leer_configuracion(configuracion)
+    return await _encolar(
+        [(previo, ASIGNACION_PREVIA), (disponibilidad, FICHERO_DISPONIBILIDAD), (tfgs, FICHERO_TFGS)],
+        None, perfilar, config, reparar=True
+    )
 
-        if temp_input_dir and os.path.exists(temp_input_dir):
-            shutil.rmtree(temp_input_dir, ignore_errors=True)
-        if temp_output_dir and os.path.exists(temp_output_dir):
-            shutil.rmtree(temp_output_dir, ignore_errors=True)
+
+@app.get("/jobs/{job_id}")
+async def estado_trabajo(job_id: str):
+    """
+    Estado de un trabajo: pendiente, en_proceso, completado o error.
+    Cuando está completado incluye las estadísticas del pipeline.
+    """
+    info = gestor.estado(job_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return info
+
+
+@app.get("/jobs/{job_id}/resultado")
+async def resultado_trabajo(job_id: str):
+    """
+    Descarga el ZIP (CSVs + estadisticas.json) de un trabajo completado.
+    """
+    info = gestor.estado(job_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    if info["estado"] == ERROR:
+        raise HTTPException(status_code=500, detail=f"Error procesando: {info['error']}")
+    if info["estado"] != COMPLETADO:
+        raise HTTPException(status_code=409, detail=f"Trabajo {info['estado']}")
+
+    ruta_zip = gestor.ruta_resultado(job_id)
+    if not zip_privado(ruta_zip):
+        raise HTTPException(status_code=410, detail="Resultado expulsado de la caché, vuelve a procesar")
+
+    return FileResponse(
+        ruta_zip,
+        media_type="application/zip",
+        filename="resultados_tribunales.zip"
+    )
 
 
 @app.get("/descargar")
 async def descargar_resultados():
     """
-    Endpoint para descargar el ZIP con resultados.
-    (En producción, guardarías el ZIP en servidor y lo servirías aquí)
+    Endpoint antiguo de descarga: los resultados se sirven ahora por trabajo.
     """
     return JSONResponse(
-        {"mensaje": "Usar el ZIP devuelto en /procesar"}
+        {"mensaje": "Usar /jobs/{job_id}/resultado con el job_id devuelto por /procesar"}
     )
 
 
+@app.on_event("shutdown")
+def cerrar_gestor():
+    """Detiene el pool de procesos al parar la API."""
+    gestor.cerrar()
+
+
 # ============================================================================
 # FRONTEND SERVING (SPA Support)
 # ============================================================================
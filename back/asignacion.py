@@ -1,40 +1,51 @@
-import pandas as pd
+from collections import deque
+from internado import matriz_compatibilidad
 from mapping import extraer_correos
 
-def cargar_estudiantes(file_tfgs):
+def cargar_estudiantes(tfgs_por_dpto):
     """
-    Carga estudiantes de todas las hojas del Excel de TFGs.
+    Carga estudiantes a partir de los TFGs agrupados por departamento.
     
     Args:
-        file_tfgs (pd.ExcelFile): objeto ExcelFile con TFGs por departamento
+        tfgs_por_dpto (dict): departamento → list[dict] con los TFGs del departamento
+                              (salida de agrupacion.agrupar_tfgs_por_departamentos)
     
     Returns:
         dict: diccionario alumno_id → {nombre, tutores, departamento}
     """
     estudiantes = {}
-    for hoja in file_tfgs.sheet_names:
-        df = pd.read_excel(file_tfgs, sheet_name=hoja, header=0)
-        for i in range(df.shape[0]):
-            correos = extraer_correos(df.iloc[i, 7])
-            trabajo_id = df.iloc[i, 2]  # columna 2 = alumno (nombre y apellidos)
+    for hoja, tfgs in tfgs_por_dpto.items():
+        for tfg in tfgs:
+            valores = list(tfg.values())
+            correos = extraer_correos(valores[6])  # columna 6 = Tutor-es
+            trabajo_id = valores[1]  # columna 1 = Trabajo (ID)
             estudiantes[trabajo_id] = {
-                'nombre': df.iloc[i, 3],
+                'nombre': valores[2],  # columna 2 = alumno (nombre y apellidos)
                 'tutores': correos,
                 'departamento': hoja,
-                'grado': df.iloc[i, -1],  # última columna: grado del estudiante
+                'grado': valores[-1],  # última columna: grado del estudiante
             }
     return estudiantes
 
 
-def asignar_alumnos_a_tribunales(tribunales, estudiantes, dept_tribunal):
+def asignar_alumnos_a_tribunales(tribunales, estudiantes, dept_tribunal, max_alumnos=6):
     """
     Asigna alumnos de un departamento a los tribunales.
+
+    Primero se hace un reparto first-fit (tribunal a tribunal, alumnos en orden)
+    y después, para cada alumno sin tribunal, se busca un camino de aumento
+    (emparejamiento bipartito con capacidades): se van recolocando alumnos ya
+    asignados en otros tribunales compatibles hasta liberar una plaza. Así se
+    garantiza el máximo número de alumnos colocados respetando que el tutor no
+    esté en el tribunal. La compatibilidad alumno × tribunal se calcula una
+    sola vez para todos los pares (internado.matriz_compatibilidad).
     
     Args:
         tribunales (dict): diccionario turno → list[set de profesores]
                           Ejemplo: {"9:00": [{p1,p2,p3}, {p4,p5,p6}]}
-        estudiantes (dict): diccionario alumno_id → datos
-        dept_tribunal (str): nombre del departamento
+        estudiantes (dict): diccionario alumno_id → Alumno (ver internado)
+        dept_tribunal (int): id del departamento
+        max_alumnos (int): plazas por tribunal
     
     Returns:
         dict: diccionario turno → list[{'profesores': set, 'alumnos': dict}]
@@ -43,38 +54,85 @@ def asignar_alumnos_a_tribunales(tribunales, estudiantes, dept_tribunal):
                   {'profesores': {p4,p5,p6}, 'alumnos': {alumno7: datos, ...}}
               ]}
     """
-    asignacion = {t: [] for t in tribunales}
-    disponibles = {k: v for k, v in estudiantes.items() if v['departamento'] == dept_tribunal}
-    
-    for turno, lista_tribunales in tribunales.items():
-        asignaciones_turno = []
-        
-        for tribunal_prof in lista_tribunales:
-            profes = list(tribunal_prof)
-            
-            if not profes:
-                asignaciones_turno.append({
-                    'profesores': set(),
-                    'alumnos': {}
-                })
+    disponibles = {k: v for k, v in estudiantes.items() if v.departamento == dept_tribunal}
+
+    # Tribunales en orden (turno, posición) y aristas alumno → tribunales compatibles
+    plazas = [(turno, tribunal_prof) for turno, lista_tribunales in tribunales.items()
+              for tribunal_prof in lista_tribunales]
+    compatibilidad = matriz_compatibilidad(list(disponibles.values()),
+                                           [profes for _, profes in plazas])
+    fila = dict(zip(disponibles, range(len(disponibles))))
+    compatibles = {
+        trabajo: compatibilidad[fila[trabajo]].nonzero()[0].tolist()
+        for trabajo in disponibles
+    }
+    ocupantes = [[] for _ in plazas]
+
+    # 1. Reparto first-fit: cada tribunal toma alumnos compatibles en orden
+    pendientes = dict.fromkeys(disponibles)
+    for k, (_, profes) in enumerate(plazas):
+        if not profes:
+            continue
+        admitidos = compatibilidad[:, k]
+        for trabajo in list(pendientes):
+            if len(ocupantes[k]) == max_alumnos:
+                break
+            # No asignar si el tutor está en el tribunal
+            if not admitidos[fila[trabajo]]:
                 continue
-            
-            asignados = {}
-            for trabajo, datos in list(disponibles.items()):
-                if len(asignados) == 6:
-                    break
-                # No asignar si el tutor está en el tribunal
-                if any(t in profes for t in datos['tutores']):
-                    continue
-                # Asignar
-                asignados[trabajo] = datos
-                del disponibles[trabajo]
-            
-            asignaciones_turno.append({
-                'profesores': tribunal_prof,  # Mantener el set original
-                'alumnos': asignados
-            })
-        
-        asignacion[turno] = asignaciones_turno
+            ocupantes[k].append(trabajo)
+            del pendientes[trabajo]
+
+    # 2. Caminos de aumento para los alumnos que han quedado fuera
+    for trabajo in pendientes:
+        buscar_camino_aumento(trabajo, compatibles, ocupantes, max_alumnos)
+
+    asignacion = {t: [] for t in tribunales}
+    for (turno, tribunal_prof), alumnos in zip(plazas, ocupantes):
+        asignacion[turno].append({
+            'profesores': tribunal_prof if tribunal_prof else set(),  # Mantener el set original
+            'alumnos': {trabajo: disponibles[trabajo] for trabajo in alumnos}
+        })
     
-    return asignacion
\ No newline at end of file
+    return asignacion
+
+
+def buscar_camino_aumento(alumno, compatibles, ocupantes, max_alumnos):
+    """
+    Busca (BFS) un camino de aumento que coloque a `alumno` en algún tribunal.
+
+    Cada paso del camino mueve a un alumno ya asignado a otro tribunal compatible,
+    hasta llegar a un tribunal con plaza libre.
+
+    Args:
+        alumno: identificador del alumno sin tribunal
+        compatibles (dict): alumno → list[índice de tribunal compatible]
+        ocupantes (list): índice de tribunal → list[alumno] (se modifica)
+        max_alumnos (int): plazas por tribunal
+
+    Returns:
+        bool: True si el alumno ha quedado colocado
+    """
+    # padre[k] = (alumno que entra en k, tribunal del que sale o None)
+    padre = {}
+    cola = deque()
+    for k in compatibles[alumno]:
+        padre[k] = (alumno, None)
+        cola.append(k)
+    while cola:
+        k = cola.popleft()
+        if len(ocupantes[k]) < max_alumnos:
+            # Aplicar el camino desde el final hasta el alumno original
+            while k is not None:
+                movido, previo = padre[k]
+                ocupantes[k].append(movido)
+                if previo is not None:
+                    ocupantes[previo].remove(movido)
+                k = previo
+            return True
+        for otro in ocupantes[k]:
+            for k2 in compatibles[otro]:
+                if k2 not in padre:
+                    padre[k2] = (otro, k)
+                    cola.append(k2)
+    return False
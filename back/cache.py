@@ -0,0 +1,143 @@
+"""
+Caché en disco de resultados de la API, direccionada por contenido: la clave
+es el hash de los Excel subidos más la semilla y los parámetros del pipeline,
+así que una petición repetida se sirve leyendo el ZIP ya generado.
+
+Como las claves salen de entradas públicas, otro usuario de la máquina podría
+dejar un ZIP con la clave de una petición conocida: el directorio debe ser
+privado (0700, del usuario actual; ver data_io.directorio_privado) y solo se
+sirven ZIP que sean ficheros normales del usuario actual y que nadie más
+pueda escribir.
+"""
+
+import hashlib
+import json
+import os
+import stat
+import threading
+from collections import OrderedDict
+
+from data_io import directorio_privado, es_privado
+
+
+def zip_privado(ruta):
+    """True si `ruta` es un fichero normal (no un enlace) privado del usuario actual."""
+    try:
+        info = os.lstat(ruta)
+    except OSError:
+        return False
+    return stat.S_ISREG(info.st_mode) and es_privado(info)
+
+
+def clave_resultado(huellas, parametros):
+    """
+    Calcula la clave de caché de una ejecución.
+
+    Args:
+        huellas (list[str]): hash SHA-256 (hex) de cada fichero de entrada, en orden
+                             fijo; la API los calcula mientras recibe las subidas
+        parametros (dict): semilla y parámetros del pipeline (serializables a JSON)
+
+    Returns:
+        str: hash SHA-256 en hexadecimal
+    """
+    h = hashlib.sha256()
+    for huella in huellas:
+        h.update(huella.encode("ascii"))
+    h.update(json.dumps(parametros, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheResultados:
+    """
+    Caché LRU de ZIP de resultados en un directorio, con expulsión por tamaño
+    total. El orden de uso se reconstruye al arrancar a partir del mtime de
+    los ficheros y se actualiza (os.utime) en cada acierto.
+    """
+
+    def __init__(self, directorio, max_bytes=500 * 1024 * 1024):
+        """
+        Args:
+            directorio (str): carpeta donde se guardan los ZIP (se crea con permisos 0700)
+            max_bytes (int): tamaño máximo total de la caché en bytes
+
+        Raises:
+            PermissionError: si el directorio no es privado del usuario actual
+        """
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        if not directorio_privado(directorio):
+            raise PermissionError(
+                f"{directorio} no es un directorio privado del usuario actual (debe ser suyo y "
+                f"solo él puede escribir en él); la caché de resultados no puede usarlo"
+            )
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()   # clave → tamaño, de menos a más reciente
+        self._total = 0
+
+        existentes = []
+        for nombre in os.listdir(directorio):
+            if not nombre.endswith(".zip"):
+                continue
+            ruta = os.path.join(directorio, nombre)
+            if not zip_privado(ruta):
+                # Ficheros de otros usuarios o enlaces: no se adoptan
+                continue
+            info = os.lstat(ruta)
+            existentes.append((info.st_mtime, nombre[:-len(".zip")], info.st_size))
+        for _, clave, tamano in sorted(existentes):
+            self._entradas[clave] = tamano
+            self._total += tamano
+        with self._lock:
+            self._expulsar()
+
+    def ruta(self, clave):
+        """Ruta del ZIP asociado a una clave (exista o no)."""
+        return os.path.join(self.directorio, f"{clave}.zip")
+
+    def obtener(self, clave):
+        """
+        Busca un resultado en la caché y lo marca como usado.
+
+        Returns:
+            str or None: ruta del ZIP o None si no está
+        """
+        with self._lock:
+            if clave not in self._entradas:
+                return None
+            ruta = self.ruta(clave)
+            if not zip_privado(ruta):
+                self._total -= self._entradas.pop(clave)
+                return None
+            self._entradas.move_to_end(clave)
+            os.utime(ruta)
+            return ruta
+
+    def registrar(self, clave):
+        """
+        Da de alta un ZIP ya escrito en self.ruta(clave) y expulsa los
+        resultados menos usados si se supera el tamaño máximo.
+        """
+        ruta = self.ruta(clave)
+        if not zip_privado(ruta):
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._total -= self._entradas.pop(clave)
+            tamano = os.path.getsize(ruta)
+            self._entradas[clave] = tamano
+            self._total += tamano
+            self._expulsar(proteger=clave)
+
+    def _expulsar(self, proteger=None):
+        # Se llama con el lock tomado; nunca expulsa la entrada recién añadida
+        while self._total > self.max_bytes and len(self._entradas) > (1 if proteger else 0):
+            clave, tamano = next(iter(self._entradas.items()))
+            if clave == proteger:
+                break
+            del self._entradas[clave]
+            self._total -= tamano
+            try:
+                os.remove(self.ruta(clave))
+            except OSError:
+                pass
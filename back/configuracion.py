@@ -0,0 +1,100 @@
+"""
+Configuración de una ejecución del pipeline.
+
+Sustituye a las constantes de main.py: run_pipeline y la API reciben una
+ConfiguracionPipeline validada y cada etapa toma de ella sus parámetros, así
+que se pueden barrer parámetros en un mismo proceso sin editar código.
+"""
+
+import dataclasses
+from dataclasses import dataclass
+
+from optimizacion_exacta import MENSAJE_SIN_ORTOOLS, ortools_disponible
+
+# Modos de resolución disponibles en run_pipeline
+MODOS = ("greedy", "exacto")
+
+
+@dataclass(frozen=True)
+class ConfiguracionPipeline:
+    """
+    Parámetros de una ejecución del pipeline.
+
+    Attributes:
+        miembros_tribunal (int): profesores por tribunal
+        min_alumnos (int): mínimo de alumnos por tribunal (objetivo del rebalanceo)
+        max_alumnos (int): máximo de alumnos por tribunal
+        num_franjas (int): número de franjas horarias a considerar
+        init_franja (int): columna de la hoja de disponibilidad donde empiezan las franjas
+        modo (str): "greedy" (por departamento + rebalanceo) o "exacto" (CP-SAT)
+        limite_tiempo (float): tiempo máximo del solver en modo exacto (segundos)
+        num_procesos (int): procesos para los departamentos o las semillas
+        num_semillas (int): semillas del multiarranque (1 = una sola ejecución)
+        hilos_solver (int): hilos de búsqueda de CP-SAT en modo exacto
+    """
+
+    miembros_tribunal: int = 3
+    min_alumnos: int = 4
+    max_alumnos: int = 6
+    num_franjas: int = 6
+    init_franja: int = 4
+    modo: str = "greedy"
+    limite_tiempo: float = 30.0
+    num_procesos: int = 1
+    num_semillas: int = 1
+    hilos_solver: int = 8
+
+    def __post_init__(self):
+        for campo in ('miembros_tribunal', 'min_alumnos', 'max_alumnos', 'num_franjas',
+                      'num_procesos', 'num_semillas', 'hilos_solver'):
+            _validar_entero(campo, getattr(self, campo), minimo=1)
+        _validar_entero('init_franja', self.init_franja, minimo=0)
+        if self.min_alumnos > self.max_alumnos:
+            raise ValueError(
+                f"min_alumnos ({self.min_alumnos}) no puede ser mayor que max_alumnos ({self.max_alumnos})"
+            )
+        if self.modo not in MODOS:
+            raise ValueError(f"Modo desconocido: {self.modo!r} (opciones: {', '.join(MODOS)})")
+        # Se comprueba aquí para rechazar la petición antes de leer ningún Excel
+        if self.modo == "exacto" and not ortools_disponible():
+            raise ValueError(MENSAJE_SIN_ORTOOLS)
+        if isinstance(self.limite_tiempo, bool) or not isinstance(self.limite_tiempo, (int, float)) \
+                or not self.limite_tiempo > 0:
+            raise ValueError(f"limite_tiempo debe ser un número positivo (recibido {self.limite_tiempo!r})")
+        # Siempre float, para que la configuración serializada no dependa de si llegó 30 o 30.0
+        object.__setattr__(self, 'limite_tiempo', float(self.limite_tiempo))
+
+    @classmethod
+    def desde_dict(cls, valores):
+        """
+        Crea una configuración a partir de un dict (p. ej. el JSON de la API).
+
+        Args:
+            valores (dict): subconjunto de los campos; el resto toma su valor por defecto
+
+        Returns:
+            ConfiguracionPipeline
+
+        Raises:
+            ValueError: si hay campos desconocidos o algún valor no es válido
+        """
+        if not isinstance(valores, dict):
+            raise ValueError("La configuración debe ser un objeto JSON")
+        desconocidos = set(valores) - {campo.name for campo in dataclasses.fields(cls)}
+        if desconocidos:
+            raise ValueError(f"Parámetros de configuración desconocidos: {', '.join(sorted(desconocidos))}")
+        return cls(**valores)
+
+    def reemplazar(self, **cambios):
+        """Copia de la configuración con algunos campos cambiados (se vuelve a validar)."""
+        return self.desde_dict({**self.a_dict(), **cambios})
+
+    def a_dict(self):
+        """Campos como dict serializable a JSON (clave de caché y estadísticas)."""
+        return dataclasses.asdict(self)
+
+
+def _validar_entero(campo, valor, minimo):
+    """Lanza ValueError si `valor` no es un entero >= minimo."""
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor < minimo:
+        raise ValueError(f"{campo} debe ser un entero >= {minimo} (recibido {valor!r})")
@@ -1,17 +1,375 @@
+import hashlib
+import logging
+import os
+import pickle
+import stat
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
+
+# ============================================================================
+# CACHÉ DE PARSEO
+# ============================================================================
+# Los libros ya parseados se guardan por hash de contenido del xlsx, en memoria
+# (los últimos CACHE_PARSEO_MEMORIA) y en disco como pickle en CACHE_PARSEO_DIR.
+# Con CACHE_PARSEO_DIR="" solo se usa la caché en memoria. La caché en memoria
+# se comparte entre hilos (API) y se protege con un lock; el parseo en sí se
+# hace fuera del lock.
+#
+# Cargar un pickle ejecuta código, así que el directorio debe ser privado: se
+# crea con permisos 0700, la caché en disco se desactiva (solo memoria) si el
+# directorio pertenece a otro usuario o lo pueden escribir otros, y se ignoran
+# los pickles en esa misma situación.
+# El nombre por defecto lleva el uid para que cada usuario tenga el suyo.
+#
+# La caché en disco se limita a CACHE_PARSEO_MAX_MB: al escribir un pickle se
+# borran los menos usados (por mtime, que se actualiza en cada acierto), igual
+# que hace cache.CacheResultados con los ZIP de resultados.
+logger = logging.getLogger(__name__)
+
+CACHE_PARSEO_DIR = os.environ.get(
+    "CACHE_PARSEO_DIR",
+    os.path.join(tempfile.gettempdir(), f"tribunales_parseo_{os.getuid()}" if hasattr(os, "getuid")
+                 else "tribunales_parseo")
+)
+CACHE_PARSEO_MEMORIA = 8
+CACHE_PARSEO_MAX_MB = int(os.environ.get("CACHE_PARSEO_MAX_MB", "200"))
+
+_cache_parseo = OrderedDict()
+_lock_parseo = threading.Lock()
+_directorios_rechazados = set()
+
+
+def _hash_fichero(ruta, bloque=1 << 20):
+    """Hash SHA-256 del contenido de un fichero, leído por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(bloque), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def es_privado(info):
+    """True si un stat pertenece al usuario actual y nadie más puede escribirlo."""
+    if not hasattr(os, "getuid"):
+        # Windows: el directorio temporal ya es propio de cada usuario
+        return True
+    return info.st_uid == os.getuid() and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def directorio_privado(directorio):
+    """
+    Crea un directorio de caché con permisos 0700 y comprueba que se puede
+    confiar en él (no es un enlace, es del usuario actual y solo él escribe).
+    Lo usan la caché de parseo y la de resultados (cache.CacheResultados).
+
+    Returns:
+        bool: False si no se debe confiar en el directorio
+    """
+    try:
+        os.makedirs(directorio, mode=0o700, exist_ok=True)
+        info = os.lstat(directorio)
+        seguro = stat.S_ISDIR(info.st_mode) and es_privado(info)
+        if seguro and stat.S_IMODE(info.st_mode) & 0o077:
+            # Creado por una versión anterior con los permisos por defecto
+            os.chmod(directorio, 0o700)
+    except OSError:
+        seguro = False
+    return seguro
+
+
+def _directorio_cache_seguro(directorio):
+    """
+    directorio_privado() para la caché de parseo, avisando una vez en el log
+    si no se puede usar.
+
+    Returns:
+        bool: False si no se debe usar la caché en disco
+    """
+    seguro = directorio_privado(directorio)
+    if not seguro and directorio not in _directorios_rechazados:
+        _directorios_rechazados.add(directorio)
+        logger.warning("Caché de parseo en disco desactivada: %s no es un directorio privado del "
+                       "usuario actual (se usa solo la caché en memoria)", directorio)
+    return seguro
+
+
+def _leer_pickle(ruta_pickle):
+    """Carga un pickle de la caché si existe y es privado; None en otro caso."""
+    try:
+        fd = os.open(ruta_pickle, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except OSError:
+        return None
+    with os.fdopen(fd, "rb") as f:
+        if not es_privado(os.fstat(f.fileno())):
+            return None
+        try:
+            return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+
+def _podar_cache_disco(directorio, max_bytes, proteger=None):
+    """
+    Borra los pickles menos usados (mtime más antiguo) hasta que el total de la
+    caché en disco no supere `max_bytes`; nunca borra `proteger` (el recién escrito).
+    """
+    entradas = []
+    try:
+        with os.scandir(directorio) as it:
+            for entrada in it:
+                if entrada.name.endswith(".pkl") and entrada.is_file(follow_symlinks=False):
+                    info = entrada.stat(follow_symlinks=False)
+                    entradas.append((info.st_mtime, info.st_size, entrada.path))
+    except OSError:
+        return
+    total = sum(tamano for _, tamano, _ in entradas)
+    for _, tamano, ruta in sorted(entradas):
+        if total <= max_bytes:
+            break
+        if ruta == proteger:
+            continue
+        try:
+            os.remove(ruta)
+        except OSError:
+            # Otro proceso ya lo ha borrado
+            pass
+        total -= tamano
+
+
+def _clave_cache(ruta, parametros):
+    """Clave de caché: hash del contenido + parámetros de parseo + versión de pandas."""
+    h = hashlib.sha256(_hash_fichero(ruta).encode())
+    # La versión de pandas entra en la clave para no leer pickles incompatibles
+    h.update(repr((parametros, pd.__version__)).encode())
+    return h.hexdigest()
+
+
+def cargar_con_cache(ruta, parametros, parsear):
+    """
+    Devuelve el resultado de parsear(ruta) reutilizando uno anterior si el
+    fichero tiene el mismo contenido y se parsea con los mismos parámetros.
+
+    El resultado se comparte entre ejecuciones, así que no debe modificarse.
+
+    Args:
+        ruta (str): ruta al archivo Excel
+        parametros (tuple): parámetros de parseo que forman parte de la clave
+        parsear (callable): función ruta → objeto parseado (serializable con pickle)
+
+    Returns:
+        objeto parseado
+    """
+    clave = _clave_cache(ruta, parametros)
+
+    with _lock_parseo:
+        if clave in _cache_parseo:
+            _cache_parseo.move_to_end(clave)
+            return _cache_parseo[clave]
+
+    ruta_pickle = None
+    if CACHE_PARSEO_DIR and _directorio_cache_seguro(CACHE_PARSEO_DIR):
+        ruta_pickle = os.path.join(CACHE_PARSEO_DIR, f"{clave}.pkl")
+    resultado = _leer_pickle(ruta_pickle) if ruta_pickle else None
+    if resultado is not None:
+        try:
+            os.utime(ruta_pickle)   # marca el pickle como usado para la poda
+        except OSError:
+            pass
+
+    if resultado is None:
+        resultado = parsear(ruta)
+        if ruta_pickle:
+            try:
+                # Escritura atómica: otro proceso nunca ve un pickle a medias
+                # (mkstemp crea el fichero con permisos 0600)
+                fd, ruta_tmp = tempfile.mkstemp(dir=CACHE_PARSEO_DIR, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(ruta_tmp, ruta_pickle)
+            except OSError:
+                pass
+            _podar_cache_disco(CACHE_PARSEO_DIR, CACHE_PARSEO_MAX_MB * 1024 * 1024, proteger=ruta_pickle)
+
+    with _lock_parseo:
+        _cache_parseo[clave] = resultado
+        while len(_cache_parseo) > CACHE_PARSEO_MEMORIA:
+            _cache_parseo.popitem(last=False)
+    return resultado
+
+
+class LibroExcel:
+    """
+    Libro Excel cargado completamente en memoria.
+
+    Cada hoja se parsea una única vez al construir el objeto; todas las etapas
+    del pipeline comparten después los DataFrames ya leídos en lugar de volver
+    a abrir el fichero. Si el mismo fichero ya se parseó antes (misma huella de
+    contenido), las hojas salen de la caché de parseo.
+
+    Attributes:
+        sheet_names (list): nombres de todas las hojas del libro (en orden)
+        hojas (dict): nombre de hoja → pd.DataFrame para las hojas cargadas
+    """
+
+    def __init__(self, ruta, header=0, excluir_ultima=False):
+        """
+        Args:
+            ruta (str): ruta completa al archivo Excel
+            header (int or list): filas a usar como encabezados en cada hoja
+            excluir_ultima (bool): no cargar la última hoja (hoja resumen)
+        """
+        self.sheet_names, self.hojas = cargar_con_cache(
+            ruta, ("libro", header, excluir_ultima),
+            lambda r: LibroExcel._parsear(r, header, excluir_ultima)
+        )
+
+    @staticmethod
+    def _parsear(ruta, header, excluir_ultima):
+        with pd.ExcelFile(ruta) as xls:
+            sheet_names = list(xls.sheet_names)
+            a_cargar = sheet_names[:-1] if excluir_ultima else sheet_names
+            # Una sola pasada de parseo para todas las hojas
+            hojas = pd.read_excel(xls, sheet_name=a_cargar, header=header) if a_cargar else {}
+        return sheet_names, hojas
+
+    def hoja(self, nombre):
+        """Devuelve el DataFrame ya parseado de la hoja indicada."""
+        return self.hojas[nombre]
+
+
+class DisponibilidadDepto:
+    """
+    Disponibilidad de un departamento en forma matricial.
+
+    Se construye una vez por hoja con comparaciones vectorizadas y la comparten
+    el cálculo de holgura de tribunales.crear_tribunales_depto y el mapa
+    disponibilidad_profesores de main.run_pipeline.
+
+    Attributes:
+        hoja (str or None): nombre de la hoja (departamento), para los mensajes
+        turnos (list): claves (tuplas del encabezado de 3 filas) de las franjas
+        nombres_turnos (list): claves originales de las franjas, que se conservan
+                               para los mensajes cuando `turnos` pasa a ser de ids
+        correos (np.ndarray): correo de cada profesor (fila)
+        matriz (np.ndarray): bool [profesor × franja], True si el profesor está disponible
+        participacion (np.ndarray): participaciones previas de cada profesor
+        peso (np.ndarray): alumnos tutorizados por cada profesor (0 si no hay columna)
+        num_disponibles (np.ndarray): número de franjas disponibles de cada profesor
+    """
+
+    def __init__(self, df_depto, init_franja, num_franjas, hoja=None):
+        """
+        Args:
+            df_depto (pd.DataFrame): hoja de disponibilidad del departamento
+            init_franja (int): columna donde comienzan las franjas
+            num_franjas (int): número de franjas a considerar
+            hoja (str, optional): nombre de la hoja, para el mensaje de error
+
+        Raises:
+            ValueError: si la hoja no tiene `num_franjas` columnas a partir de `init_franja`
+        """
+        keys = df_depto.keys()
+        comprobar_franjas(len(keys), init_franja, num_franjas, hoja)
+        self.hoja = hoja
+        self.turnos = list(keys[init_franja:init_franja + num_franjas])
+        self.nombres_turnos = self.turnos
+        self.correos = df_depto[keys[1]].to_numpy()
+        self.matriz = df_depto.iloc[:, init_franja:init_franja + num_franjas].to_numpy() == "Sí"
+        self.participacion = pd.to_numeric(df_depto[keys[2]], errors="coerce").fillna(0).to_numpy()
+        if len(keys) > 3:
+            self.peso = pd.to_numeric(df_depto[keys[3]], errors="coerce").fillna(0).to_numpy()
+        else:
+            self.peso = np.zeros(len(self.correos))
+        self.num_disponibles = self.matriz.sum(axis=1)
+
+    def por_turno(self):
+        """
+        Devuelve la disponibilidad agrupada por franja.
+
+        Returns:
+            dict: turno → list[(profesor, número de franjas disponibles)]
+                  (solo franjas con algún profesor disponible)
+        """
+        resultado = {}
+        for j, turno in enumerate(self.turnos):
+            filas = np.flatnonzero(self.matriz[:, j])
+            if len(filas):
+                resultado[turno] = list(zip(self.correos[filas], self.num_disponibles[filas].tolist()))
+        return resultado
+
+
+def comprobar_franjas(num_columnas, init_franja, num_franjas, hoja=None):
+    """
+    Comprueba que las franjas pedidas existen en una hoja de disponibilidad.
+
+    Args:
+        num_columnas (int): columnas de la hoja
+        init_franja (int): columna donde comienzan las franjas
+        num_franjas (int): número de franjas a considerar
+        hoja (str, optional): nombre de la hoja, para el mensaje de error
+
+    Raises:
+        ValueError: si init_franja + num_franjas supera el número de columnas
+    """
+    if init_franja + num_franjas > num_columnas:
+        raise ValueError(
+            f"La hoja {hoja or 'de disponibilidad'} tiene {max(num_columnas - init_franja, 0)} franjas "
+            f"a partir de la columna {init_franja} (init_franja) y se han pedido {num_franjas} (num_franjas)"
+        )
+
+
+def columnas_disponibilidad(ruta):
+    """
+    Número de columnas de cada hoja de departamento (todas menos la última)
+    leyendo solo las filas del encabezado, sin parsear el libro completo.
+
+    Args:
+        ruta (str): ruta completa al archivo de disponibilidad
+
+    Returns:
+        dict: nombre de hoja → número de columnas
+    """
+    with pd.ExcelFile(ruta) as xls:
+        hojas = xls.sheet_names[:-1]
+        encabezados = pd.read_excel(xls, sheet_name=hojas, header=None, nrows=3) if hojas else {}
+    return {hoja: df.shape[1] for hoja, df in encabezados.items()}
+
+
 def load_disponibilidad(path, filename="disponibilidad_TFG.xlsx"):
     """
     Carga el archivo Excel con disponibilidad de profesores.
+
+    Todas las hojas de departamento (todas menos la última) se parsean una
+    única vez con el encabezado de 3 filas.
     
     Args:
         path (str): ruta a la carpeta con los archivos
         filename (str): nombre del archivo de disponibilidad
     
     Returns:
-        pd.ExcelFile: objeto ExcelFile con las hojas de disponibilidad por departamento
+        LibroExcel: libro con las hojas de disponibilidad por departamento
     """
-    return pd.ExcelFile(path + filename)
+    return LibroExcel(path + filename, header=[0, 1, 2], excluir_ultima=True)
+
+
+def load_tfgs_presentados(path, filename="TFGs_presentados_enviar.xlsx"):
+    """
+    Carga el archivo Excel con los TFGs presentados en el semestre
+    (a través de la caché de parseo).
+    
+    Args:
+        path (str): ruta a la carpeta con los archivos
+        filename (str): nombre del archivo de TFGs presentados
+    
+    Returns:
+        pd.DataFrame: DataFrame con la primera hoja del archivo
+    """
+    return cargar_con_cache(path + filename, ("tfgs", 0), lambda r: pd.read_excel(r, header=0))
 
 
 def load_tfgs_por_dptos(path, filename="TFGs_por_dptos.xlsx"):
@@ -31,16 +389,21 @@ def load_tfgs_por_dptos(path, filename="TFGs_por_dptos.xlsx"):
 def read_sheet(file, sheet_name, header=0):
     """
     Lee una hoja específica de un archivo Excel.
+
+    Si se recibe un LibroExcel la hoja ya está parseada y se devuelve sin
+    volver a leer el fichero (el encabezado es el usado al cargar el libro).
     
     Args:
-        file (pd.ExcelFile or str): objeto ExcelFile o ruta al archivo
+        file (LibroExcel, pd.ExcelFile or str): libro cargado, objeto ExcelFile o ruta al archivo
         sheet_name (str): nombre de la hoja a leer
         header (int or list): filas a usar como encabezados
     
     Returns:
         pd.DataFrame: DataFrame con los datos de la hoja
     """
-    if isinstance(file, str):
+    if isinstance(file, LibroExcel):
+        return file.hoja(sheet_name)
+    elif isinstance(file, str):
         return pd.read_excel(file, sheet_name=sheet_name, header=header)
     else:
         return pd.read_excel(file, sheet_name=sheet_name, header=header)
@@ -51,7 +414,7 @@ def get_sheet_names(file):
     Obtiene la lista de nombres de hojas de un archivo Excel.
     
     Args:
-        file (pd.ExcelFile): objeto ExcelFile
+        file (LibroExcel or pd.ExcelFile): libro cargado u objeto ExcelFile
     
     Returns:
         list: lista con nombres de hojas
@@ -0,0 +1,94 @@
+"""
+Evaluación de soluciones: métricas de calidad y puntuación configurable
+usada por el modo multiarranque de run_pipeline.
+"""
+
+# Pesos por defecto del objetivo (menor puntuación = mejor solución)
+PESOS_OBJETIVO = {
+    'sin_asignar': 1000,              # alumnos que no están en ningún tribunal
+    'bajo_minimo': 100,               # tribunales con alumnos pero por debajo del mínimo
+    'vacios': 10,                     # tribunales con profesores y sin alumnos
+    'dispersion_participacion': 1,    # max - min de participaciones tras la asignación
+}
+
+
+def calcular_metricas(asignaciones, estudiantes, disponibilidades, min_alumnos=4):
+    """
+    Calcula las métricas de calidad de una solución.
+
+    Args:
+        asignaciones (dict): turno → list[{'profesores': set, 'alumnos': dict}]
+        estudiantes (dict): alumno_id → datos
+        disponibilidades (dict): departamento → DisponibilidadDepto
+        min_alumnos (int): mínimo de alumnos por tribunal
+
+    Returns:
+        dict: {'sin_asignar', 'bajo_minimo', 'vacios', 'dispersion_participacion'}
+    """
+    asignados = set()
+    bajo_minimo = 0
+    vacios = 0
+    en_tribunal = set()
+    for lista_asignaciones in asignaciones.values():
+        for tribunal_data in lista_asignaciones:
+            if not tribunal_data['profesores']:
+                continue
+            num_alum = len(tribunal_data['alumnos'])
+            if num_alum == 0:
+                vacios += 1
+            elif num_alum < min_alumnos:
+                bajo_minimo += 1
+            asignados.update(tribunal_data['alumnos'].keys())
+            en_tribunal.update(tribunal_data['profesores'])
+
+    # Participación de cada profesor tras esta convocatoria
+    participacion = {}
+    for disp in disponibilidades.values():
+        for correo, previa in zip(disp.correos, disp.participacion):
+            participacion[correo] = previa + (1 if correo in en_tribunal else 0)
+
+    return {
+        'sin_asignar': sum(1 for a in estudiantes if a not in asignados),
+        'bajo_minimo': bajo_minimo,
+        'vacios': vacios,
+        'dispersion_participacion': float(max(participacion.values()) - min(participacion.values()))
+                                    if participacion else 0.0,
+    }
+
+
+def puntuar(metricas, pesos=None):
+    """
+    Combina las métricas en una única puntuación (menor es mejor).
+
+    Args:
+        metricas (dict): salida de calcular_metricas
+        pesos (dict, optional): peso de cada métrica (por defecto PESOS_OBJETIVO)
+
+    Returns:
+        float: puntuación ponderada
+    """
+    pesos = PESOS_OBJETIVO if pesos is None else pesos
+    return sum(pesos.get(nombre, 0) * valor for nombre, valor in metricas.items())
+
+
+def cota_inferior(disponibilidades, pesos=None):
+    """
+    Cota inferior de la puntuación alcanzable con estos datos.
+
+    Las métricas de alumnos y tribunales pueden llegar a 0; la dispersión de
+    participación no puede bajar de (max previa) - (min previa + 1), ya que
+    cada profesor participa como mucho en un tribunal.
+
+    Args:
+        disponibilidades (dict): departamento → DisponibilidadDepto
+        pesos (dict, optional): peso de cada métrica (por defecto PESOS_OBJETIVO)
+
+    Returns:
+        float: puntuación mínima posible
+    """
+    pesos = PESOS_OBJETIVO if pesos is None else pesos
+    previas = [p for disp in disponibilidades.values() for p in disp.participacion]
+    if not previas:
+        return 0.0
+    dispersion_minima = max(0.0, float(max(previas) - min(previas) - 1))
+    return pesos.get('dispersion_participacion', 0) * dispersion_minima
@@ -1,44 +1,304 @@
+import io
 import os
+import logging
 import csv
+import json
+import math
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
-def exportar_csv_por_grado(asignaciones, output_dir):
-	"""Genera un CSV por grado con las asignaciones finales."""
+logger = logging.getLogger(__name__)
+
+# Tabla de resultados: una fila por alumno asignado. La franja va en tres
+# columnas (dia, hora, aula) y 'profesores' y 'tutores' son listas de correos
+# (no cadenas unidas por comas), para que las herramientas que cargan el
+# Parquet o el JSON Lines no tengan que volver a partirlas.
+COLUMNAS_RESULTADOS = ('alumno_id', 'nombre', 'grado', 'departamento', 'dia', 'hora', 'aula',
+					   'tribunal_num', 'profesores', 'tutores')
+COLUMNAS_CSV = ['grado', 'alumno_id', 'nombre', 'departamento_alumno', 'turno', 'tribunal_num', 'profesores', 'tutores']
+# Alumnos sin tribunal (los lee reparacion para no recolocarlos si no cambian)
+COLUMNAS_SIN_ASIGNAR = ['alumno_id', 'nombre', 'grado', 'departamento_alumno', 'tutores']
+FICHERO_SIN_ASIGNAR = "sin_asignar.csv"
+FICHERO_JSONL = "resultados.jsonl"
+FICHERO_PARQUET = "resultados.parquet"
+# Hilos para escribir los ficheros de una exportación a carpeta (trabajo de E/S)
+HILOS_EXPORTACION = 8
+
+
+def _texto(valor):
+	"""Valor de una celda como str, o None si está vacía (pandas la lee como NaN)."""
+
+	if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+		return None
+	return str(valor)
+
+
+def _partes_turno(turno):
+	"""(dia, hora, aula) de una franja (tupla del encabezado de 3 filas de la disponibilidad)."""
+
+	if isinstance(turno, tuple) and len(turno) == 3:
+		return tuple(_texto(parte) for parte in turno)
+	return _texto(turno), None, None
 
-	os.makedirs(output_dir, exist_ok=True)
 
-	# Recolectar filas por grado
-	rows_por_grado = {}
+def tabla_resultados(asignaciones):
+	"""
+	Materializa la asignación final como una tabla columnar plana.
+
+	Es la única pasada sobre la estructura anidada; el CSV por grado, el JSON
+	Lines y el Parquet se escriben a partir de esta tabla. Las celdas vacías
+	del Excel (NaN) quedan como None y un grado vacío como 'Desconocido'.
+
+	Args:
+		asignaciones (dict): turno → list[{'profesores': set, 'alumnos': dict}]
+
+	Returns:
+		dict: columna (COLUMNAS_RESULTADOS, más 'turno' en texto para el CSV) → list,
+		      todas de la misma longitud
+	"""
+
+	tabla = {columna: [] for columna in COLUMNAS_RESULTADOS}
+	# Texto de la franja para el CSV (mismo formato que antes de la tabla)
+	tabla['turno'] = []
 	for turno, lista_asignaciones in asignaciones.items():
+		turno_texto = str(turno)
+		dia, hora, aula = _partes_turno(turno)
 		# Iterar sobre cada tribunal (con profesores y alumnos)
 		for idx_trib, tribunal_data in enumerate(lista_asignaciones):
-			profesores = list(tribunal_data['profesores'])
-			alumnos = tribunal_data['alumnos']
-				
-			for alumno_id, datos in alumnos.items():
-				grado = datos.get('grado', 'Desconocido')
-				fila = {
-					'grado': grado,
-					'alumno_id': alumno_id,
-					'nombre': datos.get('nombre', ''),
-					'departamento_alumno': datos.get('departamento', ''),
-					'turno': str(turno),
-					'tribunal_num': idx_trib + 1,  # Número de tribunal (1, 2, 3, ...)
-					'profesores': ', '.join(profesores),
-					'tutores': ', '.join(datos.get('tutores', [])),
-				}
-				rows_por_grado.setdefault(grado, []).append(fila)
-
-	# Escribir un CSV por grado
-	for grado, rows in rows_por_grado.items():
+			profesores = sorted(tribunal_data['profesores'])
+			for alumno_id, datos in tribunal_data['alumnos'].items():
+				tabla['alumno_id'].append(str(alumno_id))
+				tabla['nombre'].append(_texto(datos.get('nombre')))
+				tabla['grado'].append(_texto(datos.get('grado')) or 'Desconocido')
+				tabla['departamento'].append(_texto(datos.get('departamento')))
+				tabla['dia'].append(dia)
+				tabla['hora'].append(hora)
+				tabla['aula'].append(aula)
+				tabla['turno'].append(turno_texto)
+				tabla['tribunal_num'].append(idx_trib + 1)  # Número de tribunal (1, 2, 3, ...)
+				tabla['profesores'].append(profesores)
+				tabla['tutores'].append(list(datos.get('tutores', [])))
+	return tabla
+
+
+def _filas_por_grado(tabla):
+	"""Índices de las filas de la tabla agrupados por grado (grado → list[int])."""
+
+	filas_por_grado = {}
+	for i, grado in enumerate(tabla['grado']):
+		filas_por_grado.setdefault(grado, []).append(i)
+	return filas_por_grado
+
+
+def _escribir_csv(f, tabla, filas):
+	"""Escribe las filas de un grado en un fichero de texto ya abierto."""
+
+	# Usamos ';' como separador para que Excel en español no junte todo en una sola celda
+	writer = csv.writer(f, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+	writer.writerow(COLUMNAS_CSV)
+	writer.writerows(
+		(tabla['grado'][i], tabla['alumno_id'][i], tabla['nombre'][i], tabla['departamento'][i],
+		 tabla['turno'][i], tabla['tribunal_num'][i], ', '.join(tabla['profesores'][i]),
+		 ', '.join(tabla['tutores'][i]))
+		for i in filas
+	)
+
+
+def _escribir_sin_asignar(f, no_asignados):
+	"""Escribe sin_asignar.csv (alumno_id → datos como los de un tribunal) en un fichero ya abierto."""
+
+	writer = csv.writer(f, delimiter=';', quoting=csv.QUOTE_MINIMAL)
+	writer.writerow(COLUMNAS_SIN_ASIGNAR)
+	writer.writerows(
+		(str(alumno_id), _texto(datos.get('nombre')), _texto(datos.get('grado')) or 'Desconocido',
+		 _texto(datos.get('departamento')), ', '.join(datos.get('tutores', [])))
+		for alumno_id, datos in no_asignados.items()
+	)
+
+
+def _escribir_jsonl(f, tabla):
+	"""Escribe la tabla como JSON Lines (un objeto por alumno) en un fichero de texto."""
+
+	columnas = [(columna, tabla[columna]) for columna in COLUMNAS_RESULTADOS]
+	for i in range(len(tabla['alumno_id'])):
+		f.write(json.dumps({columna: valores[i] for columna, valores in columnas},
+						   ensure_ascii=False, allow_nan=False))
+		f.write("\n")
+
+
+def _tabla_arrow(tabla):
+	"""
+	Convierte la tabla a pyarrow.Table con tipos explícitos.
+
+	Returns:
+		pyarrow.Table or None: None si pyarrow no está instalado (se avisa y se omite el Parquet)
+	"""
+
+	try:
+		import pyarrow as pa
+	except ImportError:
+		logger.warning("pyarrow no está instalado: se omite %s (pip install pyarrow)", FICHERO_PARQUET)
+		return None
+	esquema = pa.schema([
+		('alumno_id', pa.string()),
+		('nombre', pa.string()),
+		('grado', pa.string()),
+		('departamento', pa.string()),
+		('dia', pa.string()),
+		('hora', pa.string()),
+		('aula', pa.string()),
+		('tribunal_num', pa.int32()),
+		('profesores', pa.list_(pa.string())),
+		('tutores', pa.list_(pa.string())),
+	])
+	return pa.table({columna: tabla[columna] for columna in COLUMNAS_RESULTADOS}, schema=esquema)
+
+
+def _escribir_parquet(tabla, destino):
+	"""
+	Escribe la tabla como Parquet.
+
+	Args:
+		tabla (dict): salida de tabla_resultados
+		destino (str or file): ruta o fichero binario
+
+	Returns:
+		bool: False si se ha omitido por falta de pyarrow
+	"""
+
+	tabla_arrow = _tabla_arrow(tabla)
+	if tabla_arrow is None:
+		return False
+	import pyarrow.parquet as pq
+	pq.write_table(tabla_arrow, destino)
+	return True
+
+
+def _ejecutar_en_hilos(tareas, max_hilos=None):
+	"""
+	Ejecuta funciones sin argumentos en un pool de hilos y espera a todas.
+
+	Args:
+		tareas (list[callable]): funciones a ejecutar
+		max_hilos (int, optional): hilos como máximo (None = HILOS_EXPORTACION;
+			1 = secuencial, en el hilo actual)
+
+	Raises:
+		Exception: la primera excepción lanzada por una tarea
+	"""
+
+	max_hilos = min(max_hilos or HILOS_EXPORTACION, len(tareas))
+	if max_hilos <= 1:
+		for tarea in tareas:
+			tarea()
+		return
+	with ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="exportar") as executor:
+		futuros = [executor.submit(tarea) for tarea in tareas]
+		for futuro in futuros:
+			futuro.result()
+
+
+def _tareas_csv(tabla, output_dir):
+	"""Una tarea por grado que escribe su CSV en output_dir."""
+
+	def escribir(grado, filas):
 		nombre_archivo = os.path.join(output_dir, f"asignaciones_{grado}.csv")
 		with open(nombre_archivo, mode="w", newline="", encoding="utf-8-sig") as f:
-			# Usamos ';' como separador para que Excel en español no junte todo en una sola celda
-			writer = csv.DictWriter(
-				f,
-				fieldnames=list(rows[0].keys()),
-				delimiter=';',
-				quoting=csv.QUOTE_MINIMAL
-			)
-			writer.writeheader()
-			writer.writerows(rows)
-		print(f"CSV generado: {nombre_archivo} ({len(rows)} registros)")
+			_escribir_csv(f, tabla, filas)
+		logger.info("CSV generado: %s (%d registros)", nombre_archivo, len(filas))
+
+	return [lambda grado=grado, filas=filas: escribir(grado, filas)
+			for grado, filas in _filas_por_grado(tabla).items()]
+
+
+def exportar_csv_por_grado(asignaciones, output_dir, tabla=None, max_hilos=None):
+	"""
+	Genera un CSV por grado con las asignaciones finales.
+
+	Las filas se agrupan por grado en una sola pasada y cada fichero se escribe
+	en su propio hilo, para no serializar la E/S cuando hay muchos grados.
+
+	Args:
+		asignaciones (dict): turno → list[{'profesores': set, 'alumnos': dict}]
+		output_dir (str): carpeta de salida
+		tabla (dict, optional): tabla_resultados(asignaciones) ya calculada
+		max_hilos (int, optional): hilos de escritura (None = HILOS_EXPORTACION, 1 = secuencial)
+	"""
+
+	os.makedirs(output_dir, exist_ok=True)
+	tabla = tabla if tabla is not None else tabla_resultados(asignaciones)
+	_ejecutar_en_hilos(_tareas_csv(tabla, output_dir), max_hilos)
+
+
+def exportar_resultados(asignaciones, output_dir, max_hilos=None, no_asignados=None):
+	"""
+	Exporta la asignación a una carpeta: un CSV por grado más la tabla completa
+	en JSON Lines (resultados.jsonl) y Parquet (resultados.parquet, si está pyarrow).
+	Todos los ficheros se escriben a la vez en un pool de hilos.
+
+	Args:
+		asignaciones (dict): turno → list[{'profesores': set, 'alumnos': dict}]
+		output_dir (str): carpeta de salida
+		max_hilos (int, optional): hilos de escritura (None = HILOS_EXPORTACION, 1 = secuencial)
+		no_asignados (dict, optional): alumno_id → datos de los alumnos sin tribunal
+			(se escriben en sin_asignar.csv)
+	"""
+
+	os.makedirs(output_dir, exist_ok=True)
+	tabla = tabla_resultados(asignaciones)
+
+	def escribir_jsonl():
+		with open(os.path.join(output_dir, FICHERO_JSONL), "w", encoding="utf-8") as f:
+			_escribir_jsonl(f, tabla)
+
+	# Parquet y JSON Lines primero: recorren la tabla entera y son las tareas más largas
+	tareas = [lambda: _escribir_parquet(tabla, os.path.join(output_dir, FICHERO_PARQUET)), escribir_jsonl]
+	if no_asignados is not None:
+		def escribir_sin_asignar():
+			with open(os.path.join(output_dir, FICHERO_SIN_ASIGNAR), "w", newline="", encoding="utf-8-sig") as f:
+				_escribir_sin_asignar(f, no_asignados)
+		tareas.append(escribir_sin_asignar)
+	_ejecutar_en_hilos(tareas + _tareas_csv(tabla, output_dir), max_hilos)
+
+
+def exportar_zip(asignaciones, destino, estadisticas=None, no_asignados=None):
+	"""
+	Genera el ZIP de resultados (un CSV por grado, sin_asignar.csv,
+	resultados.jsonl, resultados.parquet si está pyarrow y estadisticas.json).
+
+	Cada CSV se escribe directamente en su entrada del ZIP, sin pasar por
+	ficheros temporales ni por un buffer con el CSV completo. Las entradas se
+	escriben una tras otra (zipfile solo admite una entrada abierta a la vez).
+
+	Args:
+		asignaciones (dict): turno → list[{'profesores': set, 'alumnos': dict}]
+		destino (str or file): ruta o fichero binario donde escribir el ZIP
+		estadisticas (dict or callable, optional): estadísticas a incluir como
+			estadisticas.json, o función que las devuelve (se llama tras escribir
+			los CSV, para que puedan incluir el tiempo de exportación)
+		no_asignados (dict, optional): alumno_id → datos de los alumnos sin tribunal
+	"""
+
+	tabla = tabla_resultados(asignaciones)
+	with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zipf:
+		for grado, filas in _filas_por_grado(tabla).items():
+			nombre_archivo = f"asignaciones_{grado}.csv"
+			with zipf.open(nombre_archivo, "w") as entrada:
+				with io.TextIOWrapper(entrada, encoding="utf-8-sig", newline="") as f:
+					_escribir_csv(f, tabla, filas)
+			logger.info("CSV generado: %s (%d registros)", nombre_archivo, len(filas))
+		if no_asignados is not None:
+			with zipf.open(FICHERO_SIN_ASIGNAR, "w") as entrada:
+				with io.TextIOWrapper(entrada, encoding="utf-8-sig", newline="") as f:
+					_escribir_sin_asignar(f, no_asignados)
+		with zipf.open(FICHERO_JSONL, "w") as entrada:
+			with io.TextIOWrapper(entrada, encoding="utf-8") as f:
+				_escribir_jsonl(f, tabla)
+		# Parquet necesita un fichero con posición: se genera en memoria
+		buffer = io.BytesIO()
+		if _escribir_parquet(tabla, buffer):
+			zipf.writestr(FICHERO_PARQUET, buffer.getvalue())
+		if callable(estadisticas):
+			estadisticas = estadisticas()
+		if estadisticas is not None:
+			zipf.writestr("estadisticas.json", json.dumps(estadisticas, indent=2, ensure_ascii=False))
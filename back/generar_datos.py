@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Generador de datos sintéticos con el mismo formato que los Excel reales:
+disponibilidad_TFG.xlsx (una hoja por departamento con encabezado de 3 filas
+más una hoja resumen final) y TFGs_presentados_enviar.xlsx.
+
+Uso:
+    python generar_datos.py data/sintetico/ --departamentos 10 --profesores 40 --tfgs 500
+"""
+
+import argparse
+import os
+import random
+
+from openpyxl import Workbook
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+HORAS = ["9:00", "11:00", "13:00", "16:00"]
+GRADOS = ("GII", "GMI", "GCD")
+
+
+def _franjas(num_franjas):
+    """Lista de (día, hora, aula) de las franjas, por días consecutivos."""
+    franjas = []
+    for i in range(num_franjas):
+        dia = DIAS[(i // len(HORAS)) % len(DIAS)]
+        if i >= len(DIAS) * len(HORAS):
+            dia = f"{dia} {i // (len(DIAS) * len(HORAS)) + 1}"
+        franjas.append((dia, HORAS[i % len(HORAS)], f"Aula {i % 3 + 1}"))
+    return franjas
+
+
+def generar_datos(directorio, num_departamentos=8, profesores_por_dpto=30, num_tfgs=200,
+                  num_franjas=6, densidad=0.5, ratio_cotutor=0.2, ratio_externo=0.5,
+                  grados=GRADOS, seed=1):
+    """
+    Genera un par de Excel de entrada sintéticos.
+
+    Los TFGs se reparten entre departamentos y profesores con pesos aleatorios
+    (hay departamentos y tutores con mucha más carga que otros), y la columna
+    de alumnos tutorizados refleja los TFGs generados.
+
+    Args:
+        directorio (str): carpeta de salida (se crea si no existe)
+        num_departamentos (int): número de hojas de departamento
+        profesores_por_dpto (int): profesores en cada departamento
+        num_tfgs (int): número de TFGs presentados
+        num_franjas (int): franjas horarias por profesor
+        densidad (float): probabilidad de que un profesor esté disponible en una franja
+        ratio_cotutor (float): fracción de TFGs con cotutor
+        ratio_externo (float): fracción de cotutores externos (correo fuera de la UPM)
+        grados (tuple): grados a los que pertenecen los TFGs
+        seed (int): semilla del generador
+
+    Returns:
+        tuple: (ruta de disponibilidad_TFG.xlsx, ruta de TFGs_presentados_enviar.xlsx)
+    """
+    rng = random.Random(seed)
+    os.makedirs(directorio, exist_ok=True)
+
+    departamentos = [f"DEP{d:02d}" for d in range(num_departamentos)]
+    profesores = {
+        dpto: [f"prof{p:03d}.{dpto.lower()}@fi.upm.es" for p in range(profesores_por_dpto)]
+        for dpto in departamentos
+    }
+    carga_dpto = [rng.uniform(0.2, 1.0) for _ in departamentos]
+    carga_profesor = {dpto: [rng.expovariate(1.0) for _ in profesores[dpto]] for dpto in departamentos}
+
+    # ---- TFGs presentados ----
+    tutorizados = {}
+    filas_tfgs = []
+    for i in range(num_tfgs):
+        dpto = rng.choices(departamentos, weights=carga_dpto)[0]
+        tutor = rng.choices(profesores[dpto], weights=carga_profesor[dpto])[0]
+        tutorizados[tutor] = tutorizados.get(tutor, 0) + 1
+        campo_tutores = f"{tutor}(TUTOR {tutor.split('@')[0].upper()})"
+        if rng.random() < ratio_cotutor:
+            if rng.random() < ratio_externo:
+                cotutor = f"cotutor{i}@empresa{rng.randrange(20)}.com"
+            else:
+                otro = rng.choice(departamentos)
+                cotutor = rng.choice([p for p in profesores[otro] if p != tutor] or profesores[otro])
+                tutorizados[cotutor] = tutorizados.get(cotutor, 0) + 1
+            campo_tutores += f"-{cotutor}(COTUTOR)"
+        matricula = f"alumno{i:05d}"
+        filas_tfgs.append([
+            f"Entrega {i + 1}", 10000 + i, f"Alumno {i:05d}", f"{matricula}@alumnos.upm.es",
+            matricula, f"Trabajo fin de grado {i}", campo_tutores, rng.choice(grados),
+        ])
+
+    libro_tfgs = Workbook(write_only=True)
+    hoja = libro_tfgs.create_sheet("TFGs")
+    hoja.append(["Entrega", "Trabajo", "Alumno", "AlumnoEmail", "Matricula", "Título", "Tutor-es", "Grado"])
+    for fila in filas_tfgs:
+        hoja.append(fila)
+    ruta_tfgs = os.path.join(directorio, "TFGs_presentados_enviar.xlsx")
+    libro_tfgs.save(ruta_tfgs)
+
+    # ---- Disponibilidad por departamento ----
+    franjas = _franjas(num_franjas)
+    libro_disp = Workbook(write_only=True)
+    for dpto in departamentos:
+        hoja = libro_disp.create_sheet(dpto)
+        hoja.append(["Profesor", "Correo", "Participaciones", "Tutorizados"] + [f[0] for f in franjas])
+        hoja.append(["", "", "", ""] + [f[1] for f in franjas])
+        hoja.append(["", "", "", ""] + [f[2] for f in franjas])
+        for p, correo in enumerate(profesores[dpto]):
+            hoja.append(
+                [f"Profesor {p:03d} {dpto}", correo, rng.randint(0, 4), tutorizados.get(correo, 0)]
+                + ["Sí" if rng.random() < densidad else "No" for _ in franjas]
+            )
+    resumen = libro_disp.create_sheet("Resumen")
+    resumen.append(["Departamento", "Profesores"])
+    for dpto in departamentos:
+        resumen.append([dpto, len(profesores[dpto])])
+    ruta_disp = os.path.join(directorio, "disponibilidad_TFG.xlsx")
+    libro_disp.save(ruta_disp)
+
+    return ruta_disp, ruta_tfgs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera Excel de entrada sintéticos")
+    parser.add_argument("directorio", help="carpeta de salida")
+    parser.add_argument("--departamentos", type=int, default=8)
+    parser.add_argument("--profesores", type=int, default=30, help="profesores por departamento")
+    parser.add_argument("--tfgs", type=int, default=200)
+    parser.add_argument("--franjas", type=int, default=6)
+    parser.add_argument("--densidad", type=float, default=0.5, help="probabilidad de disponibilidad por franja")
+    parser.add_argument("--cotutores", type=float, default=0.2, help="fracción de TFGs con cotutor")
+    parser.add_argument("--externos", type=float, default=0.5, help="fracción de cotutores externos")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rutas = generar_datos(
+        args.directorio, args.departamentos, args.profesores, args.tfgs,
+        num_franjas=args.franjas, densidad=args.densidad, ratio_cotutor=args.cotutores,
+        ratio_externo=args.externos, seed=args.seed
+    )
+    for ruta in rutas:
+        print(f"Generado: {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Internado de identificadores: tras la carga, franjas, profesores,
+departamentos y alumnos se sustituyen por enteros densos (0, 1, 2, ...).
+
+Todo el motor (tribunales, asignacion, optimizacion, evaluacion) trabaja con
+esos enteros, de modo que conjuntos, comprobaciones de conflicto y búsquedas
+en diccionarios operan sobre enteros pequeños. Las cadenas originales solo se
+recuperan al exportar (Catalogo.traducir_asignaciones).
+
+Con ids densos, un conjunto de profesores se representa también como máscara
+de bits (bit i = profesor i): un alumno puede ir a un tribunal si
+`alumno.mascara & mascara_tribunal == 0`.
+"""
+
+import numpy as np
+
+
+class Interno:
+    """Tabla bidireccional valor ↔ entero denso, en orden de aparición."""
+
+    __slots__ = ('_ids', 'valores')
+
+    def __init__(self):
+        self._ids = {}
+        self.valores = []
+
+    def id(self, valor):
+        """Devuelve el id de `valor`, asignándole el siguiente si es nuevo."""
+        i = self._ids.get(valor)
+        if i is None:
+            i = self._ids[valor] = len(self.valores)
+            self.valores.append(valor)
+        return i
+
+    def buscar(self, valor):
+        """Id de `valor` o None si no se ha internado."""
+        return self._ids.get(valor)
+
+    def valor(self, i):
+        """Valor original del id `i`."""
+        return self.valores[i]
+
+    def __len__(self):
+        return len(self.valores)
+
+
+def mascara_profesores(profesores):
+    """Máscara de bits (int) de un conjunto de ids de profesor."""
+    mascara = 0
+    for p in profesores:
+        mascara |= 1 << p
+    return mascara
+
+
+def matriz_compatibilidad(alumnos, tribunales):
+    """
+    Compatibilidad alumno × tribunal calculada de una vez con NumPy.
+
+    Se construyen las matrices booleanas alumno × profesor (tutores) y
+    tribunal × profesor (miembros), solo con los profesores que forman parte
+    de algún tribunal; su producto indica qué tribunales contienen a algún
+    tutor de cada alumno.
+
+    Args:
+        alumnos (list[Alumno]): alumnos (filas del resultado)
+        tribunales (list[set[int]]): profesores de cada tribunal (columnas); un
+                                     tribunal sin profesores no admite alumnos
+
+    Returns:
+        np.ndarray: bool [alumno × tribunal], True si el alumno puede ir al tribunal
+    """
+    columnas = {}
+    for profesores in tribunales:
+        for p in profesores:
+            columnas.setdefault(p, len(columnas))
+
+    miembros = np.zeros((len(tribunales), len(columnas)), dtype=np.int32)
+    for k, profesores in enumerate(tribunales):
+        miembros[k, [columnas[p] for p in profesores]] = 1
+    tutores = np.zeros((len(alumnos), len(columnas)), dtype=np.int32)
+    for i, alumno in enumerate(alumnos):
+        tutores[i, [columnas[t] for t in alumno.tutores if t in columnas]] = 1
+
+    abiertos = np.array([bool(profesores) for profesores in tribunales], dtype=bool)
+    return ((tutores @ miembros.T) == 0) & abiertos
+
+
+class Alumno:
+    """
+    Registro compacto de un alumno (sustituye al dict por alumno).
+
+    Attributes:
+        trabajo: identificador original del TFG (columna Trabajo)
+        nombre (str): nombre del alumno
+        tutores (tuple[int]): ids de tutor y cotutor (en el orden del Excel)
+        mascara (int): máscara de bits de los tutores (ver mascara_profesores)
+        departamento (int): id del departamento del tutor
+        grado (str): grado del alumno
+    """
+
+    __slots__ = ('trabajo', 'nombre', 'tutores', 'mascara', 'departamento', 'grado')
+
+    def __init__(self, trabajo, nombre, tutores, departamento, grado):
+        self.trabajo = trabajo
+        self.nombre = nombre
+        self.tutores = tutores
+        self.mascara = mascara_profesores(tutores)
+        self.departamento = departamento
+        self.grado = grado
+
+
+class Catalogo:
+    """
+    Tablas de internado de una ejecución.
+
+    Attributes:
+        turnos (Interno): clave de franja (tupla del encabezado de 3 filas) ↔ id
+        profesores (Interno): correo ↔ id (incluye cotutores externos)
+        departamentos (Interno): nombre de hoja ↔ id
+        alumnos (Interno): id de trabajo ↔ id
+    """
+
+    def __init__(self):
+        self.turnos = Interno()
+        self.profesores = Interno()
+        self.departamentos = Interno()
+        self.alumnos = Interno()
+
+    def internar_profesor_departamento(self, profesor_departamento):
+        """Traduce el mapa correo → departamento a ids."""
+        return {self.profesores.id(correo): self.departamentos.id(dpto)
+                for correo, dpto in profesor_departamento.items()}
+
+    def internar_disponibilidad(self, disp):
+        """
+        Sustituye en una DisponibilidadDepto los correos y franjas por sus ids
+        (las claves originales de las franjas siguen en `nombres_turnos`).
+
+        Los correos quedan en un array de objetos con enteros de Python, para
+        que la indexación por filas siga funcionando y los conjuntos del motor
+        contengan int y no escalares de NumPy.
+        """
+        disp.correos = np.array([self.profesores.id(c) for c in disp.correos], dtype=object)
+        disp.turnos = [self.turnos.id(t) for t in disp.turnos]
+        return disp
+
+    def internar_estudiantes(self, estudiantes):
+        """
+        Convierte los estudiantes de cargar_estudiantes a registros Alumno.
+
+        Args:
+            estudiantes (dict): trabajo → {nombre, tutores, departamento, grado}
+
+        Returns:
+            dict: id de alumno → Alumno
+        """
+        return {
+            self.alumnos.id(trabajo): Alumno(
+                trabajo, datos['nombre'],
+                tuple(self.profesores.id(t) for t in datos['tutores']),
+                self.departamentos.id(datos['departamento']),
+                datos['grado'],
+            )
+            for trabajo, datos in estudiantes.items()
+        }
+
+    def traducir_alumno(self, alumno):
+        """Datos de un Alumno con los valores originales, como los recibe exportar."""
+        profesores = self.profesores.valores
+        return {
+            'nombre': alumno.nombre,
+            'tutores': [profesores[t] for t in alumno.tutores],
+            'departamento': self.departamentos.valores[alumno.departamento],
+            'grado': alumno.grado,
+        }
+
+    def traducir_asignaciones(self, asignaciones):
+        """
+        Devuelve las asignaciones con los valores originales para exportar.
+
+        Args:
+            asignaciones (dict): id de turno → list[{'profesores': set[int], 'alumnos': {int: Alumno}}]
+
+        Returns:
+            dict: turno → list[{'profesores': set[str], 'alumnos': {trabajo: dict}}]
+        """
+        profesores = self.profesores.valores
+        traducidas = {}
+        for turno, lista_tribunales in asignaciones.items():
+            traducidas[self.turnos.valor(turno)] = [
+                {
+                    'profesores': {profesores[p] for p in tribunal['profesores']},
+                    'alumnos': {alumno.trabajo: self.traducir_alumno(alumno)
+                                for alumno in tribunal['alumnos'].values()},
+                }
+                for tribunal in lista_tribunales
+            ]
+        return traducidas
@@ -1,15 +1,27 @@
-from mapping import build_profesor_departamento  # agregar extraer_correos
+from mapping import build_profesor_departamento
 from tribunales import crear_tribunales_depto, distribuir_tribunales
-from data_io import load_disponibilidad, load_tfgs_por_dptos, read_sheet, get_sheet_names, get_num_rows
+from data_io import (DisponibilidadDepto, comprobar_franjas, load_disponibilidad, read_sheet, get_sheet_names,
+                     get_num_rows, get_num_columns)
 from asignacion import cargar_estudiantes, asignar_alumnos_a_tribunales
 from optimizacion import rebalancear_tribunales
+from optimizacion_exacta import resolver_tribunales_exacto
 from agrupacion import agrupar_tfgs_por_departamentos
-from exportar import exportar_csv_por_grado
+from exportar import exportar_resultados, exportar_zip
+from evaluacion import calcular_metricas, puntuar, cota_inferior
+from perfilado import PerfilEjecucion
+from internado import Catalogo
+from configuracion import ConfiguracionPipeline
+from reparacion import leer_asignaciones, leer_no_asignados, reparar_asignaciones
 
 # Suprimir warnings de openpyxl
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
 # Para evitar la creación de archivos .pyc
 import sys
 sys.dont_write_bytecode = True
@@ -22,165 +34,327 @@ sys.dont_write_bytecode = True
 PATH = "C:/Users/A/Desktop/TFG/src/back/data/prueba1/"
 FILENAME_DISPONIBILIDAD = "disponibilidad_TFG.xlsx"
 FILENAME = "TFGs_presentados_enviar.xlsx"
-FILENAME_TFGS = "TFGs_por_dptos.xlsx"
+FILENAME_TFGS = "TFGs_por_dptos.xlsx"  # solo se escribe si EXPORTAR_TFGS_POR_DPTOS
+EXPORTAR_TFGS_POR_DPTOS = False  # volcar la agrupación intermedia a Excel (depuración)
 # Salida de CSVs por grado
 OUTPUT_DIR = "C:/Users/A/Desktop/TFG/src/back/outputs/prueba1/"
 
-# Parámetros de tribunales
-INIT_FRANJA = 4  # columna donde comienzan las franjas horarias
-NUM_FRANJAS = 6  # número total de franjas horarias
-MAX_ESTUDIANTES_POR_TRIBUNAL = 6  # máximo de estudiantes por tribunal
-MIN_ESTUDIANTES_POR_TRIBUNAL = 4  # mínimo de estudiantes por tribunal
+# Los parámetros de tribunales (tamaño, mínimo/máximo de alumnos, franjas, modo,
+# tiempo del solver, procesos...) se pasan a run_pipeline en una
+# ConfiguracionPipeline (ver configuracion.py).
 
+logger = logging.getLogger(__name__)
 
-# ============================================================================
-# PIPELINE FUNCTION (reutilizable desde API)
-# ============================================================================
-def run_pipeline(input_dir, output_dir, seed=42):
+
+def configurar_logging(nivel=None):
     """
-    Ejecuta el pipeline completo de creación de tribunales.
-    
+    Configura el logging del pipeline.
+
+    Con INFO se muestra el resumen de cada etapa; con DEBUG, además, el detalle
+    por departamento y por tribunal. WARNING equivale a un modo silencioso.
+
     Args:
-        input_dir (str): ruta al directorio con los Excel de entrada
-        output_dir (str): ruta al directorio donde guardar los CSV
-        seed (int): semilla para reproducibilidad
-    
+        nivel (str or int, optional): nivel de logging; por defecto la variable de
+                                      entorno TRIBUNALES_LOG o INFO
+    """
+    nivel = nivel or os.environ.get("TRIBUNALES_LOG", "INFO")
+    if isinstance(nivel, str):
+        nivel = nivel.upper()
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger().setLevel(nivel)
+
+
+def _semilla_departamento(seed, departamento):
+    """
+    Deriva la semilla de un departamento a partir de la semilla de la ejecución.
+
+    random.Random admite cadenas como semilla de forma determinista (no depende
+    de PYTHONHASHSEED), así el resultado no cambia con el número de procesos.
+    """
+    return f"{seed}:{departamento}"
+
+
+def _tribunales_departamento(departamento, disp_depto, num_trib_por_franja, estudiantes, num_estudiantes_dpto, semilla,
+                             config):
+    """
+    Crea los tribunales de un departamento (greedy) y le asigna sus estudiantes.
+
+    Es independiente del resto de departamentos, por lo que puede ejecutarse
+    en otro proceso (ver _procesar_departamentos).
+
+    Args:
+        departamento (int): id del departamento (su nombre está en disp_depto.hoja)
+        disp_depto (DisponibilidadDepto): matriz de disponibilidad del departamento
+        num_trib_por_franja (list): número de tribunales por franja
+        estudiantes (dict): alumno_id → datos (basta con los del departamento)
+        num_estudiantes_dpto (int): número de estudiantes del departamento
+        semilla (str): semilla propia del departamento (ver _semilla_departamento)
+        config (ConfiguracionPipeline): miembros y plazas por tribunal
+
     Returns:
-        dict: estadísticas finales
+        tuple: (turno → list[set de profesores], turno → list[{'profesores', 'alumnos'}])
     """
-    import random
-    import os
-    random.seed(seed)
-    
-    # Crear directorio output si no existe
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Usar input_dir como base
-    path = input_dir
+    # ---- D. Crear tribunales ----
+    tribunales = crear_tribunales_depto(disp_depto, num_trib_por_franja, rng=random.Random(semilla),
+                                        miembros_tribunal=config.miembros_tribunal)
     
-    # 0. AGRUPAR TFGs POR DEPARTAMENTOS
-    print("="*80)
-    print("PASO 0: AGRUPANDO TFGs POR DEPARTAMENTOS")
-    print("="*80)
-    agrupar_tfgs_por_departamentos(path, FILENAME_DISPONIBILIDAD)
+    # Estadísticas de tribunales
+    total_tribunales_creados = sum(len(lista_tribunales) for lista_tribunales in tribunales.values())
+    logger.debug("%s: %d tribunales creados", disp_depto.hoja, total_tribunales_creados)
+    for nombre_turno, lista_tribunales in zip(disp_depto.nombres_turnos, tribunales.values()):
+        logger.debug("  Turno %s: %d tribunal(es)", nombre_turno, len(lista_tribunales))
     
-    print("\n" + "="*80)
-    print("SISTEMA DE CREACIÓN DE TRIBUNALES Y ASIGNACIÓN DE ESTUDIANTES")
-    print("="*80)
+    # ---- E. Asignar estudiantes ----
+    asignacion = asignar_alumnos_a_tribunales(tribunales, estudiantes, departamento,
+                                              max_alumnos=config.max_alumnos)
     
-    # 1. CARGAR DISPONIBILIDAD DE PROFESORES
-    file_disponibilidad = load_disponibilidad(path, FILENAME_DISPONIBILIDAD)
+    # Estadísticas de asignación
+    total_asignados = sum(len(tribunal_data['alumnos'])
+                          for lista_asigs in asignacion.values() for tribunal_data in lista_asigs)
+    logger.debug("%s: %d/%d alumnos asignados", disp_depto.hoja, total_asignados, num_estudiantes_dpto)
+
+    return tribunales, asignacion
+
+
+def _procesar_departamentos(tareas, num_procesos=1):
+    """
+    Ejecuta _tribunales_departamento para cada departamento.
+
+    Args:
+        tareas (list): tuplas de argumentos de _tribunales_departamento (en orden de hoja)
+        num_procesos (int): procesos a usar; con 1 se ejecuta en el proceso actual
+
+    Returns:
+        list: resultados (tribunales, asignacion) en el mismo orden que `tareas`
+    """
+    if num_procesos <= 1 or len(tareas) <= 1:
+        return [_tribunales_departamento(*tarea) for tarea in tareas]
+    with ProcessPoolExecutor(max_workers=min(num_procesos, len(tareas))) as executor:
+        return list(executor.map(_tribunales_departamento, *zip(*tareas)))
+
+
+# ============================================================================
+# ETAPAS DEL PIPELINE
+# ============================================================================
+def _preparar_datos(path, config, perfil=None, todas_las_hojas=False):
+    """
+    Carga los Excel de entrada y prepara todo lo que no depende de la semilla.
+
+    Args:
+        path (str): ruta al directorio con los Excel de entrada
+        config (ConfiguracionPipeline): franjas y plazas por tribunal
+        perfil (PerfilEjecucion, optional): cronómetro de etapas
+        todas_las_hojas (bool): leer también la disponibilidad de los departamentos
+                                sin estudiantes (clave 'disponibilidades_completas',
+                                la usa la reparación incremental)
 
-    # 2. CONSTRUIR MAPEO PROFESOR → DEPARTAMENTO
-    profesor_departamento, profesores_por_dpto = build_profesor_departamento(
-        file_disponibilidad, path, FILENAME_DISPONIBILIDAD
-    )
-    #print(f"    Total de profesores mapeados: {len(profesor_departamento)}")
-    #print(f"    Departamentos: {list(profesores_por_dpto.keys())}")
+    Returns:
+        dict: datos compartidos por todas las ejecuciones (estudiantes,
+              disponibilidades, disponibilidad_profesores, profesor_departamento,
+              estudiantes_por_dpto, tareas por departamento y el catálogo de
+              ids; todo salvo estudiantes_por_dpto usa ids internados)
+    """
+    perfil = perfil or PerfilEjecucion()
+
+    # 0. CARGAR DISPONIBILIDAD DE PROFESORES (cada hoja se parsea una sola vez)
+    with perfil.etapa("lectura_excel"):
+        file_disponibilidad = load_disponibilidad(path, FILENAME_DISPONIBILIDAD)
+        # Las franjas de la configuración deben existir en todas las hojas
+        # (también en las de departamentos sin estudiantes, igual que valida la API)
+        for departamento in get_sheet_names(file_disponibilidad)[:-1]:
+            comprobar_franjas(get_num_columns(read_sheet(file_disponibilidad, departamento)),
+                              config.init_franja, config.num_franjas, departamento)
+
+        # 1. CONSTRUIR MAPEO PROFESOR → DEPARTAMENTO
+        profesor_departamento, profesores_por_dpto = build_profesor_departamento(file_disponibilidad)
+
+    # 2. AGRUPAR TFGs POR DEPARTAMENTOS
+    logger.info("Agrupando TFGs por departamentos")
+    with perfil.etapa("agrupacion"):
+        tfgs_por_dpto = agrupar_tfgs_por_departamentos(
+            file_disponibilidad, path, FILENAME,
+            ruta_exportar=path + FILENAME_TFGS if EXPORTAR_TFGS_POR_DPTOS else None,
+            profesor_departamento=profesor_departamento
+        )
+    
+    logger.info("Creación de tribunales y asignación de estudiantes")
 
-    # 3. CARGAR ESTUDIANTES
-    file_tfgs = load_tfgs_por_dptos(path, FILENAME_TFGS)
-    estudiantes = cargar_estudiantes(file_tfgs)
-    #print(f"    Total de estudiantes cargados: {len(estudiantes)}")
+    # 3. CARGAR ESTUDIANTES (en memoria, sin pasar por TFGs_por_dptos.xlsx)
+    #    A partir de aquí franjas, profesores, departamentos y alumnos son ids enteros
+    catalogo = Catalogo()
+    for departamento in get_sheet_names(file_disponibilidad)[:-1]:
+        catalogo.departamentos.id(departamento)
+    with perfil.etapa("agrupacion"):
+        estudiantes = catalogo.internar_estudiantes(cargar_estudiantes(tfgs_por_dpto))
+        profesor_departamento = catalogo.internar_profesor_departamento(profesor_departamento)
 
     # Contar la cantidad de estudiantes por departamento
     estudiantes_por_dpto = {}
     for _, datos in estudiantes.items():
-        dpto = datos['departamento']
+        dpto = catalogo.departamentos.valor(datos.departamento)
         if dpto not in estudiantes_por_dpto:
             estudiantes_por_dpto[dpto] = 0
         estudiantes_por_dpto[dpto] += 1
-    print("\n" + "="*80)
-    print("ESTADÍSTICAS DE ESTUDIANTES POR DEPARTAMENTO")
-    print("="*80)
-    print(estudiantes_por_dpto)
-
-    #print("    Estudiantes por departamento:")
-    for dpto, count in estudiantes_por_dpto.items():
-        #print(f"      - {dpto}: {count}")
-        pass
+    logger.info("Estudiantes por departamento: %s", estudiantes_por_dpto)
 
     # ========================================================================
     # PROCESAMIENTO POR DEPARTAMENTO
     # ========================================================================
-    todos_tribunales = dict()
-    todas_asignaciones = dict()
+    disponibilidades = dict()  # {departamento: DisponibilidadDepto}
+    disponibilidades_completas = dict()  # también los departamentos sin estudiantes
+    tareas = []  # (departamento, disp_depto, num_trib_por_franja, estudiantes_dpto, num_estudiantes_dpto)
     disponibilidad_profesores = {}  # {turno: {departamento: [(profesor, disponibilidad_count)]}}
     
-    for departamento in get_sheet_names(file_disponibilidad)[:-1]:  # excluir última hoja
-        #print(f"\n{'='*80}")
-        print(f"PROCESANDO DEPARTAMENTO: {departamento}")
-        #print(f"{'='*80}")
-        
-        # ---- A. Calcular número de tribunales necesarios ----
-        num_estudiantes_dpto = estudiantes_por_dpto.get(departamento, 0)
-        
-        if num_estudiantes_dpto == 0:
-            print(f"  No hay estudiantes en este departamento, saltando...")
-            continue
-        
-        num_tribunales_necesarios = (num_estudiantes_dpto + MAX_ESTUDIANTES_POR_TRIBUNAL - 1) // MAX_ESTUDIANTES_POR_TRIBUNAL
-        print(f"\n  Estudiantes: {num_estudiantes_dpto}")
-        print(f"  Tribunales necesarios: {num_tribunales_necesarios}")
-
-        # ---- B. Distribuir tribunales entre franjas ----
-        num_trib_por_franja = distribuir_tribunales(num_tribunales_necesarios, NUM_FRANJAS)
-        print(f"  Distribución por franja: {num_trib_por_franja}")
-
-        # ---- C. Leer disponibilidad del departamento ----
-        df_depto = read_sheet(file_disponibilidad, departamento, header=[0, 1, 2])
-        num_profesores = get_num_rows(df_depto)
-        print(f"  Profesores disponibles: {num_profesores}")
+    with perfil.etapa("disponibilidad"):
+        for departamento in get_sheet_names(file_disponibilidad)[:-1]:  # excluir última hoja
+            id_dpto = catalogo.departamentos.id(departamento)
+            logger.debug("Procesando departamento: %s", departamento)
         
-        # Extraer disponibilidad de profesores por turno
-        keys = df_depto.keys()
-        turnos = keys[INIT_FRANJA:INIT_FRANJA + NUM_FRANJAS]
-        for i in range(df_depto.shape[0]):
-            correo = df_depto[keys[1]][i]
-            disponible_en = []
-            for turno in turnos:
-                if df_depto[turno][i] == "Sí":
-                    disponible_en.append(turno)
-            
-            # Guardar disponibilidad por turno
-            for turno in disponible_en:
-                if turno not in disponibilidad_profesores:
-                    disponibilidad_profesores[turno] = {}
-                if departamento not in disponibilidad_profesores[turno]:
-                    disponibilidad_profesores[turno][departamento] = []
-                # Guardar (profesor, número de turnos disponibles)
-                disponibilidad_profesores[turno][departamento].append((correo, len(disponible_en)))
-
-        # ---- D. Crear tribunales ----
-        #print(f"\n  Creando tribunales...")
-        tribunales = crear_tribunales_depto(df_depto, INIT_FRANJA, num_trib_por_franja)
-        
-        # Estadísticas de tribunales
-        total_tribunales_creados = sum(len(lista_tribunales) for lista_tribunales in tribunales.values())
-        print(f"    Total tribunales creados: {total_tribunales_creados}")
-        for turno, lista_tribunales in tribunales.items():
-            print(f"Tribunal turno {turno}: {len(lista_tribunales)} tribunal(es)")
-        
-        # ---- E. Asignar estudiantes ----
-        #print(f"\n  Asignando estudiantes...")
-        asignacion = asignar_alumnos_a_tribunales(tribunales, estudiantes, departamento)
-        #print(asignacion)
+            # ---- A. Calcular número de tribunales necesarios ----
+            num_estudiantes_dpto = estudiantes_por_dpto.get(departamento, 0)
         
-        # Estadísticas de asignación
-        total_asignados = sum(len(tribunal_data['alumnos']) for lista_asigs in asignacion.values() for tribunal_data in lista_asigs)
-        print(f"    Total asignados: {total_asignados}/{num_estudiantes_dpto}")
+            if num_estudiantes_dpto == 0 and not todas_las_hojas:
+                logger.debug("  No hay estudiantes en este departamento, saltando...")
+                continue
+
+            # ---- C. Leer disponibilidad del departamento (ya parseada en el libro) ----
+            df_depto = read_sheet(file_disponibilidad, departamento)
+            num_profesores = get_num_rows(df_depto)
+            logger.debug("  Profesores disponibles: %d", num_profesores)
         
-        # Guardar resultados
-        todos_tribunales[departamento] = tribunales
-        todas_asignaciones[departamento] = asignacion
+            # Matriz de disponibilidad profesor × franja (una vez por hoja), con ids
+            disp_depto = catalogo.internar_disponibilidad(
+                DisponibilidadDepto(df_depto, config.init_franja, config.num_franjas, departamento)
+            )
+            disponibilidades_completas[id_dpto] = disp_depto
+
+            if num_estudiantes_dpto == 0:
+                continue
+
+            num_tribunales_necesarios = (num_estudiantes_dpto + config.max_alumnos - 1) // config.max_alumnos
+            logger.debug("  Estudiantes: %d, tribunales necesarios: %d",
+                         num_estudiantes_dpto, num_tribunales_necesarios)
+
+            # ---- B. Distribuir tribunales entre franjas ----
+            num_trib_por_franja = distribuir_tribunales(num_tribunales_necesarios, config.num_franjas)
+            logger.debug("  Distribución por franja: %s", num_trib_por_franja)
+
+            # Guardar disponibilidad por turno: (profesor, número de turnos disponibles)
+            for turno, profesores_turno in disp_depto.por_turno().items():
+                disponibilidad_profesores.setdefault(turno, {})[id_dpto] = profesores_turno
+            disponibilidades[id_dpto] = disp_depto
+
+            # ---- D/E. Crear tribunales y asignar estudiantes (se ejecuta en _resolver) ----
+            estudiantes_dpto = {k: v for k, v in estudiantes.items() if v.departamento == id_dpto}
+            tareas.append((id_dpto, disp_depto, num_trib_por_franja, estudiantes_dpto, num_estudiantes_dpto))
+
+    return {
+        'estudiantes': estudiantes,
+        'estudiantes_por_dpto': estudiantes_por_dpto,
+        'disponibilidades': disponibilidades,
+        'disponibilidades_completas': disponibilidades_completas,
+        'disponibilidad_profesores': disponibilidad_profesores,
+        'profesor_departamento': profesor_departamento,
+        'tareas': tareas,
+        'catalogo': catalogo,
+    }
+
+
+def _resolver(datos, seed, config, perfil=None, pesos_objetivo=None):
+    """
+    Forma tribunales y asigna alumnos para una semilla concreta.
+
+    En modo exacto se calcula también la solución greedy: se entrega al solver
+    como pista de partida y, si lo que devuelve el solver puntúa peor (p. ej.
+    una solución factible pero trivial porque el tiempo no da para más), se
+    usa la greedy. Así el resultado nunca es peor que el del modo greedy.
+
+    Args:
+        datos (dict): salida de _preparar_datos
+        seed (int): semilla de esta ejecución
+        config (ConfiguracionPipeline): modo, límites del solver, plazas por tribunal
+                                        y procesos para el greedy por departamento
+        perfil (PerfilEjecucion, optional): cronómetro de etapas
+        pesos_objetivo (dict, optional): pesos de evaluacion.puntuar para comparar
+                                         la solución exacta con la greedy
+
+    Returns:
+        dict: turno → list[{'profesores': set, 'alumnos': dict}]
+    """
+    perfil = perfil or PerfilEjecucion()
+    asignaciones_greedy = _resolver_greedy(datos, seed, config, perfil)
+    if config.modo != "exacto":
+        return asignaciones_greedy
+
+    # ========================================================================
+    # MODO EXACTO: FORMACIÓN Y ASIGNACIÓN CONJUNTAS
+    # ========================================================================
+    logger.info("Resolviendo modelo exacto (CP-SAT)")
+    with perfil.etapa("modelo_exacto"):
+        asignaciones = resolver_tribunales_exacto(
+            datos['disponibilidades'], datos['estudiantes'],
+            min_alumnos=config.min_alumnos,
+            max_alumnos=config.max_alumnos,
+            miembros_tribunal=config.miembros_tribunal,
+            limite_tiempo=config.limite_tiempo, seed=seed,
+            num_workers=config.hilos_solver,
+            pista=asignaciones_greedy
+        )
+    if asignaciones is None:
+        logger.warning("El solver no encontró solución a tiempo; se usa el modo greedy.")
+        return asignaciones_greedy
+
+    puntuaciones = [
+        puntuar(calcular_metricas(candidata, datos['estudiantes'], datos['disponibilidades'],
+                                  config.min_alumnos), pesos_objetivo)
+        for candidata in (asignaciones, asignaciones_greedy)
+    ]
+    if puntuaciones[0] > puntuaciones[1]:
+        logger.warning("La solución del solver (puntuación %s) es peor que la greedy (%s); "
+                       "se usa la greedy. Considera aumentar limite_tiempo.", *puntuaciones)
+        return asignaciones_greedy
+    return asignaciones
+
+
+def _resolver_greedy(datos, seed, config, perfil):
+    """
+    Greedy por departamento + rebalanceo para una semilla concreta.
+
+    Toda la aleatoriedad sale de generadores random.Random propios de la
+    ejecución (uno para el rebalanceo y uno por departamento), sin tocar el
+    estado global del módulo random, así que varias ejecuciones pueden correr
+    en hilos a la vez con el mismo resultado que en serie (salvo perfilar=True,
+    que admite una sola ejecución a la vez por proceso; ver perfilado.py).
+
+    Args:
+        datos (dict): salida de _preparar_datos
+        seed (int): semilla de esta ejecución
+        config (ConfiguracionPipeline): plazas por tribunal y procesos por departamento
+        perfil (PerfilEjecucion): cronómetro de etapas
+
+    Returns:
+        dict: turno → list[{'profesores': set, 'alumnos': dict}]
+    """
+    rng = random.Random(seed)
+    estudiantes = datos['estudiantes']
+
+    # ========================================================================
+    # GREEDY POR DEPARTAMENTO
+    # ========================================================================
+    # Cada departamento con su semilla derivada, en paralelo o en serie si num_procesos == 1
+    # (la semilla se deriva del nombre del departamento, no de su id)
+    departamentos = datos['catalogo'].departamentos
+    tareas = [tarea + (_semilla_departamento(seed, departamentos.valor(tarea[0])), config)
+              for tarea in datos['tareas']]
+    todas_asignaciones = dict()
+    with perfil.etapa("tribunales_departamentos"):
+        for tarea, (tribunales, asignacion) in zip(tareas, _procesar_departamentos(tareas, config.num_procesos)):
+            todas_asignaciones[tarea[0]] = asignacion
 
     # ========================================================================
     # REBALANCEO DE TRIBUNALES
     # ========================================================================
-    #print(f"\n{'='*80}")
-    #print("REBALANCEANDO TRIBUNALES CON POCOS ALUMNOS")
-    #print(f"{'='*80}")
-    
+
     # Crear diccionario plano: turno → list[{'profesores': set, 'alumnos': dict}]
     asignaciones = {}
     for dept, asig in todas_asignaciones.items():
@@ -193,34 +367,131 @@ def run_pipeline(input_dir, output_dir, seed=42):
                     'profesores': tribunal_data['profesores'],
                     'alumnos': tribunal_data['alumnos']
                 })
-    
+
     # Rebalancear con estructura simplificada
-    asignaciones = rebalancear_tribunales(asignaciones, estudiantes, 
-                                          disponibilidad_profesores, profesor_departamento)
-    
-    print(f"\n{'='*80}")
-    print("REBALANCEO COMPLETADO")
-    print(f"{'='*80}\n")
-    
-    # Imprimir asignaciones de forma estética
-    print("DETALLES DE ASIGNACIONES POR TURNO:")
-    print("-" * 80)
-    for turno, lista_tribunales in asignaciones.items():
-        print(f"\n  Turno: {turno}")
-        for idx_trib, tribunal in enumerate(lista_tribunales, 1):
-            profes = list(tribunal['profesores'])
-            alumnos = tribunal['alumnos']
-            print(f"    Tribunal {idx_trib}:")
-            print(f"      Profesores ({len(profes)}): {', '.join(profes[:3])}" + 
-                  (f", ..." if len(profes) > 3 else ""))
-            print(f"      Alumnos ({len(alumnos)}): {list(alumnos.keys())[:3]}" + 
-                  (f", ..." if len(alumnos) > 3 else ""))
+    with perfil.etapa("rebalanceo"):
+        asignaciones = rebalancear_tribunales(asignaciones, estudiantes,
+                                              datos['disponibilidad_profesores'], datos['profesor_departamento'],
+                                              min_alumnos=config.min_alumnos,
+                                              max_alumnos=config.max_alumnos, rng=rng)
+
+    logger.info("Rebalanceo completado")
+
+    return asignaciones
+
+
+# Datos compartidos por los procesos del multiarranque (se envían una vez por proceso)
+_datos_trabajador = None
+
+
+def _inicializar_trabajador(datos):
+    """Guarda en el proceso trabajador los datos ya preparados."""
+    global _datos_trabajador
+    _datos_trabajador = datos
+
+
+def _resolver_en_trabajador(seed, config, pesos_objetivo):
+    """Resuelve una semilla con los datos del proceso trabajador."""
+    return _resolver(_datos_trabajador, seed, config, pesos_objetivo=pesos_objetivo)
+
+
+def _multiarranque(datos, seed, config, pesos_objetivo):
+    """
+    Ejecuta varias semillas y se queda con la mejor solución.
+
+    Las semillas son seed, seed+1, ..., seed+num_semillas-1 y se reparten entre
+    `config.num_procesos` procesos (cada semilla resuelve sus departamentos en
+    serie). Los resultados se revisan en orden de semilla y, en cuanto una
+    solución alcanza la cota inferior del objetivo, se cancelan
+    las pendientes; así la solución elegida no depende de qué proceso termine antes.
+
+    Args:
+        datos (dict): salida de _preparar_datos
+        seed (int): primera semilla
+        config (ConfiguracionPipeline): número de semillas, procesos y parámetros de cada ejecución
+        pesos_objetivo (dict or None): pesos de evaluacion.puntuar
+
+    Returns:
+        tuple: (asignaciones, semilla elegida, métricas, puntuación, semillas evaluadas)
+    """
+    semillas = [seed + i for i in range(config.num_semillas)]
+    num_procesos = config.num_procesos
+    config = config.reemplazar(num_procesos=1)
+    cota = cota_inferior(datos['disponibilidades'], pesos_objetivo)
+    mejor = None
+    evaluadas = 0
+
+    def considerar(semilla, asignaciones):
+        nonlocal mejor, evaluadas
+        evaluadas += 1
+        metricas = calcular_metricas(asignaciones, datos['estudiantes'], datos['disponibilidades'],
+                                     config.min_alumnos)
+        puntuacion = puntuar(metricas, pesos_objetivo)
+        logger.debug("Semilla %s: puntuación %s %s", semilla, puntuacion, metricas)
+        if mejor is None or puntuacion < mejor[3]:
+            mejor = (asignaciones, semilla, metricas, puntuacion)
+        return puntuacion <= cota
+
+    logger.info("Multiarranque: %d semillas (cota inferior %s)", config.num_semillas, cota)
+    if num_procesos <= 1:
+        for semilla in semillas:
+            if considerar(semilla, _resolver(datos, semilla, config, pesos_objetivo=pesos_objetivo)):
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=num_procesos, initializer=_inicializar_trabajador,
+                                 initargs=(datos,)) as executor:
+            futuros = [executor.submit(_resolver_en_trabajador, semilla, config, pesos_objetivo)
+                       for semilla in semillas]
+            for semilla, futuro in zip(semillas, futuros):
+                if considerar(semilla, futuro.result()):
+                    for pendiente in futuros:
+                        pendiente.cancel()
+                    break
+
+    return mejor + (evaluadas,)
+
+
+def _finalizar(datos, asignaciones, metricas, puntuacion, seed, config, perfil, output_dir, zip_salida,
+               extra=None):
+    """
+    Calcula las estadísticas finales y exporta la asignación (CSV o ZIP).
+
+    Args:
+        datos (dict): salida de _preparar_datos (se usa su catálogo)
+        asignaciones (dict): turno → list[{'profesores': set, 'alumnos': dict}] con ids
+        metricas (dict): salida de evaluacion.calcular_metricas
+        puntuacion (float): salida de evaluacion.puntuar
+        seed (int or None): semilla usada
+        config (ConfiguracionPipeline): configuración de la ejecución
+        perfil (PerfilEjecucion): cronómetro de etapas (se detiene al terminar)
+        output_dir (str): directorio de los CSV (si no hay zip_salida)
+        zip_salida (str or file): ZIP de salida o None
+        extra (dict, optional): entradas adicionales de las estadísticas
+
+    Returns:
+        dict: estadísticas (incluye 'rendimiento')
+    """
+    # Vuelta de ids a correos, franjas y trabajos originales para mostrar y exportar
+    catalogo = datos['catalogo']
+    exportables = catalogo.traducir_asignaciones(asignaciones)
+    # Los alumnos sin tribunal se exportan aparte (sin_asignar.csv) para que una
+    # reparación posterior sepa que ya estaban sin asignar
+    asignados = {a for lista in asignaciones.values() for trib in lista for a in trib['alumnos']}
+    no_asignados = {alumno.trabajo: catalogo.traducir_alumno(alumno)
+                    for a, alumno in datos['estudiantes'].items() if a not in asignados}
+
+    # Detalle de asignaciones (solo se recorre si se va a mostrar)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Detalles de asignaciones por turno:")
+        for turno, lista_tribunales in exportables.items():
+            logger.debug("  Turno: %s", turno)
+            for idx_trib, tribunal in enumerate(lista_tribunales, 1):
+                profes = list(tribunal['profesores'])
+                alumnos = tribunal['alumnos']
+                logger.debug("    Tribunal %d: profesores (%d) %s%s; alumnos (%d) %s%s",
+                             idx_trib, len(profes), ", ".join(profes[:3]), ", ..." if len(profes) > 3 else "",
+                             len(alumnos), list(alumnos.keys())[:3], ", ..." if len(alumnos) > 3 else "")
 
-    # ========================================================================
-    # EXPORTAR CSV POR GRADO
-    # ========================================================================
-    exportar_csv_por_grado(asignaciones, output_dir)
-    
     # ========================================================================
     # CALCULAR ESTADÍSTICAS FINALES
     # ========================================================================
@@ -240,7 +511,7 @@ def run_pipeline(input_dir, output_dir, seed=42):
             if num_prof > 0:
                 if num_alum == 0:
                     tribunales_vacios += 1
-                elif num_alum >= 4:
+                elif num_alum >= config.min_alumnos:
                     tribunales_completos += 1
                 
                 total_tribunales += 1
@@ -252,27 +523,183 @@ def run_pipeline(input_dir, output_dir, seed=42):
         'tribunales_optimos': tribunales_completos,
         'tribunales_vacios': tribunales_vacios,
         'total_alumnos_asignados': total_alumnos_asignados,
-        'promedio_alumnos_tribunal': round(total_alumnos_asignados / total_tribunales, 2) if total_tribunales > 0 else 0
+        'promedio_alumnos_tribunal': (round(total_alumnos_asignados / total_tribunales, 2)
+                                      if total_tribunales > 0 else 0),
+        'semilla': seed,
+        'alumnos_sin_asignar': metricas['sin_asignar'],
+        'tribunales_bajo_minimo': metricas['bajo_minimo'],
+        'dispersion_participacion': metricas['dispersion_participacion'],
+        'puntuacion': puntuacion,
+        'configuracion': config.a_dict(),
     }
+    stats.update(extra or {})
+    
+    logger.info("Estadísticas globales: %d tribunales activos, %d óptimos (>=%d alumnos), %d vacíos, "
+                "%d alumnos asignados, %s alumnos/tribunal de promedio",
+                stats['total_tribunales'], stats['tribunales_optimos'], config.min_alumnos, stats['tribunales_vacios'],
+                stats['total_alumnos_asignados'], stats['promedio_alumnos_tribunal'])
+
+    # ========================================================================
+    # EXPORTAR CSV POR GRADO
+    # ========================================================================
+    def estadisticas_con_rendimiento():
+        stats['rendimiento'] = perfil.resumen()
+        return stats
+
+    with perfil.etapa("exportacion"):
+        if zip_salida is not None:
+            # estadisticas.json se escribe al final del ZIP, con los CSV ya medidos
+            exportar_zip(exportables, zip_salida, estadisticas_con_rendimiento, no_asignados)
+        else:
+            exportar_resultados(exportables, output_dir, no_asignados=no_asignados)
+    estadisticas_con_rendimiento()
+    perfil.detener()
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Tiempo por etapa: %s", ", ".join(
+            f"{nombre} {datos['segundos']:.3f}s" for nombre, datos in stats['rendimiento']['etapas'].items()
+        ))
+    
+    return stats
+
+
+# ============================================================================
+# PIPELINE FUNCTION (reutilizable desde API)
+# ============================================================================
+def run_pipeline(input_dir, output_dir, seed=42, config=None, pesos_objetivo=None, zip_salida=None,
+                 perfilar=False, **opciones):
+    """
+    Ejecuta el pipeline completo de creación de tribunales.
+
+    Los parámetros de la ejecución vienen de `config`; los campos sueltos en
+    `opciones` (p. ej. modo="exacto", num_procesos=4) los sustituyen, de modo que
+    las llamadas antiguas siguen funcionando:
+
+        - modo: "greedy" (por departamento + rebalanceo) o "exacto" (CP-SAT, ver optimizacion_exacta)
+        - num_procesos: procesos para los departamentos (o las semillas si num_semillas > 1);
+          cada departamento usa una semilla derivada de `seed`, así que el
+          resultado no depende de este valor
+        - num_semillas: si es > 1, se prueban seed..seed+num_semillas-1 y se devuelve
+          la mejor según evaluacion.puntuar
+    
+    Args:
+        input_dir (str): ruta al directorio con los Excel de entrada
+        output_dir (str): ruta al directorio donde guardar los CSV (None si se usa zip_salida)
+        seed (int): semilla para reproducibilidad
+        config (ConfiguracionPipeline, optional): parámetros de la ejecución
+                                                  (por defecto ConfiguracionPipeline())
+        pesos_objetivo (dict, optional): pesos del objetivo del multiarranque
+                                         (por defecto evaluacion.PESOS_OBJETIVO)
+        zip_salida (str or file, optional): si se indica, los CSV y estadisticas.json
+                                            se escriben directamente en este ZIP en
+                                            lugar de en output_dir
+        perfilar (bool): medir además el pico de memoria por etapa (tracemalloc) y
+                         las funciones más costosas (cProfile); los tiempos por
+                         etapa se miden siempre. Solo una ejecución perfilada a
+                         la vez por proceso (ver perfilado.py)
+        **opciones: campos de ConfiguracionPipeline que sustituyen a los de `config`
+    
+    Returns:
+        dict: estadísticas finales (incluye 'rendimiento', ver perfilado.PerfilEjecucion,
+              y 'configuracion', la configuración usada)
+
+    Raises:
+        ValueError: si la configuración no es válida
+        RuntimeError: si perfilar=True y ya hay otra ejecución perfilada en el proceso
+    """
+    config = config or ConfiguracionPipeline()
+    if opciones:
+        config = config.reemplazar(**opciones)
     
-    print(f"\n{'='*80}")
-    print("ESTADÍSTICAS GLOBALES")
-    print(f"{'='*80}")
-    print(f"  Total tribunales activos: {stats['total_tribunales']}")
-    print(f"  Tribunales optimos (>=4 alumnos): {stats['tribunales_optimos']}")
-    print(f"  Tribunales vacios: {stats['tribunales_vacios']}")
-    print(f"  Total alumnos asignados: {stats['total_alumnos_asignados']}")
-    print(f"  Promedio alumnos/tribunal: {stats['promedio_alumnos_tribunal']}")
+    # Crear directorio output si no existe
+    if zip_salida is None:
+        os.makedirs(output_dir, exist_ok=True)
     
-    print(f"\n{'='*80}")
-    print("PROCESO COMPLETADO")
-    print(f"{'='*80}\n")
+    # El perfil se detiene también si falla la ejecución (tracemalloc y cProfile
+    # quedarían activos en el proceso trabajador de la API)
+    with PerfilEjecucion(perfilar) as perfil:
+        # Usar input_dir como base
+        datos = _preparar_datos(input_dir, config, perfil)
+
+        if config.num_semillas > 1:
+            # Las etapas internas de cada semilla no se desglosan
+            with perfil.etapa("multiarranque"):
+                asignaciones, seed, metricas, puntuacion, evaluadas = _multiarranque(
+                    datos, seed, config, pesos_objetivo
+                )
+            logger.info("Mejor semilla: %s (puntuación %s, %d evaluadas)", seed, puntuacion, evaluadas)
+        else:
+            asignaciones = _resolver(datos, seed, config, perfil, pesos_objetivo)
+            with perfil.etapa("evaluacion"):
+                metricas = calcular_metricas(asignaciones, datos['estudiantes'], datos['disponibilidades'],
+                                             config.min_alumnos)
+                puntuacion = puntuar(metricas, pesos_objetivo)
+
+        stats = _finalizar(datos, asignaciones, metricas, puntuacion, seed, config, perfil, output_dir, zip_salida)
+
+    logger.info("Proceso completado")
     
     return stats
 
 
+def run_reparacion(input_dir, asignacion_previa, output_dir, config=None, zip_salida=None, perfilar=False,
+                   **opciones):
+    """
+    Repara una asignación ya publicada con los Excel de entrada actualizados,
+    tocando solo los tribunales afectados (ver reparacion.py).
+
+    Mucho más rápido que run_pipeline y, sobre todo, estable: los tribunales a
+    los que no afectan los cambios conservan franja, número, profesores y alumnos.
+
+    Args:
+        input_dir (str): ruta al directorio con los Excel de entrada actualizados
+        asignacion_previa (str): ZIP de resultados o carpeta con los CSV de la
+                                 asignación anterior
+        output_dir (str): directorio donde guardar los CSV (None si se usa zip_salida)
+        config (ConfiguracionPipeline, optional): miembros y plazas por tribunal, franjas
+        zip_salida (str or file, optional): ZIP de salida en lugar de output_dir
+        perfilar (bool): medir además memoria por etapa y funciones (ver run_pipeline)
+        **opciones: campos de ConfiguracionPipeline que sustituyen a los de `config`
+
+    Returns:
+        dict: estadísticas como las de run_pipeline más 'reparacion' (resumen de cambios)
+
+    Raises:
+        ValueError: si la configuración o la asignación previa no son válidas
+    """
+    config = config or ConfiguracionPipeline()
+    if opciones:
+        config = config.reemplazar(**opciones)
+    if zip_salida is None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with PerfilEjecucion(perfilar) as perfil:
+        with perfil.etapa("lectura_asignacion_previa"):
+            previas = leer_asignaciones(asignacion_previa)
+            no_asignados = leer_no_asignados(asignacion_previa)
+        datos = _preparar_datos(input_dir, config, perfil, todas_las_hojas=True)
+
+        with perfil.etapa("reparacion"):
+            asignaciones, resumen = reparar_asignaciones(
+                previas, datos['estudiantes'], datos['catalogo'], datos['disponibilidades_completas'],
+                datos['profesor_departamento'], config, no_asignados
+            )
+        logger.info("Reparación: %s", resumen)
+
+        with perfil.etapa("evaluacion"):
+            metricas = calcular_metricas(asignaciones, datos['estudiantes'], datos['disponibilidades'],
+                                         config.min_alumnos)
+            puntuacion = puntuar(metricas)
+
+        stats = _finalizar(datos, asignaciones, metricas, puntuacion, None, config, perfil, output_dir,
+                           zip_salida, extra={'reparacion': resumen})
+    logger.info("Reparación completada")
+    return stats
+
+
 def main():
-    #Ejecuta el pipeline con configuraci�n por defecto.
+    # Ejecuta el pipeline con configuración por defecto.
+    configurar_logging()
     run_pipeline(PATH, OUTPUT_DIR, seed=42)
 
 
@@ -1,5 +1,28 @@
+import re
+
 import pandas as pd
 
+# Nombres entre paréntesis tras cada correo (pueden llevar guiones y espacios)
+_NOMBRE = re.compile(r"\([^)]*\)")
+# Separadores entre correos una vez quitados los nombres
+_SEPARADOR = re.compile(r"[\s;,]+")
+
+
+def _separar_pegados(parte):
+    """
+    Separa correos unidos solo por "-" y sin nombre entre paréntesis
+    ("a@x.es-b@y.es"). Un trozo sin "@" se une al anterior, así que los
+    guiones dentro de un correo se conservan.
+    """
+    correos = []
+    for trozo in parte.split("-"):
+        if correos and ("@" not in trozo or "@" not in correos[-1]):
+            correos[-1] += "-" + trozo
+        else:
+            correos.append(trozo)
+    return [correo for correo in correos if correo]
+
+
 def extraer_correos(campo):
     """
     Recibe una cadena del tipo:
@@ -7,43 +30,44 @@ def extraer_correos(campo):
         "brios@fi.upm.es(...)-f.perozo@repsol.com(...)"
     Devuelve:
         [correo_tutor]  o  [correo_tutor, correo_cotutor]
+
+    El separador entre tutor y cotutor es el "-" que sigue al paréntesis del
+    nombre, no cualquier guion: un correo como "jose-luis.garcia@upm.es" no se parte.
     """
     if pd.isna(campo):
         return []
 
-    partes = campo.split("-")   # separa tutor y cotutor si existe
     correos = []
-
-    for parte in partes:
-        correo = parte.split("(")[0]   # extrae lo que está antes de "("
-        correo = correo.strip()
-        if correo:
-            correos.append(correo)
+    for parte in _SEPARADOR.split(_NOMBRE.sub(" ", str(campo))):
+        parte = parte.strip("-")   # el "-" que separa tutor y cotutor
+        if not parte:
+            continue
+        if parte.count("@") > 1:
+            correos.extend(_separar_pegados(parte))
+        else:
+            correos.append(parte)
 
     return correos
 
 
-def build_profesor_departamento(df_xls, path, filename):
+def build_profesor_departamento(libro):
     """
     Construye mapeo profesor → departamento a partir del Excel de disponibilidad.
     
     Args:
-        df_xls (pd.ExcelFile): objeto ExcelFile con disponibilidad
-        path (str): ruta a la carpeta
-        filename (str): nombre del archivo
+        libro (LibroExcel): libro de disponibilidad ya cargado (hojas con encabezado de 3 filas)
     
     Returns:
         tuple: (profesor_departamento dict, profesores_por_dpto dict)
     """
     profesor_departamento = {}
     profesores_por_dpto = {}
-    for sheet in df_xls.sheet_names[:-1]:
-        pf = pd.read_excel(path + filename, header=[0,1,2], sheet_name=sheet)
-        keys_pf = pf.keys()
-        lista = []
-        for i in range(pf.shape[0]):
-            correo = pf[keys_pf[1]][i]
-            profesor_departamento[correo] = sheet
-            lista.append(correo)
+    for sheet in libro.sheet_names[:-1]:
+        pf = libro.hoja(sheet)
+        lista = list(pf[pf.keys()[1]])
+        for correo in lista:
+            if isinstance(correo, str):
+                # Si un profesor aparece en varias hojas prevalece la primera
+                profesor_departamento.setdefault(correo.strip(), sheet)
         profesores_por_dpto[sheet] = lista
     return profesor_departamento, profesores_por_dpto
\ No newline at end of file
@@ -1,6 +1,26 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+"""
+Medición de rendimiento del pipeline.
 
+Sin argumentos mide el caso real data/prueba1/. Con --barrido genera datos
+sintéticos de tamaño creciente (ver generar_datos.py), ejecuta el pipeline
+sobre cada uno y guarda un informe JSON + CSV comparable entre versiones:
+
+    python medir_rendimiento.py --barrido --tamanos 28,200,1000,5000 --repeticiones 3
+
+Con --exportacion mide solo la exportación de una asignación sintética con
+muchos grados, con distintos números de hilos de escritura (exportar.py):
+
+    python medir_rendimiento.py --exportacion --grados 60 --alumnos-por-grado 500 --hilos 1,2,4,8
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import platform
+import statistics
 import time
 import sys
 import os
@@ -10,40 +30,240 @@ import warnings
 # Suprimir warnings
 warnings.filterwarnings("ignore")
 
+# Rutas relativas a la carpeta del script (sin os.chdir, que afectaría a todo el proceso)
+DIRECTORIO_BASE = os.path.dirname(os.path.abspath(__file__))
+
 # Agregar al path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRECTORIO_BASE)
+
+import data_io
+from exportar import exportar_resultados, exportar_zip
+from main import configurar_logging, run_pipeline
+from configuracion import ConfiguracionPipeline
+from generar_datos import generar_datos
 
-from main import run_pipeline
+# Escenarios del barrido: número de TFGs → (departamentos, profesores por departamento).
+# El tamaño de plantilla crece con los TFGs para que siga habiendo profesores libres.
+ESCENARIOS = {
+    28: (4, 50),
+    200: (8, 60),
+    1000: (12, 100),
+    2500: (16, 130),
+    5000: (20, 160),
+}
 
-# Cambiar directorio
-os.chdir(os.path.dirname(os.path.abspath(__file__)))
+# Métricas de calidad copiadas de las estadísticas al informe
+METRICAS_CALIDAD = [
+    'total_tribunales', 'tribunales_vacios', 'total_alumnos_asignados', 'alumnos_sin_asignar',
+    'tribunales_bajo_minimo', 'dispersion_participacion', 'puntuacion',
+]
 
-def medir_rendimiento(nombre_prueba, directorio_datos, directorio_salida):
+
+def medir_rendimiento(nombre_prueba, directorio_datos, directorio_salida, **opciones):
     """Mide el rendimiento del pipeline"""
     if os.path.exists(directorio_salida):
         shutil.rmtree(directorio_salida)
     os.makedirs(directorio_salida, exist_ok=True)
-    
+
     # Ejecutar
     inicio = time.time()
-    estadisticas = run_pipeline(directorio_datos, directorio_salida, seed=42)
+    estadisticas = run_pipeline(directorio_datos, directorio_salida, seed=42, **opciones)
     tiempo_transcurrido = time.time() - inicio
-    
+
     return tiempo_transcurrido, estadisticas
 
-if __name__ == "__main__":
-    print("\n" + "="*70)
-    print("MEDICIÓN DE RENDIMIENTO - SISTEMA DE ASIGNACIÓN DE TRIBUNALES")
-    print("="*70)
-    
+
+def _escenario(num_tfgs):
+    """Departamentos y profesores por departamento para un tamaño dado."""
+    if num_tfgs in ESCENARIOS:
+        return ESCENARIOS[num_tfgs]
+    # Tamaños intermedios: se usa el escenario definido más cercano por arriba
+    for tamano in sorted(ESCENARIOS):
+        if num_tfgs <= tamano:
+            return ESCENARIOS[tamano]
+    return ESCENARIOS[max(ESCENARIOS)]
+
+
+def ejecutar_barrido(tamanos, directorio_trabajo, repeticiones=1, modo="greedy", perfilar=False,
+                     cache_parseo=False, densidad=0.5, ratio_cotutor=0.2, config=None):
+    """
+    Ejecuta el pipeline sobre datos sintéticos de varios tamaños.
+
+    Args:
+        tamanos (list[int]): números de TFGs a probar
+        directorio_trabajo (str): carpeta para los datos generados y las salidas
+        repeticiones (int): ejecuciones por tamaño (se informa la mediana)
+        modo (str): modo de run_pipeline
+        perfilar (bool): medir el pico de memoria por etapa (run_pipeline(perfilar=True))
+        cache_parseo (bool): permitir la caché de parseo de data_io entre repeticiones
+        densidad (float): probabilidad de disponibilidad por franja
+        ratio_cotutor (float): fracción de TFGs con cotutor
+        config (ConfiguracionPipeline, optional): parámetros del pipeline (`modo` tiene prioridad)
+
+    Returns:
+        list[dict]: una fila por tamaño con tiempos, memoria y calidad
+    """
+    if not cache_parseo:
+        data_io.CACHE_PARSEO_DIR = ""
+
+    filas = []
+    for num_tfgs in tamanos:
+        num_departamentos, profesores_por_dpto = _escenario(num_tfgs)
+        directorio_datos = os.path.join(
+            directorio_trabajo, f"datos_{num_tfgs}_d{densidad}_c{ratio_cotutor}"
+        ) + "/"
+        if not os.path.exists(os.path.join(directorio_datos, "TFGs_presentados_enviar.xlsx")):
+            generar_datos(directorio_datos, num_departamentos, profesores_por_dpto, num_tfgs,
+                          densidad=densidad, ratio_cotutor=ratio_cotutor)
+
+        print(f"  {num_tfgs} TFGs ({num_departamentos} departamentos × {profesores_por_dpto} profesores)...")
+        tiempos = []
+        estadisticas = None
+        for _ in range(repeticiones):
+            if not cache_parseo:
+                data_io._cache_parseo.clear()
+            tiempo, estadisticas = medir_rendimiento(
+                f"sintetico_{num_tfgs}", directorio_datos,
+                os.path.join(directorio_trabajo, f"salida_{num_tfgs}") + "/",
+                config=config, modo=modo, perfilar=perfilar
+            )
+            tiempos.append(tiempo)
+
+        # Desglose por etapa y calidad de la última repetición; el total es la mediana
+        rendimiento = estadisticas['rendimiento']
+        fila = {
+            'num_tfgs': num_tfgs,
+            'num_departamentos': num_departamentos,
+            'profesores_por_dpto': profesores_por_dpto,
+            'modo': modo,
+            'repeticiones': repeticiones,
+            'tiempo_total_s': round(statistics.median(tiempos), 4),
+            'tiempo_min_s': round(min(tiempos), 4),
+            'memoria_maxima_mb': rendimiento['memoria_maxima_mb'],
+        }
+        for etapa, datos in rendimiento['etapas'].items():
+            fila[f"tiempo_{etapa}_s"] = datos['segundos']
+            if 'memoria_pico_mb' in datos:
+                fila[f"memoria_{etapa}_mb"] = datos['memoria_pico_mb']
+        for metrica in METRICAS_CALIDAD:
+            fila[metrica] = estadisticas.get(metrica)
+        filas.append(fila)
+        print(f"    {fila['tiempo_total_s']:.3f} s, {fila['alumnos_sin_asignar']} sin asignar, "
+              f"puntuación {fila['puntuacion']}")
+    return filas
+
+
+def _asignacion_sintetica(num_grados, alumnos_por_grado, alumnos_por_tribunal=5):
+    """
+    Asignación ya traducida (la que recibe exportar.py) con muchos grados,
+    construida directamente para medir la exportación sin ejecutar el pipeline.
+    """
+    asignaciones = {}
+    num_tribunal = 0
+    num_alumno = 0
+    for g in range(num_grados):
+        for inicio in range(0, alumnos_por_grado, alumnos_por_tribunal):
+            turno = (f"Día {num_tribunal % 5}", f"{9 + num_tribunal % 6}:00", "Aula")
+            alumnos = {}
+            for _ in range(min(alumnos_por_tribunal, alumnos_por_grado - inicio)):
+                alumnos[num_alumno] = {
+                    'nombre': f"Alumno {num_alumno}", 'grado': f"G{g:03d}",
+                    'departamento': f"DEP{g % 20}", 'tutores': [f"t{num_alumno % 300}@fi.upm.es"],
+                }
+                num_alumno += 1
+            asignaciones.setdefault(turno, []).append({
+                'profesores': {f"p{num_tribunal}_{m}@fi.upm.es" for m in range(3)},
+                'alumnos': alumnos,
+            })
+            num_tribunal += 1
+    return asignaciones
+
+
+def medir_exportacion(directorio_trabajo, num_grados, alumnos_por_grado, hilos=(1, 2, 4, 8),
+                      repeticiones=3):
+    """
+    Mide la exportación a carpeta (CSV por grado, JSON Lines y Parquet) con
+    distintos números de hilos de escritura, y la exportación a ZIP como referencia.
+
+    Args:
+        directorio_trabajo (str): carpeta para las salidas
+        num_grados (int): grados de la asignación sintética (un CSV por grado)
+        alumnos_por_grado (int): alumnos de cada grado
+        hilos (list[int]): valores de max_hilos a probar (1 = secuencial)
+        repeticiones (int): ejecuciones por caso (se informa la mediana)
+
+    Returns:
+        list[dict]: una fila por caso con su tiempo y la aceleración frente al secuencial
+    """
+    asignaciones = _asignacion_sintetica(num_grados, alumnos_por_grado)
+    directorio_salida = os.path.join(directorio_trabajo, "salida_exportacion")
+    casos = [(f"carpeta ({h} hilos)", h,
+              lambda h=h: exportar_resultados(asignaciones, directorio_salida, max_hilos=h))
+             for h in hilos]
+    casos.append(("zip", 1, lambda: exportar_zip(asignaciones, directorio_salida + ".zip")))
+
+    filas = []
+    referencia = None
+    for nombre, num_hilos, exportar in casos:
+        tiempos = []
+        for _ in range(repeticiones):
+            shutil.rmtree(directorio_salida, ignore_errors=True)
+            inicio = time.perf_counter()
+            exportar()
+            tiempos.append(time.perf_counter() - inicio)
+        tiempo = statistics.median(tiempos)
+        if referencia is None:
+            referencia = tiempo
+        filas.append({
+            'caso': nombre, 'hilos': num_hilos, 'num_grados': num_grados,
+            'alumnos': num_grados * alumnos_por_grado, 'repeticiones': repeticiones,
+            'tiempo_s': round(tiempo, 4), 'tiempo_min_s': round(min(tiempos), 4),
+            'aceleracion': round(referencia / tiempo, 2),
+        })
+        print(f"  {nombre}: {tiempo:.3f} s (x{filas[-1]['aceleracion']:.2f})")
+    return filas
+
+
+def guardar_informe(filas, ruta_base, parametros):
+    """
+    Guarda el informe del barrido como <ruta_base>.json y <ruta_base>.csv.
+
+    Args:
+        filas (list[dict]): salida de ejecutar_barrido
+        ruta_base (str): ruta sin extensión
+        parametros (dict): parámetros del barrido (se guardan en el JSON)
+    """
+    os.makedirs(os.path.dirname(ruta_base) or ".", exist_ok=True)
+    informe = {
+        'fecha': datetime.datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': parametros,
+        'resultados': filas,
+    }
+    with open(ruta_base + ".json", "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+
+    # Columnas: unión en orden de aparición (las etapas pueden variar por modo)
+    columnas = []
+    for fila in filas:
+        columnas.extend(c for c in fila if c not in columnas)
+    with open(ruta_base + ".csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columnas, delimiter=';')
+        writer.writeheader()
+        writer.writerows(filas)
+    print(f"Informe guardado en {ruta_base}.json y {ruta_base}.csv")
+
+
+def _medir_caso_real():
     # Prueba1: caso real (28 TFGs, 205 profesores)
     print("\nEjecutando prueba1 (28 TFGs, 205 profesores)...")
     tiempo_transcurrido, estadisticas = medir_rendimiento(
         "prueba1",
-        "data/prueba1/",
-        "outputs/timing_prueba1/"
+        os.path.join(DIRECTORIO_BASE, "data", "prueba1") + "/",
+        os.path.join(DIRECTORIO_BASE, "outputs", "timing_prueba1") + "/"
     )
-    
+
     print("\n" + "="*70)
     print("RESULTADO")
     print("="*70)
@@ -51,7 +271,72 @@ if __name__ == "__main__":
     print(f"Datos procesados: 28 TFGs, 205 profesores")
     if estadisticas:
         print(f"Tribunales creados: {estadisticas.get('total_tribunales', 'N/A')}")
+        print("Tiempo por etapa:")
+        for etapa, datos in estadisticas.get('rendimiento', {}).get('etapas', {}).items():
+            print(f"  - {etapa}: {datos['segundos']:.3f} s")
         print(f"Alumnos asignados por departamento:")
         for depto, count in estadisticas.get('alumnos_por_depto', {}).items():
             print(f"  - {depto}: {count}")
     print("="*70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del pipeline de tribunales")
+    parser.add_argument("--barrido", action="store_true", help="barrido de tamaños con datos sintéticos")
+    parser.add_argument("--exportacion", action="store_true",
+                        help="medir solo la exportación (carpeta con N hilos y ZIP) con muchos grados")
+    parser.add_argument("--grados", type=int, default=60, help="grados de la asignación sintética (--exportacion)")
+    parser.add_argument("--alumnos-por-grado", type=int, default=500)
+    parser.add_argument("--hilos", default="1,2,4,8", help="hilos de escritura a probar, separados por comas")
+    parser.add_argument("--tamanos", default="28,200,1000,2500,5000", help="números de TFGs separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=None,
+                        help="ejecuciones por caso (por defecto 1 en el barrido y 3 en --exportacion)")
+    parser.add_argument("--modo", default="greedy", choices=["greedy", "exacto"])
+    parser.add_argument("--perfilar", action="store_true", help="medir también la memoria por etapa")
+    parser.add_argument("--cache-parseo", action="store_true", help="no forzar el parseo de los Excel en cada repetición")
+    parser.add_argument("--densidad", type=float, default=0.5)
+    parser.add_argument("--cotutores", type=float, default=0.2)
+    parser.add_argument("--trabajo", default=os.path.join(DIRECTORIO_BASE, "outputs", "benchmark"),
+                        help="carpeta para datos y salidas del barrido")
+    parser.add_argument("--informe", default=os.path.join(DIRECTORIO_BASE, "outputs", "benchmark", "informe"),
+                        help="ruta (sin extensión) del informe")
+    parser.add_argument("--config", default="{}",
+                        help='parámetros de ConfiguracionPipeline en JSON, p. ej. \'{"max_alumnos": 5}\'')
+    parser.add_argument("--log", default="WARNING", help="nivel de logging del pipeline (WARNING = silencioso)")
+    args = parser.parse_args()
+    configurar_logging(args.log)
+
+    print("\n" + "="*70)
+    print("MEDICIÓN DE RENDIMIENTO - SISTEMA DE ASIGNACIÓN DE TRIBUNALES")
+    print("="*70)
+
+    if args.exportacion:
+        hilos = [int(h) for h in args.hilos.split(",") if h.strip()]
+        repeticiones = args.repeticiones or 3
+        print(f"\nExportación: {args.grados} grados × {args.alumnos_por_grado} alumnos, "
+              f"hilos {hilos}, {repeticiones} repetición(es)")
+        filas = medir_exportacion(args.trabajo, args.grados, args.alumnos_por_grado, hilos, repeticiones)
+        parametros = {'grados': args.grados, 'alumnos_por_grado': args.alumnos_por_grado,
+                      'hilos': hilos, 'repeticiones': repeticiones, 'cpus': os.cpu_count()}
+        guardar_informe(filas, args.informe + "_exportacion", parametros)
+    elif not args.barrido:
+        _medir_caso_real()
+    else:
+        args.repeticiones = args.repeticiones or 1
+        tamanos = [int(t) for t in args.tamanos.split(",") if t.strip()]
+        try:
+            config = ConfiguracionPipeline.desde_dict(json.loads(args.config)).reemplazar(modo=args.modo)
+        except ValueError as e:
+            parser.error(f"--config no válida: {e}")
+        parametros = {
+            'tamanos': tamanos, 'repeticiones': args.repeticiones, 'modo': args.modo,
+            'perfilar': args.perfilar, 'cache_parseo': args.cache_parseo,
+            'densidad': args.densidad, 'cotutores': args.cotutores,
+            'configuracion': config.a_dict(),
+        }
+        print(f"\nBarrido: {tamanos} TFGs, {args.repeticiones} repetición(es), modo {args.modo}")
+        filas = ejecutar_barrido(
+            tamanos, args.trabajo, args.repeticiones, args.modo, args.perfilar,
+            args.cache_parseo, args.densidad, args.cotutores, config
+        )
+        guardar_informe(filas, args.informe, parametros)
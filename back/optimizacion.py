@@ -1,22 +1,93 @@
+import heapq
+import logging
 import random
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque
+
+from internado import mascara_profesores
+
+logger = logging.getLogger(__name__)
+
+
+def _llenar_desde_pool(pool, alumnos, conflictos, limite):
+    """
+    Toma alumnos del pool (en orden) hasta que el tribunal tenga `limite` alumnos.
+
+    Cada alumno del pool se examina como mucho una vez por llamada; los que
+    tienen conflicto (tutor en el tribunal) vuelven a la cabeza del pool en su
+    orden original.
+
+    Args:
+        pool (deque): alumnos pendientes [{'id', 'datos', 'depto', 'mascara'}]
+        alumnos (dict): alumnos del tribunal destino (se modifica)
+        conflictos (int): máscara de bits de los profesores del tribunal destino
+        limite (int): número de alumnos a alcanzar
+
+    Returns:
+        int: número de alumnos asignados
+    """
+    asignados = 0
+    rechazados = []
+    while pool and len(alumnos) < limite:
+        alumno = pool.popleft()
+        # Verificar restricción: tutor no en tribunal
+        if not conflictos & alumno['mascara']:
+            alumnos[alumno['id']] = alumno['datos']
+            asignados += 1
+        else:
+            rechazados.append(alumno)
+    pool.extendleft(reversed(rechazados))
+    return asignados
+
+
+def _verificar_consistencia(asignaciones, pool, esperados):
+    """
+    Comprueba que ningún alumno se pierde ni se duplica durante el rebalanceo.
+
+    Args:
+        asignaciones (dict): turno → list[{'profesores': set, 'alumnos': dict}]
+        pool (deque): alumnos que han quedado sin asignar
+        esperados (set): alumnos que debían estar asignados o en el pool
+
+    Raises:
+        RuntimeError: si algún alumno falta o aparece más de una vez
+    """
+    vistos = Counter()
+    for lista_asignaciones in asignaciones.values():
+        for tribunal_data in lista_asignaciones:
+            vistos.update(tribunal_data['alumnos'].keys())
+    vistos.update(alumno['id'] for alumno in pool)
+    duplicados = [a for a, n in vistos.items() if n > 1]
+    perdidos = esperados - set(vistos)
+    if duplicados or perdidos:
+        raise RuntimeError(
+            f"Rebalanceo inconsistente: duplicados={duplicados[:5]}, perdidos={list(perdidos)[:5]}"
+        )
 
 
 def rebalancear_tribunales(asignaciones, todos_estudiantes, 
                            disponibilidad_profesores, profesor_departamento,
-                           min_alumnos=4, max_alumnos=6):
+                           min_alumnos=4, max_alumnos=6, rng=None):
     """
     Redistribuye alumnos entre tribunales con pocos estudiantes.
     Después reajusta profesores según departamentos de alumnos.
+
+    El pool de alumnos es una deque y cada tribunal guarda sus profesores como
+    máscara de bits de conflictos (ver internado.mascara_profesores), de modo
+    que cada alumno se examina un número acotado de veces por fase y cada
+    comprobación es un AND de enteros. Al final se verifica que ningún alumno
+    se haya perdido o duplicado.
     
     Args:
         asignaciones (dict): turno → list[{'profesores': set, 'alumnos': dict}]
                             Estructura plana sin dimensión de departamento
-        todos_estudiantes (dict): alumno_id → {departamento, tutores, ...}
+        todos_estudiantes (dict): alumno_id → Alumno (ids internados, ver internado)
         disponibilidad_profesores (dict): {turno: {departamento: [(profesor, disponibilidad_count)]}}
         profesor_departamento (dict): {profesor: departamento}
         min_alumnos (int): objetivo mínimo de alumnos por tribunal
         max_alumnos (int): máximo de alumnos por tribunal
+        rng (random.Random, optional): generador para mezclar el pool; por defecto
+                                       uno nuevo sin semilla (nunca el estado
+                                       global del módulo random)
     
     Returns:
         dict: asignaciones rebalanceadas con misma estructura que entrada
@@ -25,17 +96,27 @@ def rebalancear_tribunales(asignaciones, todos_estudiantes,
     # 1. Construir mapeo alumno → departamento
     alumno_depto = {}
     for alumno_id, datos in todos_estudiantes.items():
-        alumno_depto[alumno_id] = datos.get('departamento', 'desconocido')
+        alumno_depto[alumno_id] = datos.departamento
+
+    def entrada_pool(alumno_id, datos):
+        return {
+            'id': alumno_id,
+            'datos': datos,
+            'depto': alumno_depto.get(alumno_id, datos.departamento),
+            'mascara': datos.mascara,
+        }
     
     # 2. Identificar tribunales con pocos alumnos y recolectar pool global
     tribunales_info = []
     pool_alumnos = []
+    alumnos_asignados = set()
     
     for turno, lista_asignaciones in asignaciones.items():
         # Iterar sobre cada tribunal (con índice)
         for idx_trib, tribunal_data in enumerate(lista_asignaciones):
             profesores = tribunal_data['profesores']
             alumnos = tribunal_data['alumnos']
+            alumnos_asignados.update(alumnos.keys())
             
             num_prof = len(profesores)
             num_alum = len(alumnos)
@@ -45,49 +126,36 @@ def rebalancear_tribunales(asignaciones, todos_estudiantes,
                 tribunales_info.append({
                     'turno': turno,
                     'idx_trib': idx_trib,
-                    'profesores': profesores,
+                    'profesores': mascara_profesores(profesores),
                     'num_alumnos': num_alum,
                     'num_prof': num_prof
                 })
                 
-                # Si tiene <=3 alumnos, todos van al pool
-                if num_alum <= 3:
+                # Si tiene <min_alumnos alumnos, todos van al pool
+                if num_alum < min_alumnos:
                     for alumno_id, datos in alumnos.items():
-                        dept = alumno_depto.get(alumno_id, datos.get('departamento', 'desconocido'))
-                        pool_alumnos.append({
-                            'id': alumno_id,
-                            'datos': datos,
-                            'depto': dept
-                        })
+                        pool_alumnos.append(entrada_pool(alumno_id, datos))
     
-    print(f"\n  Tribunales con <=3 alumnos: {sum(1 for t in tribunales_info if t['num_alumnos'] <= 3)}")
-    print(f"  Alumnos a redistribuir: {len(pool_alumnos)}")
+    logger.debug("Tribunales con <%d alumnos: %d", min_alumnos,
+                 sum(1 for t in tribunales_info if t['num_alumnos'] < min_alumnos))
+    logger.debug("Alumnos a redistribuir: %d", len(pool_alumnos))
     
     # 2b. Buscar alumnos que no fueron asignados a ningún tribunal
-    alumnos_asignados = set()
-    for turno, lista_asignaciones in asignaciones.items():
-        for tribunal_data in lista_asignaciones:
-            alumnos_asignados.update(tribunal_data['alumnos'].keys())
-    
     alumnos_no_asignados = [
         alumno_id for alumno_id in todos_estudiantes.keys()
         if alumno_id not in alumnos_asignados
     ]
     
     if alumnos_no_asignados:
-        print(f"  Alumnos sin asignar a ningún tribunal: {len(alumnos_no_asignados)}")
+        logger.debug("Alumnos sin asignar a ningún tribunal: %d", len(alumnos_no_asignados))
         for alumno_id in alumnos_no_asignados:
-            datos = todos_estudiantes[alumno_id]
-            dept = alumno_depto.get(alumno_id, datos.get('departamento', 'desconocido'))
-            pool_alumnos.append({
-                'id': alumno_id,
-                'datos': datos,
-                'depto': dept
-            })
+            pool_alumnos.append(entrada_pool(alumno_id, todos_estudiantes[alumno_id]))
+
+    esperados = alumnos_asignados | set(alumnos_no_asignados)
     
     # 3. Filtrar y ordenar tribunales que necesitan rebalanceo
     tribunales_rebalancear = sorted(
-        [t for t in tribunales_info if t['num_alumnos'] <= 3],
+        [t for t in tribunales_info if t['num_alumnos'] < min_alumnos],
         key=lambda t: t['num_alumnos']
     )
     
@@ -101,8 +169,8 @@ def rebalancear_tribunales(asignaciones, todos_estudiantes,
             num_prof = len(profesores)
             num_alum = len(alumnos)
             
-            # Copiar tribunales con >3 alumnos o sin profesores
-            if num_alum > 3 or num_prof == 0:
+            # Copiar tribunales con >=min_alumnos alumnos o sin profesores
+            if num_alum >= min_alumnos or num_prof == 0:
                 nuevas_asignaciones[turno].append({
                     'profesores': set(profesores),
                     'alumnos': dict(alumnos)
@@ -115,87 +183,59 @@ def rebalancear_tribunales(asignaciones, todos_estudiantes,
                 })
     
     # 5. Mezclar alumnos aleatoriamente
-    random.shuffle(pool_alumnos)
+    rng = rng or random.Random()
+    rng.shuffle(pool_alumnos)
+    pool_alumnos = deque(pool_alumnos)
     
-    print(f"\n  Redistribuyendo {len(pool_alumnos)} alumnos entre tribunales...")
+    logger.info("Redistribuyendo %d alumnos entre tribunales", len(pool_alumnos))
     
-    # 6. FASE A: Llenar tribunales que ya tienen alumnos (>3 y <max_alumnos)
-    print(f"\n  FASE A: Llenando tribunales con 4-{max_alumnos-1} alumnos...")
+    # 6. FASE A: Llenar tribunales que ya tienen alumnos (>=min_alumnos y <max_alumnos)
+    logger.debug("FASE A: Llenando tribunales con %d-%d alumnos...", min_alumnos, max_alumnos - 1)
     tribunales_para_llenar = sorted(
-        [t for t in tribunales_info if 3 < t['num_alumnos'] < max_alumnos],
+        [t for t in tribunales_info if min_alumnos <= t['num_alumnos'] < max_alumnos],
         key=lambda t: t['num_alumnos']
     )
     
-    idx = 0
     tribunales_modificados = set()  # Rastrear (turno, idx_trib) modificados
     
     for trib in tribunales_para_llenar:
+        if not pool_alumnos:
+            break
         turno = trib['turno']
         idx_trib = trib['idx_trib']
-        profesores = trib['profesores']
-        
         tribunal_data = nuevas_asignaciones[turno][idx_trib]
-        num_alumnos_actual = len(tribunal_data['alumnos'])
-        asignados = 0
         
         # Intentar llenar hasta max_alumnos
-        while idx < len(pool_alumnos) and num_alumnos_actual + asignados < max_alumnos:
-            alumno = pool_alumnos[idx]
-            
-            # Verificar restricción: tutor no en tribunal
-            if not any(t in profesores for t in alumno['datos']['tutores']):
-                alumno_id = alumno['id']
-                tribunal_data['alumnos'][alumno_id] = alumno['datos']
-                asignados += 1
-                pool_alumnos.pop(idx)
-            else:
-                idx += 1
-                if idx >= len(pool_alumnos):
-                    break
+        asignados = _llenar_desde_pool(pool_alumnos, tribunal_data['alumnos'], trib['profesores'], max_alumnos)
         
         if asignados > 0:
-            print(f"    {turno} [Trib {idx_trib+1}]: +{asignados} alumnos (total: {num_alumnos_actual + asignados})")
+            logger.debug("  %s [Trib %d]: +%d alumnos (total: %d)",
+                         turno, idx_trib + 1, asignados, len(tribunal_data['alumnos']))
             tribunales_modificados.add((turno, idx_trib))
-        idx = 0
     
-    # 7. FASE B: Redistribuir entre tribunales con <=3 alumnos
-    print(f"\n  FASE B: Redistribuyendo en tribunales con <=3 alumnos...")
+    # 7. FASE B: Redistribuir entre tribunales con <min_alumnos alumnos
+    logger.debug("FASE B: Redistribuyendo en tribunales con <%d alumnos...", min_alumnos)
     
-    idx = 0
     for trib in tribunales_rebalancear:
+        if not pool_alumnos:
+            break
         turno = trib['turno']
         idx_trib = trib['idx_trib']
-        profesores = trib['profesores']
-        
         tribunal_data = nuevas_asignaciones[turno][idx_trib]
-        asignados = 0
         
         # Intentar llenar hasta min_alumnos
-        while idx < len(pool_alumnos) and len(tribunal_data['alumnos']) < min_alumnos:
-            alumno = pool_alumnos[idx]
-            
-            # Verificar restricción: tutor no en tribunal
-            if not any(t in profesores for t in alumno['datos']['tutores']):
-                alumno_id = alumno['id']
-                tribunal_data['alumnos'][alumno_id] = alumno['datos']
-                asignados += 1
-                pool_alumnos.pop(idx)
-            else:
-                idx += 1
-                if idx >= len(pool_alumnos):
-                    break
+        asignados = _llenar_desde_pool(pool_alumnos, tribunal_data['alumnos'], trib['profesores'], min_alumnos)
         
         if asignados > 0:
-            print(f"    {turno} [Trib {idx_trib+1}]: {len(tribunal_data['alumnos'])} alumnos asignados")
+            logger.debug("  %s [Trib %d]: %d alumnos asignados", turno, idx_trib + 1, len(tribunal_data['alumnos']))
             tribunales_modificados.add((turno, idx_trib))
-        idx = 0
     
-    # 8. FASE C: Tomar alumnos de tribunales con 6 para llenar los que tienen <=3
-    print(f"\n  FASE C: Tomando alumnos de tribunales completos (6 alumnos)...")
+    # 8. FASE C: Tomar alumnos de tribunales con excedente para llenar los que tienen <min_alumnos.
+    #    Los donantes se extraen de un heap por excedente y nunca bajan de min_alumnos.
+    logger.debug("FASE C: Tomando alumnos de tribunales con excedente...")
     
-    tribunales_con_6 = [t for t in tribunales_info if t['num_alumnos'] == max_alumnos]
     tribunales_incompletos = []
-    
+    donantes = []  # heap de (-excedente, orden, turno, idx_trib)
     for turno, lista_asignaciones in nuevas_asignaciones.items():
         for idx_trib, tribunal_data in enumerate(lista_asignaciones):
             num_alum = len(tribunal_data['alumnos'])
@@ -204,12 +244,14 @@ def rebalancear_tribunales(asignaciones, todos_estudiantes,
                     'turno': turno,
                     'idx_trib': idx_trib,
                     'num_alumnos': num_alum,
-                    'profesores': tribunal_data['profesores']
+                    'profesores': mascara_profesores(tribunal_data['profesores'])
                 })
+            elif num_alum > min_alumnos:
+                heapq.heappush(donantes, (-(num_alum - min_alumnos), len(donantes), turno, idx_trib))
     
-    if tribunales_incompletos and tribunales_con_6:
-        print(f"    Tribunales completos disponibles: {len(tribunales_con_6)}")
-        print(f"    Tribunales incompletos: {len(tribunales_incompletos)}")
+    if tribunales_incompletos and donantes:
+        logger.debug("  Tribunales con excedente disponibles: %d", len(donantes))
+        logger.debug("  Tribunales incompletos: %d", len(tribunales_incompletos))
         
         for trib_incompleto in tribunales_incompletos:
             turno_dest = trib_incompleto['turno']
@@ -220,55 +262,58 @@ def rebalancear_tribunales(asignaciones, todos_estudiantes,
             # Cuántos alumnos necesita
             necesarios = min_alumnos - len(tribunal_dest['alumnos'])
             
-            # Buscar alumnos en tribunales con 6
-            for trib_origen in tribunales_con_6:
-                if necesarios <= 0:
-                    break
-                
-                turno_origen = trib_origen['turno']
-                idx_origen = trib_origen['idx_trib']
+            # Buscar alumnos en los donantes con más excedente
+            revisados = []
+            while necesarios > 0 and donantes:
+                _, orden, turno_origen, idx_origen = heapq.heappop(donantes)
                 tribunal_origen = nuevas_asignaciones[turno_origen][idx_origen]
+                excedente = len(tribunal_origen['alumnos']) - min_alumnos
                 
-                # Sacar alumnos que no sean tutores en destino
-                alumnos_movibles = [
-                    (alumno_id, datos) 
-                    for alumno_id, datos in tribunal_origen['alumnos'].items()
-                    if not any(t in profes_dest for t in datos.get('tutores', []))
-                ]
-                
-                # Mover alumnos
+                # Sacar alumnos cuyos tutores no estén en el destino
                 moved = 0
-                for alumno_id, datos in alumnos_movibles[:necesarios]:
-                    tribunal_dest['alumnos'][alumno_id] = datos
-                    del tribunal_origen['alumnos'][alumno_id]
-                    moved += 1
-                    necesarios -= 1
+                for alumno_id, datos in list(tribunal_origen['alumnos'].items()):
+                    if moved == excedente or necesarios == 0:
+                        break
+                    if not profes_dest & datos.mascara:
+                        tribunal_dest['alumnos'][alumno_id] = datos
+                        del tribunal_origen['alumnos'][alumno_id]
+                        moved += 1
+                        necesarios -= 1
                 
                 if moved > 0:
-                    print(f"      {turno_origen} [Trib {idx_origen+1}] → {turno_dest} [Trib {idx_dest+1}]: {moved} alumnos movidos")
-        
-        # Intentar asignar hasta max_alumnos
-        while idx < len(pool_alumnos) and asignados < max_alumnos:
-            alumno = pool_alumnos[idx]
+                    logger.debug("    %s [Trib %d] → %s [Trib %d]: %d alumnos movidos",
+                                 turno_origen, idx_origen + 1, turno_dest, idx_dest + 1, moved)
+                    tribunales_modificados.add((turno_origen, idx_origen))
+                    tribunales_modificados.add((turno_dest, idx_dest))
+                if excedente - moved > 0:
+                    revisados.append((-(excedente - moved), orden, turno_origen, idx_origen))
             
-            # Verificar restricción: tutor no en tribunal
-            if not any(t in profesores for t in alumno['datos']['tutores']):
-                alumno_id = alumno['id']
-                tribunal_data['alumnos'][alumno_id] = alumno['datos']
-                asignados += 1
-                pool_alumnos.pop(idx)
-            else:
-                idx += 1
-                if idx >= len(pool_alumnos):
-                    idx = 0
-        
-        if asignados > 0:
-            print(f"    {turno} [Trib {idx_trib+1}]: {asignados} alumnos asignados")
-            tribunales_modificados.add((turno, idx_trib))
-        idx = 0
+            # Los donantes con excedente restante vuelven al heap
+            for donante in revisados:
+                heapq.heappush(donantes, donante)
+
+    # 9. FASE D: Colocar los alumnos que siguen en el pool en cualquier tribunal
+    #    ya abierto con plaza libre y sin conflicto (primero los que tienen menos alumnos)
+    if pool_alumnos:
+        logger.debug("FASE D: Colocando %d alumnos restantes en tribunales con plaza...", len(pool_alumnos))
+        con_plaza = sorted(
+            [t for t in tribunales_info
+             if 0 < len(nuevas_asignaciones[t['turno']][t['idx_trib']]['alumnos']) < max_alumnos],
+            key=lambda t: len(nuevas_asignaciones[t['turno']][t['idx_trib']]['alumnos'])
+        )
+        for trib in con_plaza:
+            if not pool_alumnos:
+                break
+            turno = trib['turno']
+            idx_trib = trib['idx_trib']
+            tribunal_data = nuevas_asignaciones[turno][idx_trib]
+            asignados = _llenar_desde_pool(pool_alumnos, tribunal_data['alumnos'], trib['profesores'], max_alumnos)
+            if asignados > 0:
+                logger.debug("  %s [Trib %d]: %d alumnos asignados", turno, idx_trib + 1, asignados)
+                tribunales_modificados.add((turno, idx_trib))
 
     '''
-    # 8. Reajustar profesores según departamentos de alumnos asignados (solo tribunales modificados)
+    # Reajustar profesores según departamentos de alumnos asignados (solo tribunales modificados)
     print(f"\n  Reajustando profesores según departamentos de alumnos...")
     
     for turno, lista_asignaciones in nuevas_asignaciones.items():
@@ -296,7 +341,7 @@ def rebalancear_tribunales(asignaciones, todos_estudiantes,
             profesores_finales = []
             tutores_en_alumnos = set()
             for datos_alumno in alumnos_nuevo.values():
-                tutores_en_alumnos.update(datos_alumno.get('tutores', []))
+                tutores_en_alumnos.update(datos_alumno.tutores)
             
             # Asignar profesores por departamento según proporción de alumnos
             for depto_alumno, num_alumnos in alumnos_por_depto.most_common():
@@ -344,8 +389,11 @@ def rebalancear_tribunales(asignaciones, todos_estudiantes,
                 tribunal_data['profesores'] = set(profesores_finales[:num_prof_necesarios])
                 print(f"    {turno} [Trib {idx_trib+1}]: Profesores reajustados (principal: {alumnos_por_depto.most_common(1)[0][0]})")
     '''    
-    # 9. Si quedan alumnos sin asignar (casos extremos)
+    # 10. Si quedan alumnos sin asignar (casos extremos)
     if pool_alumnos:
-        print(f"\n  ⚠️  Alumnos sin asignar tras rebalanceo: {len(pool_alumnos)}")
+        logger.warning("Alumnos sin asignar tras rebalanceo: %d", len(pool_alumnos))
+
+    # 11. Ningún alumno se pierde ni se duplica entre fases
+    _verificar_consistencia(nuevas_asignaciones, pool_alumnos, esperados)
     
     return nuevas_asignaciones
@@ -0,0 +1,254 @@
+"""
+Modo exacto: formación de tribunales y asignación de alumnos en un único
+modelo de programación con restricciones (OR-Tools CP-SAT).
+
+Alternativa al flujo greedy por departamento + rebalanceo. Devuelve la misma
+estructura turno → list[{'profesores': set, 'alumnos': dict}] para que el
+exportador no cambie.
+"""
+
+import importlib.util
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# OR-Tools es opcional (requirements-exacto.txt): solo lo necesita este modo
+MENSAJE_SIN_ORTOOLS = "El modo exacto necesita OR-Tools: pip install -r requirements-exacto.txt"
+
+
+def ortools_disponible():
+    """True si OR-Tools está instalado (sin importarlo)."""
+    return importlib.util.find_spec("ortools") is not None
+
+
+def resolver_tribunales_exacto(disponibilidades, estudiantes, min_alumnos=4, max_alumnos=6,
+                               miembros_tribunal=3, limite_tiempo=30, seed=42, num_workers=8,
+                               pista=None):
+    """
+    Forma tribunales y asigna alumnos conjuntamente con un modelo CP-SAT.
+
+    Restricciones:
+        - cada tribunal abierto tiene exactamente `miembros_tribunal` profesores,
+          todos del mismo departamento y disponibles en su franja
+        - cada profesor participa como mucho en un tribunal
+        - cada tribunal abierto tiene entre min_alumnos y max_alumnos alumnos
+        - cada alumno va como mucho a un tribunal y nunca a uno donde esté su tutor
+
+    Objetivo (lexicográfico mediante pesos):
+        1. maximizar alumnos asignados
+        2. maximizar alumnos evaluados por un tribunal de su departamento
+        3. equidad: minimizar el peso (participación + tutorías) de los profesores
+           elegidos y la mayor participación resultante
+
+    Args:
+        disponibilidades (dict): departamento → DisponibilidadDepto
+                                 (solo departamentos con alumnos)
+        estudiantes (dict): alumno_id → Alumno (ids internados, ver internado)
+        min_alumnos (int): mínimo de alumnos por tribunal abierto
+        max_alumnos (int): máximo de alumnos por tribunal
+        miembros_tribunal (int): profesores por tribunal
+        limite_tiempo (float): tiempo máximo del solver en segundos
+        seed (int): semilla del solver
+        num_workers (int): hilos de búsqueda del solver
+        pista (dict, optional): solución conocida (p. ej. la greedy) con la misma
+                                estructura que el resultado; se pasa al solver como
+                                punto de partida (AddHint)
+
+    Returns:
+        dict or None: turno → list[{'profesores': set, 'alumnos': dict}],
+                      o None si el solver no encuentra solución en el tiempo dado
+    """
+    try:
+        from ortools.sat.python import cp_model
+    except ImportError as e:
+        raise ImportError(MENSAJE_SIN_ORTOOLS) from e
+
+    modelo = cp_model.CpModel()
+
+    alumnos_por_dpto = {}
+    for alumno_id, datos in estudiantes.items():
+        alumnos_por_dpto.setdefault(datos.departamento, []).append(alumno_id)
+
+    # ---- Tribunales candidatos: (departamento, franja, k) ----
+    tribunales = []       # [(departamento, turno)]
+    abiertos = []         # u[t]
+    miembros = []         # [{fila: x[p, t]}]
+    x_profesor = {}       # correo → [x[p, t]]
+    peso_profesor = {}    # correo → participación + tutorías
+    coste_equidad = []
+    cota_equidad = 0
+    for dpto, disp in disponibilidades.items():
+        num_alumnos = len(alumnos_por_dpto.get(dpto, []))
+        if num_alumnos == 0:
+            continue
+        pesos = [int(round(p)) for p in (disp.participacion + disp.peso)]
+        max_por_franja = math.ceil(num_alumnos / min_alumnos)
+        for j, turno in enumerate(disp.turnos):
+            filas = [int(f) for f in disp.matriz[:, j].nonzero()[0]]
+            num_candidatos = min(len(filas) // miembros_tribunal, max_por_franja)
+            anterior = None
+            for k in range(num_candidatos):
+                t = len(tribunales)
+                u = modelo.NewBoolVar(f"u_{t}")
+                x = {f: modelo.NewBoolVar(f"x_{f}_{t}") for f in filas}
+                modelo.Add(sum(x.values()) == miembros_tribunal * u)
+                # Romper simetría entre tribunales intercambiables de la misma franja
+                if anterior is not None:
+                    modelo.Add(u <= anterior)
+                anterior = u
+                for f, var in x.items():
+                    x_profesor.setdefault(disp.correos[f], []).append(var)
+                    peso_profesor[disp.correos[f]] = pesos[f]
+                    coste_equidad.append((pesos[f] + 1) * var)
+                cota_equidad += miembros_tribunal * (max(pesos[f] for f in filas) + 1)
+                tribunales.append((dpto, turno))
+                abiertos.append(u)
+                miembros.append(x)
+
+    if not tribunales:
+        return {}
+
+    # Cada profesor en como mucho un tribunal
+    for variables in x_profesor.values():
+        if len(variables) > 1:
+            modelo.Add(sum(variables) <= 1)
+
+    # Mayor participación resultante entre los profesores elegidos
+    max_participacion = modelo.NewIntVar(0, max(cota_equidad, 1), "max_participacion")
+    for correo, variables in x_profesor.items():
+        modelo.Add(max_participacion >= (peso_profesor[correo] + 1) * sum(variables))
+
+    # ---- Asignación de alumnos ----
+    # Índice correo → (departamento, fila) para la exclusión de tutores
+    fila_profesor = {}
+    for dpto, disp in disponibilidades.items():
+        for f, correo in enumerate(disp.correos):
+            fila_profesor.setdefault(correo, []).append((dpto, f))
+
+    y_alumno = {}
+    mismo_dpto = []
+    alumnos_tribunal = [[] for _ in tribunales]
+    for alumno_id, datos in estudiantes.items():
+        variables = []
+        for t, (dpto, turno) in enumerate(tribunales):
+            y = modelo.NewBoolVar(f"y_{len(y_alumno)}_{t}")
+            modelo.AddImplication(y, abiertos[t])
+            # El tutor no puede formar parte del tribunal del alumno
+            for tutor in datos.tutores:
+                for dpto_tutor, f in fila_profesor.get(tutor, []):
+                    if dpto_tutor == dpto and f in miembros[t]:
+                        modelo.AddBoolOr([y.Not(), miembros[t][f].Not()])
+            variables.append(y)
+            alumnos_tribunal[t].append((alumno_id, y))
+            if dpto == datos.departamento:
+                mismo_dpto.append(y)
+        modelo.Add(sum(variables) <= 1)
+        y_alumno[alumno_id] = variables
+
+    for t, u in enumerate(abiertos):
+        total = sum(y for _, y in alumnos_tribunal[t])
+        modelo.Add(total >= min_alumnos * u)
+        modelo.Add(total <= max_alumnos * u)
+
+    # ---- Objetivo ----
+    peso_depto = 2 * cota_equidad + 1
+    peso_asignado = peso_depto * (len(estudiantes) + 1)
+    modelo.Maximize(
+        peso_asignado * sum(y for variables in y_alumno.values() for y in variables)
+        + peso_depto * sum(mismo_dpto)
+        - sum(coste_equidad)
+        - max_participacion
+    )
+
+    if pista:
+        _sugerir_solucion(modelo, pista, disponibilidades, tribunales, abiertos, miembros, y_alumno,
+                          max_participacion, peso_profesor, min_alumnos, max_alumnos, miembros_tribunal)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = limite_tiempo
+    solver.parameters.random_seed = seed
+    solver.parameters.num_workers = num_workers
+    estado = solver.Solve(modelo)
+    logger.info("Solver exacto: %s en %.2fs", solver.StatusName(estado), solver.WallTime())
+    if estado not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    # ---- Reconstruir la estructura turno → tribunales ----
+    asignaciones = {}
+    for t, (dpto, turno) in enumerate(tribunales):
+        if not solver.Value(abiertos[t]):
+            continue
+        disp = disponibilidades[dpto]
+        profesores = {disp.correos[f] for f, var in miembros[t].items() if solver.Value(var)}
+        alumnos = {alumno_id: estudiantes[alumno_id]
+                   for alumno_id, y in alumnos_tribunal[t] if solver.Value(y)}
+        asignaciones.setdefault(turno, []).append({
+            'profesores': profesores,
+            'alumnos': alumnos
+        })
+    return asignaciones
+
+
+def _sugerir_solucion(modelo, pista, disponibilidades, tribunales, abiertos, miembros, y_alumno,
+                      max_participacion, peso_profesor, min_alumnos, max_alumnos, miembros_tribunal):
+    """
+    Añade al modelo una solución de partida (AddHint) a partir de una asignación.
+
+    Cada tribunal de la pista ocupa el siguiente candidato libre de su
+    departamento y franja. Los que no encajan en el modelo (profesores de
+    varios departamentos o no disponibles, otro tamaño, alumnos fuera de
+    [min_alumnos, max_alumnos] o sin candidato libre) se omiten y sus alumnos
+    quedan sin asignar en la pista, para que esta sea factible. La pista da
+    valor a todas las variables: solo así el solver la toma directamente como
+    primera solución.
+
+    Args:
+        modelo (cp_model.CpModel): modelo ya construido
+        pista (dict): turno → list[{'profesores': set, 'alumnos': dict}]
+        disponibilidades (dict): departamento → DisponibilidadDepto
+        tribunales (list): (departamento, turno) de cada candidato
+        abiertos (list): variable u de cada candidato
+        miembros (list): {fila: x} de cada candidato
+        y_alumno (dict): alumno_id → variables y (una por candidato)
+        max_participacion (IntVar): mayor participación entre los profesores elegidos
+        peso_profesor (dict): correo → participación + tutorías
+        min_alumnos (int): mínimo de alumnos por tribunal abierto
+        max_alumnos (int): máximo de alumnos por tribunal
+        miembros_tribunal (int): profesores por tribunal
+    """
+    candidatos = {}
+    for t, clave in enumerate(tribunales):
+        candidatos.setdefault(clave, []).append(t)
+    filas = {dpto: {correo: f for f, correo in enumerate(disp.correos)}
+             for dpto, disp in disponibilidades.items()}
+
+    elegidos = {}     # candidato → (filas de profesores, alumnos)
+    for turno, lista_tribunales in pista.items():
+        for tribunal in lista_tribunales:
+            profesores = tribunal['profesores']
+            alumnos = [a for a in tribunal['alumnos'] if a in y_alumno]
+            if len(profesores) != miembros_tribunal or not min_alumnos <= len(alumnos) <= max_alumnos:
+                continue
+            for dpto, indice in filas.items():
+                if not all(p in indice for p in profesores):
+                    continue
+                libres = [t for t in candidatos.get((dpto, turno), []) if t not in elegidos]
+                if libres and all(indice[p] in miembros[libres[0]] for p in profesores):
+                    elegidos[libres[0]] = ({indice[p] for p in profesores}, alumnos)
+                break
+
+    alumno_tribunal = {a: t for t, (_, alumnos) in elegidos.items() for a in alumnos}
+    modelo.AddHint(max_participacion, max(
+        (peso_profesor[disponibilidades[tribunales[t][0]].correos[f]] + 1
+         for t, (filas_elegidas, _) in elegidos.items() for f in filas_elegidas),
+        default=0
+    ))
+    for t, u in enumerate(abiertos):
+        filas_elegidas = elegidos[t][0] if t in elegidos else ()
+        modelo.AddHint(u, t in elegidos)
+        for f, x in miembros[t].items():
+            modelo.AddHint(x, f in filas_elegidas)
+    for alumno_id, variables in y_alumno.items():
+        for t, y in enumerate(variables):
+            modelo.AddHint(y, alumno_tribunal.get(alumno_id) == t)
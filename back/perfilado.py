@@ -0,0 +1,161 @@
+"""
+Medición de rendimiento del pipeline: tiempo por etapa siempre y, si se pide,
+pico de memoria por etapa (tracemalloc) y perfil de funciones (cProfile).
+El resumen se guarda en las estadísticas de run_pipeline (clave 'rendimiento').
+
+tracemalloc y cProfile son globales del proceso, así que solo puede haber una
+ejecución perfilada a la vez por proceso: un segundo PerfilEjecucion con
+perfilar=True en otro hilo falla con RuntimeError mientras el primero no se
+detenga. Aun así, el pico de memoria incluye lo que asignen otros hilos (sin
+perfilar) del mismo proceso.
+"""
+
+import cProfile
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource   # no existe en Windows
+except ImportError:
+    resource = None
+
+# Lo toma el PerfilEjecucion con perfilar=True activo (ver el docstring del módulo)
+_lock_perfilado = threading.Lock()
+
+
+def _memoria_maxima_mb():
+    """Memoria residente máxima del proceso en MB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(maxrss / divisor, 2)
+
+
+class PerfilEjecucion:
+    """
+    Cronómetro por etapas de una ejecución del pipeline.
+
+    Una etapa que se repite acumula su tiempo y se queda con el mayor pico de
+    memoria. Las etapas no deben anidarse si se mide memoria, porque cada una
+    reinicia el pico de tracemalloc.
+
+    Se usa como context manager para que tracemalloc y cProfile se detengan
+    también si la ejecución falla:
+
+        with PerfilEjecucion(perfilar) as perfil:
+            ...
+    """
+
+    def __init__(self, perfilar=False, num_funciones=20):
+        """
+        Args:
+            perfilar (bool): medir también memoria (tracemalloc) y funciones (cProfile)
+            num_funciones (int): funciones a incluir en el resumen de cProfile
+
+        Raises:
+            RuntimeError: si perfilar=True y ya hay otra ejecución perfilada en el proceso
+        """
+        self.perfilar = perfilar
+        self.num_funciones = num_funciones
+        self.etapas = {}        # nombre → {'segundos', 'memoria_pico_mb'}
+        self._abiertas = {}     # nombre → instante de inicio
+        self._inicio = time.perf_counter()
+        self._profile = None
+        self._tracemalloc_propio = False
+        self._con_lock = False
+        if perfilar:
+            if not _lock_perfilado.acquire(blocking=False):
+                raise RuntimeError("Ya hay una ejecución con perfilar=True en este proceso; "
+                                   "tracemalloc y cProfile son globales y solo se puede perfilar una a la vez")
+            self._con_lock = True
+            try:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._tracemalloc_propio = True
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            except BaseException:
+                self.detener()
+                raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.detener()
+        return False
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide el bloque `with` como la etapa `nombre`."""
+        if self.perfilar:
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        self._abiertas[nombre] = inicio
+        try:
+            yield
+        finally:
+            del self._abiertas[nombre]
+            datos = self.etapas.setdefault(nombre, {'segundos': 0.0})
+            datos['segundos'] = round(datos['segundos'] + time.perf_counter() - inicio, 4)
+            if self.perfilar:
+                pico = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+                datos['memoria_pico_mb'] = max(datos.get('memoria_pico_mb', 0.0), pico)
+
+    def detener(self):
+        """
+        Detiene tracemalloc y cProfile (si los inició este perfil) y deja
+        perfilar a otras ejecuciones. Se puede llamar más de una vez.
+        """
+        if self._profile is not None:
+            self._profile.disable()
+        if self._tracemalloc_propio and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._tracemalloc_propio = False
+        if self._con_lock:
+            self._con_lock = False
+            _lock_perfilado.release()
+
+    def _funciones_costosas(self):
+        """Funciones con más tiempo acumulado según cProfile."""
+        self._profile.disable()
+        estadisticas = pstats.Stats(self._profile).stats
+        ordenadas = sorted(estadisticas.items(), key=lambda item: item[1][3], reverse=True)
+        funciones = []
+        for (fichero, linea, funcion), (_, llamadas, propio, acumulado, _) in ordenadas[:self.num_funciones]:
+            funciones.append({
+                'funcion': f"{fichero}:{linea}({funcion})",
+                'llamadas': llamadas,
+                'tiempo_propio': round(propio, 4),
+                'tiempo_acumulado': round(acumulado, 4),
+            })
+        return funciones
+
+    def resumen(self):
+        """
+        Resumen serializable a JSON. Las etapas aún abiertas aparecen con el
+        tiempo transcurrido hasta ahora.
+
+        Returns:
+            dict: {'etapas', 'total_segundos', 'memoria_maxima_mb'[, 'funciones']}
+        """
+        ahora = time.perf_counter()
+        etapas = {nombre: dict(datos) for nombre, datos in self.etapas.items()}
+        for nombre, inicio in self._abiertas.items():
+            datos = etapas.setdefault(nombre, {'segundos': 0.0})
+            datos['segundos'] = round(datos['segundos'] + ahora - inicio, 4)
+
+        resultado = {
+            'etapas': etapas,
+            'total_segundos': round(ahora - self._inicio, 4),
+            'memoria_maxima_mb': _memoria_maxima_mb(),
+        }
+        if self._profile is not None:
+            resultado['funciones'] = self._funciones_costosas()
+        return resultado
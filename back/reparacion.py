@@ -0,0 +1,391 @@
+"""
+Reparación incremental de una planificación ya publicada.
+
+Cuando cambian los datos tras publicar los tribunales (un profesor retira su
+disponibilidad, se añaden o retiran TFGs, cambia un tutor...), en lugar de
+volver a ejecutar el pipeline completo se parte de la asignación anterior (los
+CSV que genera exportar) y solo se tocan los tribunales afectados:
+
+    1. Se descartan los alumnos que ya no están en los TFGs presentados.
+    2. Se sacan de su tribunal los alumnos cuyo tutor forma parte de él.
+    3. Los profesores que ya no están disponibles en la franja de su tribunal
+       se sustituyen por profesores libres (del departamento de los alumnos y
+       con menos carga primero); si no hay suficientes, el tribunal se disuelve.
+    4. Los alumnos desplazados y los nuevos se colocan en tribunales abiertos con
+       plaza (mismo departamento primero) o, si no caben, mediante un camino de
+       aumento que mueve el menor número posible de alumnos ya colocados.
+    5. Con los que sigan sin tribunal se abren tribunales nuevos con profesores libres.
+
+Los tribunales conservan su franja y su número, así que los no afectados
+quedan exactamente igual que en la planificación publicada. Los alumnos que ya
+estaban sin asignar (sin_asignar.csv) siguen sin asignar mientras no cambien su
+departamento ni sus tutores; así, con los mismos datos de entrada la
+reparación reproduce la planificación publicada. Para volver a intentar
+colocarlos hay que ejecutar el pipeline completo.
+"""
+
+import csv
+import glob
+import io
+import logging
+import os
+import zipfile
+from collections import Counter
+
+from asignacion import buscar_camino_aumento
+from internado import mascara_profesores, matriz_compatibilidad
+
+logger = logging.getLogger(__name__)
+
+# Columnas de los CSV de exportar que se necesitan para reconstruir la asignación
+COLUMNAS_PREVIAS = ('alumno_id', 'turno', 'tribunal_num', 'profesores')
+# Alumnos sin tribunal en la asignación anterior (ver exportar.FICHERO_SIN_ASIGNAR)
+FICHERO_SIN_ASIGNAR = "sin_asignar.csv"
+
+
+# ============================================================================
+# LECTURA DE LA ASIGNACIÓN ANTERIOR
+# ============================================================================
+def _leer_filas(f, nombre, previas):
+    """Añade a `previas` las filas de un CSV de asignaciones ya abierto."""
+    lector = csv.DictReader(f, delimiter=';')
+    faltan = [c for c in COLUMNAS_PREVIAS if c not in (lector.fieldnames or [])]
+    if faltan:
+        raise ValueError(f"{nombre} no es un CSV de asignaciones (faltan columnas: {', '.join(faltan)})")
+    for fila in lector:
+        clave = (fila['turno'], int(fila['tribunal_num']))
+        tribunal = previas.setdefault(clave, {
+            'profesores': [p.strip() for p in fila['profesores'].split(',') if p.strip()],
+            'alumnos': [],
+        })
+        tribunal['alumnos'].append(fila['alumno_id'])
+
+
+def leer_asignaciones(ruta):
+    """
+    Lee una asignación exportada: el ZIP de resultados o una carpeta con los
+    asignaciones_<grado>.csv.
+
+    Args:
+        ruta (str): ruta al ZIP o a la carpeta
+
+    Returns:
+        dict: (turno en texto, número de tribunal) → {'profesores': list[str], 'alumnos': list[str]}
+              con los correos de los profesores y los identificadores de trabajo
+
+    Raises:
+        ValueError: si no contiene ningún CSV de asignaciones válido
+    """
+    previas = {}
+    if os.path.isdir(ruta):
+        ficheros = sorted(glob.glob(os.path.join(ruta, "asignaciones_*.csv")))
+        for fichero in ficheros:
+            with open(fichero, newline="", encoding="utf-8-sig") as f:
+                _leer_filas(f, os.path.basename(fichero), previas)
+    else:
+        try:
+            with zipfile.ZipFile(ruta) as zipf:
+                ficheros = sorted(n for n in zipf.namelist()
+                                  if n.startswith("asignaciones_") and n.endswith(".csv"))
+                for nombre in ficheros:
+                    with zipf.open(nombre) as entrada:
+                        with io.TextIOWrapper(entrada, encoding="utf-8-sig", newline="") as f:
+                            _leer_filas(f, nombre, previas)
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"{os.path.basename(ruta)} no es un ZIP de resultados") from e
+    if not ficheros:
+        raise ValueError(f"No hay CSV de asignaciones en {os.path.basename(ruta.rstrip('/'))}")
+    return previas
+
+
+def _huella_alumno(departamento, tutores):
+    """Datos de un alumno que deciden su tribunal: (departamento, tutores ordenados)."""
+    # Departamento vacío (None o NaN) como en el CSV exportado: cadena vacía
+    if departamento is None or departamento != departamento:
+        departamento = ""
+    return (str(departamento), tuple(sorted(tutores)))
+
+
+def leer_no_asignados(ruta):
+    """
+    Lee los alumnos que quedaron sin tribunal en una asignación exportada
+    (sin_asignar.csv del ZIP de resultados o de la carpeta).
+
+    Args:
+        ruta (str): ruta al ZIP o a la carpeta
+
+    Returns:
+        dict: trabajo → (departamento, tutores ordenados); vacío si la asignación
+              no incluye sin_asignar.csv (exportada por una versión anterior)
+    """
+    def leer(f):
+        return {
+            fila['alumno_id']: _huella_alumno(
+                fila['departamento_alumno'], [t.strip() for t in fila['tutores'].split(',') if t.strip()]
+            )
+            for fila in csv.DictReader(f, delimiter=';')
+        }
+
+    if os.path.isdir(ruta):
+        fichero = os.path.join(ruta, FICHERO_SIN_ASIGNAR)
+        if not os.path.exists(fichero):
+            return {}
+        with open(fichero, newline="", encoding="utf-8-sig") as f:
+            return leer(f)
+    with zipfile.ZipFile(ruta) as zipf:
+        if FICHERO_SIN_ASIGNAR not in zipf.namelist():
+            return {}
+        with zipf.open(FICHERO_SIN_ASIGNAR) as entrada:
+            with io.TextIOWrapper(entrada, encoding="utf-8-sig", newline="") as f:
+                return leer(f)
+
+
+# ============================================================================
+# REPARACIÓN
+# ============================================================================
+def _disponibles_por_turno(disponibilidades):
+    """
+    Profesores disponibles en cada franja y su carga (participación + tutorías).
+
+    Returns:
+        tuple: (turno → set[profesor], profesor → carga)
+    """
+    disponibles = {}
+    cargas = {}
+    for disp in disponibilidades.values():
+        for fila, profesor in enumerate(disp.correos):
+            cargas[profesor] = float(disp.participacion[fila] + disp.peso[fila])
+        for j, turno in enumerate(disp.turnos):
+            disponibles.setdefault(turno, set()).update(disp.correos[disp.matriz[:, j]])
+    return disponibles, cargas
+
+
+def _elegir_profesores(turno, num, excluidos, departamento, disponibles, ocupados, cargas,
+                       profesor_departamento):
+    """
+    Elige `num` profesores libres para un tribunal de la franja `turno`.
+
+    Se prefieren profesores de `departamento` y, entre ellos, los de menor carga.
+
+    Args:
+        excluidos (int): máscara de bits de los tutores que no pueden formar parte
+
+    Returns:
+        list or None: profesores elegidos, o None si no hay suficientes
+    """
+    candidatos = [p for p in disponibles.get(turno, ()) if p not in ocupados and not (excluidos >> p) & 1]
+    if len(candidatos) < num:
+        return None
+    candidatos.sort(key=lambda p: (profesor_departamento.get(p) != departamento, cargas.get(p, 0.0), p))
+    return candidatos[:num]
+
+
+def _departamento_principal(alumnos):
+    """Departamento más frecuente entre los alumnos de un tribunal (None si no hay)."""
+    conteo = Counter(datos.departamento for datos in alumnos.values())
+    return conteo.most_common(1)[0][0] if conteo else None
+
+
+def reparar_asignaciones(previas, estudiantes, catalogo, disponibilidades, profesor_departamento, config,
+                         no_asignados=None):
+    """
+    Repara una asignación anterior con los datos actuales tocando solo los
+    tribunales afectados (ver el docstring del módulo).
+
+    Args:
+        previas (dict): salida de leer_asignaciones
+        estudiantes (dict): alumno_id → Alumno con los TFGs actuales (ids internados)
+        catalogo (Catalogo): catálogo de ids de los datos actuales
+        disponibilidades (dict): departamento → DisponibilidadDepto de todos los
+                                 departamentos (también los que no tienen alumnos)
+        profesor_departamento (dict): profesor → departamento (ids)
+        config (ConfiguracionPipeline): miembros y plazas por tribunal
+        no_asignados (dict, optional): salida de leer_no_asignados; esos alumnos siguen
+                                       sin asignar si no han cambiado sus datos
+
+    Returns:
+        tuple: (turno → list[{'profesores': set, 'alumnos': dict}], resumen de cambios)
+               El resumen es un dict con alumnos_nuevos, alumnos_retirados,
+               alumnos_recolocados, alumnos_sin_asignar, profesores_sustituidos,
+               tribunales_modificados, tribunales_disueltos y tribunales_nuevos.
+    """
+    disponibles, cargas = _disponibles_por_turno(disponibilidades)
+    por_trabajo = {str(catalogo.alumnos.valor(a)): a for a in estudiantes}
+    por_turno = {str(t): i for i, t in enumerate(catalogo.turnos.valores)}
+    resumen = dict.fromkeys((
+        'alumnos_nuevos', 'alumnos_retirados', 'alumnos_recolocados', 'alumnos_sin_asignar',
+        'profesores_sustituidos', 'tribunales_modificados', 'tribunales_disueltos', 'tribunales_nuevos',
+    ), 0)
+
+    # 1. Reconstruir la asignación anterior con los ids actuales
+    asignaciones = {}
+    originales = {}      # alumno → (turno, índice) en la asignación anterior
+    modificados = set()  # (turno, índice) de tribunales que cambian
+    pendientes = []      # alumnos a recolocar
+    bajas = {}           # (turno, índice) → profesores que ya no pueden estar
+    anteriores = set()   # (turno, índice) de los tribunales publicados
+    vistos = set()
+    for (turno_texto, num), tribunal in previas.items():
+        alumnos = []
+        for trabajo in tribunal['alumnos']:
+            alumno = por_trabajo.get(trabajo)
+            if alumno is None:
+                resumen['alumnos_retirados'] += 1
+            elif alumno not in vistos:
+                vistos.add(alumno)
+                alumnos.append(alumno)
+        turno = por_turno.get(turno_texto)
+        if turno is None:
+            # La franja ya no existe: el tribunal se disuelve entero
+            logger.info("Franja %s desaparecida: se disuelve su tribunal %d", turno_texto, num)
+            resumen['tribunales_disueltos'] += 1
+            pendientes.extend(alumnos)
+            originales.update((a, (None, num - 1)) for a in alumnos)
+            continue
+        lista = asignaciones.setdefault(turno, [])
+        while len(lista) < num:
+            lista.append({'profesores': set(), 'alumnos': {}})
+        profesores = [catalogo.profesores.buscar(correo) for correo in tribunal['profesores']]
+        validos = {p for p in profesores if p is not None and p in disponibles.get(turno, ())}
+        lista[num - 1] = {'profesores': validos, 'alumnos': {a: estudiantes[a] for a in alumnos}}
+        anteriores.add((turno, num - 1))
+        if len(validos) < len(profesores):
+            bajas[(turno, num - 1)] = len(profesores) - len(validos)
+        if len(validos) < len(profesores) or len(alumnos) < len(tribunal['alumnos']):
+            modificados.add((turno, num - 1))
+        for a in alumnos:
+            originales[a] = (turno, num - 1)
+    asignaciones = dict(sorted(asignaciones.items()))
+    ocupados = {p for lista in asignaciones.values() for trib in lista for p in trib['profesores']}
+
+    # 2-3. Conflictos con tutores y profesores que ya no están disponibles
+    for turno, lista in asignaciones.items():
+        for idx, trib in enumerate(lista):
+            conflictos = mascara_profesores(trib['profesores'])
+            for alumno, datos in list(trib['alumnos'].items()):
+                if datos.mascara & conflictos:
+                    del trib['alumnos'][alumno]
+                    pendientes.append(alumno)
+                    modificados.add((turno, idx))
+            faltan = bajas.get((turno, idx), 0)
+            if not faltan:
+                continue
+            if not trib['alumnos']:
+                # Vacío e incompleto: no se completa y sus profesores quedan libres
+                ocupados -= trib['profesores']
+                trib['profesores'] = set()
+                continue
+            tutores = 0
+            for datos in trib['alumnos'].values():
+                tutores |= datos.mascara
+            nuevos = _elegir_profesores(turno, faltan, tutores, _departamento_principal(trib['alumnos']),
+                                        disponibles, ocupados, cargas, profesor_departamento)
+            if nuevos is None:
+                logger.info("Turno %s [Trib %d]: sin sustitutos para %d profesor(es), se disuelve",
+                            catalogo.turnos.valor(turno), idx + 1, faltan)
+                pendientes.extend(trib['alumnos'])
+                ocupados -= trib['profesores']
+                trib['profesores'] = set()
+                trib['alumnos'] = {}
+            else:
+                trib['profesores'].update(nuevos)
+                ocupados.update(nuevos)
+                resumen['profesores_sustituidos'] += len(nuevos)
+
+    # Los que ya estaban sin asignar y no han cambiado siguen igual
+    no_asignados = no_asignados or {}
+    sin_cambios = 0
+    nuevos_alumnos = []
+    for a in estudiantes:
+        if a in vistos:
+            continue
+        datos = catalogo.traducir_alumno(estudiantes[a])
+        if no_asignados.get(str(estudiantes[a].trabajo)) == _huella_alumno(datos['departamento'], datos['tutores']):
+            sin_cambios += 1
+        else:
+            nuevos_alumnos.append(a)
+    resumen['alumnos_nuevos'] = len(nuevos_alumnos)
+    pendientes = list(dict.fromkeys(pendientes + nuevos_alumnos))
+    logger.info("Reparación: %d alumnos a colocar (%d nuevos), %d profesores sustituidos",
+                len(pendientes), len(nuevos_alumnos), resumen['profesores_sustituidos'])
+
+    # 4. Colocar pendientes en tribunales abiertos: directo y, si no cabe, por camino de aumento
+    plazas = [(turno, idx) for turno, lista in asignaciones.items()
+              for idx, trib in enumerate(lista) if trib['profesores']]
+    ocupantes = [list(asignaciones[turno][idx]['alumnos']) for turno, idx in plazas]
+    departamento_plaza = [
+        Counter(profesor_departamento.get(p) for p in asignaciones[turno][idx]['profesores']).most_common(1)[0][0]
+        for turno, idx in plazas
+    ]
+    implicados = [a for lista in ocupantes for a in lista] + pendientes
+    compatibilidad = matriz_compatibilidad([estudiantes[a] for a in implicados],
+                                           [asignaciones[turno][idx]['profesores'] for turno, idx in plazas])
+    compatibles = {a: compatibilidad[i].nonzero()[0].tolist() for i, a in enumerate(implicados)}
+
+    sin_tribunal = []
+    for alumno in pendientes:
+        departamento = estudiantes[alumno].departamento
+        con_plaza = [k for k in compatibles[alumno] if len(ocupantes[k]) < config.max_alumnos]
+        if con_plaza:
+            k = min(con_plaza, key=lambda k: (departamento_plaza[k] != departamento,
+                                              len(ocupantes[k]) >= config.min_alumnos,
+                                              len(ocupantes[k]), k))
+            ocupantes[k].append(alumno)
+        elif not buscar_camino_aumento(alumno, compatibles, ocupantes, config.max_alumnos):
+            sin_tribunal.append(alumno)
+
+    for (turno, idx), alumnos in zip(plazas, ocupantes):
+        trib = asignaciones[turno][idx]
+        if set(trib['alumnos']) != set(alumnos):
+            modificados.add((turno, idx))
+        trib['alumnos'] = {a: estudiantes[a] for a in alumnos}
+        if not alumnos:
+            # Se ha quedado sin alumnos: no se publica y sus profesores quedan libres
+            ocupados -= trib['profesores']
+            trib['profesores'] = set()
+    resumen['tribunales_disueltos'] += sum(1 for turno, idx in anteriores
+                                           if not asignaciones[turno][idx]['alumnos'])
+
+    # 5. Tribunales nuevos con profesores libres para los que siguen sin sitio
+    restantes = list(sin_tribunal)
+    while restantes:
+        alumno = restantes.pop(0)
+        datos = estudiantes[alumno]
+        mejor = None
+        for turno in sorted(disponibles):
+            elegidos = _elegir_profesores(turno, config.miembros_tribunal, datos.mascara, datos.departamento,
+                                          disponibles, ocupados, cargas, profesor_departamento)
+            if elegidos is None:
+                continue
+            clave = (sum(profesor_departamento.get(p) != datos.departamento for p in elegidos),
+                     len(asignaciones.get(turno, ())), turno)
+            if mejor is None or clave < mejor[0]:
+                mejor = (clave, turno, elegidos)
+        if mejor is None:
+            resumen['alumnos_sin_asignar'] += 1
+            continue
+        _, turno, elegidos = mejor
+        conflictos = mascara_profesores(elegidos)
+        alumnos = {alumno: datos}
+        for otro in sorted(restantes, key=lambda a: estudiantes[a].departamento != datos.departamento):
+            if len(alumnos) == config.max_alumnos:
+                break
+            if not estudiantes[otro].mascara & conflictos:
+                alumnos[otro] = estudiantes[otro]
+                restantes.remove(otro)
+        lista = asignaciones.setdefault(turno, [])
+        lista.append({'profesores': set(elegidos), 'alumnos': alumnos})
+        ocupados.update(elegidos)
+        modificados.add((turno, len(lista) - 1))
+        resumen['tribunales_nuevos'] += 1
+    asignaciones = dict(sorted(asignaciones.items()))
+
+    colocados = {a: (turno, idx) for turno, lista in asignaciones.items()
+                 for idx, trib in enumerate(lista) for a in trib['alumnos']}
+    resumen['alumnos_recolocados'] = sum(1 for a, lugar in originales.items()
+                                         if a in colocados and colocados[a] != lugar)
+    resumen['tribunales_modificados'] = len(modificados)
+    resumen['alumnos_sin_asignar'] += sin_cambios
+    if resumen['alumnos_sin_asignar']:
+        logger.warning("Alumnos sin asignar tras la reparación: %d", resumen['alumnos_sin_asignar'])
+    return asignaciones, resumen
@@ -0,0 +1,26 @@
+import os
+import sys
+from collections import OrderedDict
+
+import pytest
+
+# Los módulos del backend se importan como en main.py (desde la carpeta back/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_io  # noqa: E402
+from generar_datos import generar_datos  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def sin_cache_parseo(monkeypatch):
+    """Cada test parsea sus Excel: nada de la caché en memoria ni en disco."""
+    monkeypatch.setattr(data_io, "CACHE_PARSEO_DIR", "")
+    monkeypatch.setattr(data_io, "_cache_parseo", OrderedDict())
+
+
+@pytest.fixture
+def datos_sinteticos(tmp_path):
+    """Excel de entrada pequeños (4 departamentos, 60 TFGs) en una carpeta temporal."""
+    directorio = str(tmp_path / "entrada") + "/"
+    generar_datos(directorio, num_departamentos=4, profesores_por_dpto=30, num_tfgs=60)
+    return directorio
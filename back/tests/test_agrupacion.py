@@ -0,0 +1,49 @@
+import openpyxl
+import pytest
+
+from agrupacion import agrupar_tfgs_por_departamentos
+from data_io import load_disponibilidad
+from main import FILENAME, FILENAME_DISPONIBILIDAD
+from mapping import extraer_correos
+
+
+@pytest.mark.parametrize("campo, correos", [
+    ("azamora@fi.upm.es(ALFONSO ZAMORA)", ["azamora@fi.upm.es"]),
+    ("brios@fi.upm.es(B. RÍOS)-f.perozo@repsol.com(F. PÉREZ-OZO)", ["brios@fi.upm.es", "f.perozo@repsol.com"]),
+    ("jose-luis.garcia@upm.es(JOSÉ-LUIS GARCÍA)", ["jose-luis.garcia@upm.es"]),
+    ("a-b@upm.es(A B)-c-d@empresa.com(C D)", ["a-b@upm.es", "c-d@empresa.com"]),
+    ("a@upm.es (A) - b@upm.es (B)", ["a@upm.es", "b@upm.es"]),
+    ("a@upm.es-b@upm.es", ["a@upm.es", "b@upm.es"]),
+    ("a@upm.es; b@upm.es", ["a@upm.es", "b@upm.es"]),
+    (float("nan"), []),
+])
+def test_extraer_correos(campo, correos):
+    assert extraer_correos(campo) == correos
+
+
+def _renombrar(ruta, antiguo, nuevo):
+    """Sustituye un correo en todas las celdas de texto de un libro."""
+    libro = openpyxl.load_workbook(ruta)
+    for hoja in libro.worksheets:
+        for fila in hoja.iter_rows():
+            for celda in fila:
+                if isinstance(celda.value, str) and antiguo in celda.value:
+                    celda.value = celda.value.replace(antiguo, nuevo)
+    libro.save(ruta)
+
+
+def test_tutor_con_guion_conserva_su_departamento(datos_sinteticos):
+    ruta_tfgs = datos_sinteticos + FILENAME
+    primer_tfg = next(openpyxl.load_workbook(ruta_tfgs).active.iter_rows(min_row=2, values_only=True))
+    tutor = extraer_correos(primer_tfg[6])[0]
+    con_guion = "jose-luis." + tutor
+    for nombre in (FILENAME_DISPONIBILIDAD, FILENAME):
+        _renombrar(datos_sinteticos + nombre, tutor, con_guion)
+    libro = load_disponibilidad(datos_sinteticos, FILENAME_DISPONIBILIDAD)
+    departamento = next(hoja for hoja in libro.sheet_names[:-1]
+                        if con_guion in set(libro.hoja(hoja).iloc[:, 1]))
+
+    grupos = agrupar_tfgs_por_departamentos(libro, datos_sinteticos, FILENAME)
+
+    trabajos = [tfg for tfg in grupos[departamento] if con_guion in tfg['Tutor-es']]
+    assert trabajos and trabajos[0]['Trabajo'] == primer_tfg[1]
@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import io
+import json
+import time
+
+import pytest
+from fastapi import UploadFile
+from starlette.formparsers import MultiPartParser
+
+import api
+from main import FILENAME, FILENAME_DISPONIBILIDAD
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient  # noqa: E402
+
+# Cuerpo multipart de dos "Excel" de 8 KB (con la firma de un .xlsx)
+FRONTERA = "limite"
+CONTENIDO = b"PK\x03\x04" + b"0" * (8 * 1024)
+
+
+def _cuerpo_multipart():
+    partes = []
+    for campo in ("disponibilidad", "tfgs"):
+        partes.append(
+            f"--{FRONTERA}\r\nContent-Disposition: form-data; name=\"{campo}\"; "
+            f"filename=\"{campo}.xlsx\"\r\nContent-Type: application/octet-stream\r\n\r\n".encode()
+            + CONTENIDO + b"\r\n"
+        )
+    return b"".join(partes) + f"--{FRONTERA}--\r\n".encode()
+
+
+@pytest.fixture
+def limite_pequeno(monkeypatch):
+    """Límite de 1 KB por fichero y registro de las llamadas al parser multipart."""
+    monkeypatch.setattr(api, "MAX_SUBIDA_BYTES", 1024)
+    monkeypatch.setattr(api, "TAM_BLOQUE_SUBIDA", 1024)
+    parseos = []
+    original = MultiPartParser.parse
+
+    async def parse(self):
+        parseos.append(self)
+        return await original(self)
+
+    monkeypatch.setattr(MultiPartParser, "parse", parse)
+    return parseos
+
+
+def test_content_length_excesivo_se_rechaza_sin_parsear(limite_pequeno):
+    cliente = TestClient(api.app)
+    r = cliente.post("/procesar", content=_cuerpo_multipart(),
+                     headers={"Content-Type": f"multipart/form-data; boundary={FRONTERA}"})
+
+    assert r.status_code == 413
+    assert limite_pequeno == []
+
+
+def test_cuerpo_sin_content_length_se_corta_al_superar_el_limite(limite_pequeno, monkeypatch):
+    cuerpo = _cuerpo_multipart()
+    guardadas = []
+    monkeypatch.setattr(api, "_guardar_subida", lambda *args: guardadas.append(args))
+
+    def trozos():
+        # Un generador se envía en chunked, sin Content-Length
+        for i in range(0, len(cuerpo), 512):
+            yield cuerpo[i:i + 512]
+
+    cliente = TestClient(api.app)
+    r = cliente.post("/procesar", content=trozos(),
+                     headers={"Content-Type": f"multipart/form-data; boundary={FRONTERA}"})
+
+    assert r.status_code == 413
+    assert "tamaño máximo" in r.json()["detail"]
+    # El formulario no llega a parsearse entero: el endpoint no se ejecuta
+    assert guardadas == []
+
+
+def test_otras_rutas_no_se_limitan(limite_pequeno):
+    cliente = TestClient(api.app)
+    assert cliente.get("/salud").status_code == 200
+
+
+def test_franjas_que_no_existen_en_la_disponibilidad_dan_422(datos_sinteticos, monkeypatch):
+    enviados = []
+    monkeypatch.setattr(api.gestor, "enviar", lambda *args: enviados.append(args))
+    ficheros = {
+        campo: open(datos_sinteticos + nombre, "rb")
+        for campo, nombre in (("disponibilidad", FILENAME_DISPONIBILIDAD), ("tfgs", FILENAME))
+    }
+
+    cliente = TestClient(api.app)
+    try:
+        r = cliente.post("/procesar", files=ficheros, data={"configuracion": json.dumps({"num_franjas": 10})})
+    finally:
+        for f in ficheros.values():
+            f.close()
+
+    assert r.status_code == 422
+    assert "num_franjas" in r.json()["detail"]
+    assert enviados == []
+
+
+def test_escritura_de_subidas_no_bloquea_el_bucle_de_eventos(tmp_path, monkeypatch):
+    original = api._escribir_bloque
+
+    def escritura_lenta(f, h, bloque):
+        time.sleep(0.2)   # disco lento
+        original(f, h, bloque)
+
+    monkeypatch.setattr(api, "_escribir_bloque", escritura_lenta)
+    destino = tmp_path / "disponibilidad.xlsx"
+    latidos = []
+
+    async def latir():
+        while True:
+            latidos.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def guardar():
+        latido = asyncio.ensure_future(latir())
+        try:
+            return await api._guardar_subida(UploadFile(io.BytesIO(CONTENIDO), filename="d.xlsx"), destino)
+        finally:
+            latido.cancel()
+
+    huella = asyncio.run(guardar())
+
+    # El bucle sigue atendiendo otras tareas mientras se escribe el bloque
+    assert len(latidos) >= 5
+    assert destino.read_bytes() == CONTENIDO
+    assert huella == hashlib.sha256(CONTENIDO).hexdigest()
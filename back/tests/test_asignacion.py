@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from asignacion import asignar_alumnos_a_tribunales
+from internado import Alumno
+
+
+def _instancia(rng):
+    """Tribunales y alumnos pequeños al azar (departamento 0, con intrusos del 1)."""
+    profesores = list(range(rng.randint(3, 10)))
+    tribunales = {}
+    for turno in range(rng.randint(1, 3)):
+        libres = rng.sample(profesores, len(profesores))
+        lista = []
+        for _ in range(rng.randint(0, 3)):
+            if rng.random() < 0.1:
+                lista.append(set())   # tribunal sin profesores: no admite alumnos
+            elif len(libres) >= 3:
+                lista.append({libres.pop(), libres.pop(), libres.pop()})
+        tribunales[turno] = lista
+    estudiantes = {}
+    for i in range(rng.randint(0, 16)):
+        # Algún cotutor externo que no está en ningún tribunal
+        tutores = tuple(rng.sample(profesores + [99], rng.randint(1, 2)))
+        departamento = 0 if rng.random() < 0.85 else 1
+        estudiantes[f"T{i}"] = Alumno(f"T{i}", f"Alumno {i}", tutores, departamento, "GII")
+    return tribunales, estudiantes
+
+
+def _maximo(tribunales, estudiantes, max_alumnos):
+    """Máximo de alumnos colocables: emparejamiento (Kuhn) alumno → plaza de tribunal."""
+    plazas = [profes for lista in tribunales.values() for profes in lista if profes
+              for _ in range(max_alumnos)]
+    alumnos = [a for a in estudiantes.values() if a.departamento == 0]
+    ocupada_por = [None] * len(plazas)
+
+    def colocar(i, vistas):
+        for p, profes in enumerate(plazas):
+            if p in vistas or set(alumnos[i].tutores) & profes:
+                continue
+            vistas.add(p)
+            if ocupada_por[p] is None or colocar(ocupada_por[p], vistas):
+                ocupada_por[p] = i
+                return True
+        return False
+
+    return sum(colocar(i, set()) for i in range(len(alumnos)))
+
+
+@pytest.mark.parametrize("semilla", range(300))
+def test_colocacion_maxima_sin_tutores_y_con_plazas(semilla):
+    rng = random.Random(semilla)
+    tribunales, estudiantes = _instancia(rng)
+    max_alumnos = rng.randint(1, 4)
+
+    asignacion = asignar_alumnos_a_tribunales(tribunales, estudiantes, 0, max_alumnos=max_alumnos)
+
+    colocados = []
+    for turno, lista in tribunales.items():
+        assert [t['profesores'] for t in asignacion[turno]] == lista
+        for tribunal in asignacion[turno]:
+            assert len(tribunal['alumnos']) <= max_alumnos
+            for trabajo, alumno in tribunal['alumnos'].items():
+                assert alumno is estudiantes[trabajo]
+                assert alumno.departamento == 0
+                assert not set(alumno.tutores) & tribunal['profesores']
+                colocados.append(trabajo)
+    assert len(colocados) == len(set(colocados))
+    assert len(colocados) == _maximo(tribunales, estudiantes, max_alumnos)
@@ -0,0 +1,76 @@
+import os
+import stat
+
+import pytest
+
+from cache import CacheResultados
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "getuid"), reason="permisos POSIX")
+
+
+def _zip(directorio, clave, permisos=0o600):
+    ruta = os.path.join(directorio, f"{clave}.zip")
+    with open(ruta, "wb") as f:
+        f.write(b"PK\x03\x04 resultado")
+    os.chmod(ruta, permisos)
+    return ruta
+
+
+def test_directorio_se_crea_privado(tmp_path):
+    directorio = str(tmp_path / "resultados")
+    CacheResultados(directorio)
+
+    assert stat.S_IMODE(os.stat(directorio).st_mode) == 0o700
+
+
+def test_directorio_escribible_por_otros_se_rechaza(tmp_path):
+    directorio = str(tmp_path / "resultados")
+    os.makedirs(directorio)
+    os.chmod(directorio, 0o777)
+
+    with pytest.raises(PermissionError):
+        CacheResultados(directorio)
+
+
+def test_enlace_a_otro_directorio_se_rechaza(tmp_path):
+    destino = tmp_path / "destino"
+    destino.mkdir(mode=0o700)
+    os.symlink(destino, tmp_path / "resultados")
+
+    with pytest.raises(PermissionError):
+        CacheResultados(str(tmp_path / "resultados"))
+
+
+def test_al_arrancar_solo_se_adoptan_zip_privados(tmp_path):
+    directorio = str(tmp_path / "resultados")
+    os.makedirs(directorio, mode=0o700)
+    _zip(directorio, "propio")
+    _zip(directorio, "plantado", permisos=0o666)
+    os.symlink(_zip(str(tmp_path), "fuera"), os.path.join(directorio, "enlace.zip"))
+
+    cache = CacheResultados(directorio)
+
+    assert cache.obtener("propio") is not None
+    assert cache.obtener("plantado") is None
+    assert cache.obtener("enlace") is None
+
+
+def test_zip_no_privado_no_se_registra_ni_se_sirve(tmp_path):
+    cache = CacheResultados(str(tmp_path / "resultados"))
+    ruta = _zip(cache.directorio, "clave")
+    cache.registrar("clave")
+    assert cache.obtener("clave") == ruta
+
+    os.chmod(ruta, 0o666)
+    assert cache.obtener("clave") is None
+    cache.registrar("clave")
+    assert cache.obtener("clave") is None
+
+
+@pytest.mark.skipif(hasattr(os, "getuid") and os.getuid() != 0, reason="chown requiere root")
+def test_zip_de_otro_usuario_no_se_adopta(tmp_path):
+    directorio = str(tmp_path / "resultados")
+    os.makedirs(directorio, mode=0o700)
+    os.chown(_zip(directorio, "ajeno"), 65534, 65534)
+
+    assert CacheResultados(directorio).obtener("ajeno") is None
@@ -0,0 +1,34 @@
+import pytest
+
+import configuracion
+from configuracion import ConfiguracionPipeline
+from main import run_pipeline
+
+
+def test_modo_exacto_sin_ortools_se_rechaza_al_validar(monkeypatch):
+    monkeypatch.setattr(configuracion, "ortools_disponible", lambda: False)
+
+    with pytest.raises(ValueError, match="requirements-exacto.txt"):
+        ConfiguracionPipeline(modo="exacto")
+    # El modo greedy no depende de OR-Tools
+    assert ConfiguracionPipeline().modo == "greedy"
+
+
+def test_run_pipeline_sin_ortools_falla_antes_de_leer(monkeypatch, tmp_path):
+    monkeypatch.setattr(configuracion, "ortools_disponible", lambda: False)
+
+    # La carpeta de entrada no existe: si leyera los Excel fallaría con otro error
+    with pytest.raises(ValueError, match="OR-Tools"):
+        run_pipeline(str(tmp_path / "no_existe") + "/", str(tmp_path / "salida") + "/", modo="exacto")
+
+
+def test_campos_desconocidos():
+    with pytest.raises(ValueError, match="desconocidos"):
+        ConfiguracionPipeline.desde_dict({'miembros': 3})
+
+
+@pytest.mark.parametrize("parametros", [{'num_franjas': 10}, {'init_franja': 8}])
+def test_franjas_fuera_de_la_hoja_se_rechazan(datos_sinteticos, tmp_path, parametros):
+    # Las hojas generadas tienen 6 franjas a partir de la columna 4
+    with pytest.raises(ValueError, match="franjas"):
+        run_pipeline(datos_sinteticos, str(tmp_path / "salida") + "/", **parametros)
@@ -0,0 +1,107 @@
+import os
+import pickle
+import stat
+from collections import OrderedDict
+
+import pytest
+
+import data_io
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "getuid"), reason="permisos POSIX")
+
+
+class _Plantado:
+    """Pickle que, al cargarse, deja constancia (como haría un pickle malicioso)."""
+    cargado = False
+
+    def __reduce__(self):
+        return (_marcar_cargado, ())
+
+
+def _marcar_cargado():
+    _Plantado.cargado = True
+    return "plantado"
+
+
+@pytest.fixture
+def excel(tmp_path):
+    ruta = tmp_path / "libro.xlsx"
+    ruta.write_bytes(b"PK\x03\x04 contenido")
+    return str(ruta)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directorio = str(tmp_path / "cache")
+    monkeypatch.setattr(data_io, "CACHE_PARSEO_DIR", directorio)
+    monkeypatch.setattr(data_io, "_cache_parseo", OrderedDict())
+    monkeypatch.setattr(data_io, "_directorios_rechazados", set())
+    _Plantado.cargado = False
+    return directorio
+
+
+def _plantar(directorio, excel, permisos=0o600):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"{data_io._clave_cache(excel, ('p',))}.pkl")
+    with open(ruta, "wb") as f:
+        pickle.dump(_Plantado(), f)
+    os.chmod(ruta, permisos)
+    return ruta
+
+
+def test_directorio_se_crea_privado_y_se_reutiliza(cache_dir, excel):
+    assert data_io.cargar_con_cache(excel, ('p',), lambda r: "parseado") == "parseado"
+    assert stat.S_IMODE(os.stat(cache_dir).st_mode) == 0o700
+
+    data_io._cache_parseo.clear()
+    assert data_io.cargar_con_cache(excel, ('p',), lambda r: "no debe parsear") == "parseado"
+
+
+def test_directorio_escribible_por_otros_no_se_usa(cache_dir, excel):
+    _plantar(cache_dir, excel)
+    os.chmod(cache_dir, 0o777)
+
+    assert data_io.cargar_con_cache(excel, ('p',), lambda r: "parseado") == "parseado"
+    assert not _Plantado.cargado
+
+
+def test_pickle_escribible_por_otros_se_ignora(cache_dir, excel):
+    os.makedirs(cache_dir, mode=0o700)
+    _plantar(cache_dir, excel, permisos=0o666)
+
+    assert data_io.cargar_con_cache(excel, ('p',), lambda r: "parseado") == "parseado"
+    assert not _Plantado.cargado
+
+
+@pytest.mark.skipif(hasattr(os, "getuid") and os.getuid() != 0, reason="chown requiere root")
+def test_directorio_de_otro_usuario_no_se_usa(cache_dir, excel):
+    _plantar(cache_dir, excel)
+    os.chmod(cache_dir, 0o700)
+    os.chown(cache_dir, 65534, 65534)
+
+    assert data_io.cargar_con_cache(excel, ('p',), lambda r: "parseado") == "parseado"
+    assert not _Plantado.cargado
+
+
+def test_cache_en_disco_expulsa_los_menos_usados(cache_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_io, "CACHE_PARSEO_MAX_MB", 1)
+    libros = []
+    for i in range(3):
+        ruta = tmp_path / f"libro{i}.xlsx"
+        ruta.write_bytes(b"PK\x03\x04 libro %d" % i)
+        libros.append(str(ruta))
+
+    def parsear(ruta):
+        return b"x" * (400 * 1024)   # tres pickles de 400 KB no caben en 1 MB
+
+    data_io.cargar_con_cache(libros[0], ('p',), parsear)
+    data_io.cargar_con_cache(libros[1], ('p',), parsear)
+    # Acierto en disco del primero: pasa a ser el más reciente
+    data_io._cache_parseo.clear()
+    pickle_0 = os.path.join(cache_dir, f"{data_io._clave_cache(libros[0], ('p',))}.pkl")
+    os.utime(pickle_0, (0, 0))
+    data_io.cargar_con_cache(libros[0], ('p',), lambda r: "no debe parsear")
+    data_io.cargar_con_cache(libros[2], ('p',), parsear)
+
+    pickles = {nombre for nombre in os.listdir(cache_dir) if nombre.endswith(".pkl")}
+    assert pickles == {f"{data_io._clave_cache(libros[i], ('p',))}.pkl" for i in (0, 2)}
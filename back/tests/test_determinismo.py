@@ -0,0 +1,54 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from main import run_pipeline
+
+
+def _salida(directorio):
+    """Contenido de los CSV y del JSONL exportados (estadísticas y Parquet aparte)."""
+    return {
+        nombre: open(os.path.join(directorio, nombre), "rb").read()
+        for nombre in sorted(os.listdir(directorio))
+        if nombre.endswith((".csv", ".jsonl"))
+    }
+
+
+@pytest.mark.parametrize("num_semillas", [1, 3])
+def test_resultado_no_depende_de_num_procesos(datos_sinteticos, tmp_path, num_semillas):
+    # Con num_semillas > 1 los procesos se reparten las semillas del multiarranque
+    serie = str(tmp_path / "serie") + "/"
+    paralelo = str(tmp_path / "paralelo") + "/"
+
+    run_pipeline(datos_sinteticos, serie, seed=7, num_procesos=1, num_semillas=num_semillas)
+    run_pipeline(datos_sinteticos, paralelo, seed=7, num_procesos=2, num_semillas=num_semillas)
+
+    assert any(nombre.startswith("asignaciones_") for nombre in _salida(serie))
+    assert _salida(paralelo) == _salida(serie)
+
+
+def test_ejecuciones_en_hilos_igual_que_en_serie(datos_sinteticos, tmp_path):
+    semillas = [7, 8, 7, 8, 9, 9]
+    esperado = {}
+    for semilla in set(semillas):
+        directorio = str(tmp_path / f"serie_{semilla}") + "/"
+        run_pipeline(datos_sinteticos, directorio, seed=semilla)
+        esperado[semilla] = _salida(directorio)
+    assert esperado[7] != esperado[8]
+
+    # Todas las ejecuciones arrancan a la vez para que se solapen de verdad
+    barrera = threading.Barrier(len(semillas))
+
+    def ejecutar(i):
+        directorio = str(tmp_path / f"hilo_{i}") + "/"
+        barrera.wait()
+        run_pipeline(datos_sinteticos, directorio, seed=semillas[i])
+        return _salida(directorio)
+
+    with ThreadPoolExecutor(len(semillas)) as executor:
+        salidas = list(executor.map(ejecutar, range(len(semillas))))
+
+    for semilla, salida in zip(semillas, salidas):
+        assert salida == esperado[semilla]
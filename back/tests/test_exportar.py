@@ -0,0 +1,62 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import FILENAME, run_pipeline
+
+
+def _vaciar_celdas(directorio):
+    """Deja vacías algunas celdas de Alumno y Grado (pandas las lee como NaN)."""
+    ruta = os.path.join(directorio, FILENAME)
+    tfgs = pd.read_excel(ruta).astype({'Alumno': object, 'Grado': object})
+    tfgs.loc[::5, 'Alumno'] = np.nan
+    tfgs.loc[::7, 'Grado'] = np.nan
+    tfgs.to_excel(ruta, index=False)
+
+
+def _rechazar_constante(constante):
+    # json.loads acepta NaN/Infinity por defecto; aquí deben hacer fallar el test
+    raise AssertionError(f"JSON no válido: {constante}")
+
+
+def _leer_jsonl(salida):
+    with open(os.path.join(salida, "resultados.jsonl"), encoding="utf-8") as f:
+        return [json.loads(linea, parse_constant=_rechazar_constante) for linea in f]
+
+
+def test_celdas_vacias_no_rompen_la_exportacion(datos_sinteticos, tmp_path):
+    _vaciar_celdas(datos_sinteticos)
+    salida = str(tmp_path / "salida") + "/"
+
+    stats = run_pipeline(datos_sinteticos, salida)
+
+    filas = _leer_jsonl(salida)
+    assert len(filas) == stats['total_alumnos_asignados'] > 0
+    assert any(fila['nombre'] is None for fila in filas)
+    assert all(isinstance(fila['grado'], str) for fila in filas)
+    assert os.path.exists(os.path.join(salida, "asignaciones_Desconocido.csv"))
+    assert not os.path.exists(os.path.join(salida, "asignaciones_nan.csv"))
+
+
+def test_celdas_vacias_en_parquet(datos_sinteticos, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _vaciar_celdas(datos_sinteticos)
+    salida = str(tmp_path / "salida") + "/"
+
+    run_pipeline(datos_sinteticos, salida)
+
+    assert pq.read_table(os.path.join(salida, "resultados.parquet")).to_pylist() == _leer_jsonl(salida)
+
+
+def test_franja_en_columnas(datos_sinteticos, tmp_path):
+    salida = str(tmp_path / "salida") + "/"
+    run_pipeline(datos_sinteticos, salida)
+
+    fila = _leer_jsonl(salida)[0]
+    assert 'turno' not in fila
+    assert fila['dia'] in ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes")
+    assert fila['hora'].endswith(":00")
+    assert fila['aula'].startswith("Aula")
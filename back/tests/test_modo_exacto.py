@@ -0,0 +1,38 @@
+import pytest
+
+import main
+from main import run_pipeline
+
+pytest.importorskip("ortools")
+
+
+def test_limite_de_tiempo_insuficiente_no_empeora_el_greedy(datos_sinteticos, tmp_path):
+    greedy = run_pipeline(datos_sinteticos, str(tmp_path / "greedy") + "/")
+    exacto = run_pipeline(datos_sinteticos, str(tmp_path / "exacto") + "/",
+                          modo="exacto", limite_tiempo=0.01)
+
+    assert exacto['total_alumnos_asignados'] >= greedy['total_alumnos_asignados'] > 0
+    assert exacto['puntuacion'] <= greedy['puntuacion']
+
+
+def test_solucion_factible_trivial_se_descarta(datos_sinteticos, tmp_path, monkeypatch):
+    # FEASIBLE con todos los tribunales cerrados: lo que devuelve CP-SAT sin tiempo para mejorar
+    monkeypatch.setattr(main, "resolver_tribunales_exacto", lambda *args, **kwargs: {})
+    greedy = run_pipeline(datos_sinteticos, str(tmp_path / "greedy") + "/")
+    exacto = run_pipeline(datos_sinteticos, str(tmp_path / "exacto") + "/", modo="exacto")
+
+    assert exacto['total_alumnos_asignados'] == greedy['total_alumnos_asignados'] > 0
+    assert exacto['puntuacion'] == greedy['puntuacion']
+
+
+def test_pista_greedy_se_pasa_al_solver(datos_sinteticos, tmp_path, monkeypatch):
+    recibido = {}
+
+    def resolver(*args, pista=None, **kwargs):
+        recibido['pista'] = pista
+        return None
+
+    monkeypatch.setattr(main, "resolver_tribunales_exacto", resolver)
+    run_pipeline(datos_sinteticos, str(tmp_path / "exacto") + "/", modo="exacto")
+
+    assert recibido['pista']
@@ -0,0 +1,108 @@
+import random
+import threading
+from collections import deque
+
+import pytest
+
+from asignacion import asignar_alumnos_a_tribunales
+from internado import Alumno
+from optimizacion import _verificar_consistencia, rebalancear_tribunales
+
+# Profesor 9: tutor que no forma parte de ningún tribunal
+LIBRE = 9
+
+
+def _alumnos(prefijo, n, tutor=LIBRE):
+    return {f"{prefijo}{i}": Alumno(f"{prefijo}{i}", None, (tutor,), 0, "GII") for i in range(n)}
+
+
+def _tribunal(profesores, alumnos):
+    return {'profesores': set(profesores), 'alumnos': dict(alumnos)}
+
+
+def _rebalancear(asignaciones, estudiantes, **kwargs):
+    return rebalancear_tribunales(asignaciones, estudiantes, {}, {}, min_alumnos=4, max_alumnos=6,
+                                  rng=random.Random(0), **kwargs)
+
+
+def _colocados(asignaciones):
+    return [a for lista in asignaciones.values() for t in lista for a in t['alumnos']]
+
+
+def test_alumnos_que_no_caben_no_bloquean_el_rebalanceo():
+    # Entrada que antes dejaba el bucle posterior a la fase C dando vueltas sin fin:
+    # tras la fase C quedan en el pool alumnos que chocan con el último tribunal de la fase B
+    llenos = _alumnos("F", 6)
+    pequeno = _alumnos("S", 1)
+    chocan = _alumnos("U", 2, tutor=3)   # tutor en el tribunal pequeño
+    asignaciones = {'t1': [_tribunal({0, 1, 2}, llenos), _tribunal({3, 4, 5}, pequeno)]}
+    resultado = {}
+
+    hilo = threading.Thread(
+        target=lambda: resultado.update(_rebalancear(asignaciones, {**llenos, **pequeno, **chocan})),
+        daemon=True
+    )
+    hilo.start()
+    hilo.join(timeout=10)
+
+    assert not hilo.is_alive(), "rebalancear_tribunales no termina"
+    grande, pequeno_final = resultado['t1']
+    assert set(chocan) <= set(grande['alumnos'])
+    assert not set(chocan) & set(pequeno_final['alumnos'])
+    assert sorted(_colocados(resultado)) == sorted({**llenos, **pequeno, **chocan})
+
+
+def test_donantes_de_la_fase_c_no_bajan_del_minimo():
+    cinco, seis = _alumnos("A", 5), _alumnos("B", 6)
+    # Su tutor está en los dos tribunales grandes: solo puede ir al pequeño
+    pequeno = _alumnos("S", 1, tutor=0)
+    asignaciones = {
+        't1': [_tribunal({0, 1, 2}, cinco), _tribunal({3, 4, 5}, pequeno)],
+        't2': [_tribunal({0, 6, 7}, seis)],
+    }
+
+    resultado = _rebalancear(asignaciones, {**cinco, **seis, **pequeno})
+
+    tamanos = [len(t['alumnos']) for lista in resultado.values() for t in lista]
+    assert tamanos == [4, 4, 4]
+
+
+def test_verificar_consistencia_detecta_perdidos_y_duplicados():
+    alumnos = _alumnos("A", 3)
+    asignaciones = {'t1': [_tribunal({0}, {"A0": alumnos["A0"]}), _tribunal({1}, {"A0": alumnos["A0"]})]}
+    pool = deque([{'id': "A1"}])
+
+    with pytest.raises(RuntimeError, match="duplicados=\\['A0'\\]"):
+        _verificar_consistencia(asignaciones, pool, {"A0", "A1"})
+    with pytest.raises(RuntimeError, match="perdidos=\\['A2'\\]"):
+        _verificar_consistencia({'t1': asignaciones['t1'][:1]}, pool, {"A0", "A1", "A2"})
+
+
+@pytest.mark.parametrize("semilla", range(100))
+def test_ningun_alumno_se_pierde_ni_se_duplica(semilla):
+    rng = random.Random(semilla)
+    profesores = list(range(12))
+    estudiantes = {}
+    for i in range(rng.randint(5, 40)):
+        tutores = tuple(rng.sample(profesores, rng.randint(1, 2)))
+        estudiantes[i] = Alumno(f"T{i}", None, tutores, rng.randint(0, 1), "GII")
+    asignaciones = {}
+    for turno in range(rng.randint(1, 4)):
+        libres = rng.sample(profesores, len(profesores))
+        tribunales = {turno: [{libres.pop(), libres.pop(), libres.pop()} for _ in range(rng.randint(1, 3))]}
+        # Cada turno es de un departamento; los alumnos que ya tienen tribunal no se repiten
+        colocados = set(_colocados(asignaciones))
+        pendientes = {k: v for k, v in estudiantes.items() if k not in colocados}
+        asignaciones.update(asignar_alumnos_a_tribunales(tribunales, pendientes, turno % 2, max_alumnos=6))
+
+    resultado = rebalancear_tribunales(asignaciones, estudiantes, {}, {}, min_alumnos=4, max_alumnos=6,
+                                       rng=random.Random(semilla))
+
+    colocados = _colocados(resultado)
+    assert len(colocados) == len(set(colocados))
+    assert set(colocados) <= set(estudiantes)
+    for lista in resultado.values():
+        for tribunal in lista:
+            assert len(tribunal['alumnos']) <= 6
+            for alumno in tribunal['alumnos'].values():
+                assert not set(alumno.tutores) & tribunal['profesores']
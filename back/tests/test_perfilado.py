@@ -0,0 +1,41 @@
+import sys
+import threading
+import tracemalloc
+
+import pytest
+
+from main import run_pipeline
+from perfilado import PerfilEjecucion
+
+
+def test_ejecucion_fallida_detiene_el_perfil(tmp_path):
+    # La carpeta de entrada no existe: falla al leer los Excel, con el perfil ya activo
+    with pytest.raises(FileNotFoundError):
+        run_pipeline(str(tmp_path / "no_existe") + "/", str(tmp_path / "salida") + "/", perfilar=True)
+
+    assert not tracemalloc.is_tracing()
+    assert sys.getprofile() is None
+    # Y se puede volver a perfilar en el mismo proceso
+    with PerfilEjecucion(perfilar=True):
+        pass
+
+
+def test_solo_una_ejecucion_perfilada_a_la_vez(datos_sinteticos, tmp_path):
+    errores = []
+
+    def en_otro_hilo():
+        try:
+            run_pipeline(datos_sinteticos, str(tmp_path / "salida") + "/", perfilar=True)
+        except RuntimeError as e:
+            errores.append(e)
+
+    with PerfilEjecucion(perfilar=True):
+        hilo = threading.Thread(target=en_otro_hilo)
+        hilo.start()
+        hilo.join()
+        # Sin perfilar no hay conflicto
+        assert run_pipeline(datos_sinteticos, str(tmp_path / "sin_perfil") + "/")['total_alumnos_asignados'] > 0
+
+    assert len(errores) == 1 and "perfilar" in str(errores[0])
+    stats = run_pipeline(datos_sinteticos, str(tmp_path / "salida") + "/", perfilar=True)
+    assert 'funciones' in stats['rendimiento']
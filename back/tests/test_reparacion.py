@@ -0,0 +1,47 @@
+import csv
+import io
+import os
+import zipfile
+
+import pandas as pd
+
+from main import FILENAME, run_pipeline, run_reparacion
+
+
+def _csv(ruta_zip):
+    with zipfile.ZipFile(ruta_zip) as zipf:
+        return {n: zipf.read(n) for n in zipf.namelist() if n.endswith(".csv")}
+
+
+def test_sin_cambios_reproduce_la_asignacion_con_alumnos_sin_asignar(datos_sinteticos, tmp_path):
+    publicada = str(tmp_path / "publicada.zip")
+    stats = run_pipeline(datos_sinteticos, None, zip_salida=publicada)
+    # El escenario solo prueba algo si la planificación deja alumnos fuera
+    assert stats['alumnos_sin_asignar'] > 0
+
+    reparada = str(tmp_path / "reparada.zip")
+    resumen = run_reparacion(datos_sinteticos, publicada, None, zip_salida=reparada)['reparacion']
+
+    assert _csv(reparada) == _csv(publicada)
+    assert resumen['alumnos_nuevos'] == 0
+    assert resumen['alumnos_sin_asignar'] == stats['alumnos_sin_asignar']
+
+
+def test_alumno_sin_asignar_con_tutor_cambiado_se_vuelve_a_colocar(datos_sinteticos, tmp_path):
+    publicada = str(tmp_path / "publicada.zip")
+    run_pipeline(datos_sinteticos, None, zip_salida=publicada)
+    with zipfile.ZipFile(publicada) as zipf:
+        texto = zipf.read("sin_asignar.csv").decode("utf-8-sig")
+    trabajo = next(csv.DictReader(io.StringIO(texto), delimiter=';'))['alumno_id']
+
+    # Nuevo tutor: el de otro TFG del mismo fichero
+    ruta = os.path.join(datos_sinteticos, FILENAME)
+    tfgs = pd.read_excel(ruta)
+    fila = tfgs.index[tfgs['Trabajo'].astype(str) == trabajo][0]
+    tfgs.loc[fila, 'Tutor-es'] = tfgs.loc[(fila + 1) % len(tfgs), 'Tutor-es']
+    tfgs.to_excel(ruta, index=False)
+
+    resumen = run_reparacion(datos_sinteticos, publicada, None,
+                             zip_salida=str(tmp_path / "reparada.zip"))['reparacion']
+
+    assert resumen['alumnos_nuevos'] == 1
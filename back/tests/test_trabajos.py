@@ -0,0 +1,72 @@
+import json
+import zipfile
+from concurrent.futures import Future
+
+import pytest
+
+import api
+from cache import CacheResultados
+from trabajos import COMPLETADO, PENDIENTE, GestorTrabajos
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+def _gestor(tmp_path, ttl_trabajos):
+    return GestorTrabajos(CacheResultados(str(tmp_path / "cache")), ttl_trabajos=ttl_trabajos)
+
+
+def _resultado_en_cache(gestor, clave):
+    with zipfile.ZipFile(gestor.cache.ruta(clave), "w") as zipf:
+        zipf.writestr("estadisticas.json", json.dumps({'total_alumnos_asignados': 1}))
+    gestor.cache.registrar(clave)
+
+
+def _enviar(gestor, tmp_path, clave):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir(exist_ok=True)
+    return gestor.enviar(str(entrada), 42, clave)
+
+
+def test_trabajo_terminado_se_olvida_pasado_el_ttl(tmp_path):
+    gestor = _gestor(tmp_path, ttl_trabajos=0)
+    _resultado_en_cache(gestor, "clave")
+
+    job_id = _enviar(gestor, tmp_path, "clave")
+
+    assert gestor.estado(job_id) is None
+    assert gestor.ruta_resultado(job_id) is None
+    assert not gestor._trabajos and not gestor._terminados
+
+
+def test_trabajo_terminado_se_conserva_dentro_del_ttl(tmp_path):
+    gestor = _gestor(tmp_path, ttl_trabajos=3600)
+    _resultado_en_cache(gestor, "clave")
+
+    job_id = _enviar(gestor, tmp_path, "clave")
+
+    assert gestor.estado(job_id)['estado'] == COMPLETADO
+
+
+def test_trabajo_en_curso_no_se_olvida(tmp_path):
+    gestor = _gestor(tmp_path, ttl_trabajos=0)
+    futuro = Future()
+    gestor._en_curso["clave"] = futuro   # otro trabajo idéntico aún sin terminar
+
+    job_id = _enviar(gestor, tmp_path, "clave")
+    assert gestor.estado(job_id)['estado'] == PENDIENTE
+
+    futuro.set_result({})
+    assert gestor.estado(job_id) is None
+
+
+def test_api_responde_404_para_trabajos_olvidados(tmp_path, monkeypatch):
+    gestor = _gestor(tmp_path, ttl_trabajos=0)
+    _resultado_en_cache(gestor, "clave")
+    job_id = _enviar(gestor, tmp_path, "clave")
+    monkeypatch.setattr(api, "gestor", gestor)
+
+    cliente = TestClient(api.app)
+
+    assert cliente.get(f"/jobs/{job_id}").status_code == 404
+    assert cliente.get(f"/jobs/{job_id}/resultado").status_code == 404
@@ -0,0 +1,18 @@
+import logging
+
+from main import run_pipeline
+
+
+def test_avisos_de_escasez_usan_nombres_y_no_ids(datos_sinteticos, tmp_path, caplog):
+    # Tribunales de 12 profesores: no hay profesores suficientes en ningún departamento
+    with caplog.at_level(logging.WARNING, logger="tribunales"):
+        run_pipeline(datos_sinteticos, str(tmp_path / "salida") + "/", miembros_tribunal=12)
+
+    avisos = [r.getMessage() for r in caplog.records if r.name == "tribunales"]
+    assert avisos
+    for aviso in avisos:
+        assert aviso.startswith("DEP"), aviso
+    escasez = [aviso for aviso in avisos if "Esperado" in aviso]
+    assert escasez
+    # La franja aparece como en el encabezado de la hoja (día, hora y aula)
+    assert all("Aula" in aviso for aviso in escasez)
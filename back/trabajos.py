@@ -0,0 +1,210 @@
+"""
+Cola de trabajos para la API: cada petición a /procesar se ejecuta en un
+pool de procesos y su ZIP de resultados se guarda en la caché de resultados
+(cache.py), de modo que una petición idéntica no vuelve a ejecutar el pipeline.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from main import configurar_logging, run_pipeline, run_reparacion
+
+# Estados posibles de un trabajo
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+COMPLETADO = "completado"
+ERROR = "error"
+
+
+def _ejecutar_trabajo(input_dir, ruta_zip, seed, perfilar=False, config=None, asignacion_previa=None):
+    """
+    Ejecuta el pipeline en un proceso trabajador y deja el ZIP en `ruta_zip`.
+    Si se indica `asignacion_previa`, en lugar del pipeline completo se repara
+    esa asignación con los Excel de `input_dir` (main.run_reparacion).
+
+    Args:
+        input_dir (str): directorio con los Excel subidos (se borra al terminar)
+        ruta_zip (str): ruta final del ZIP de resultados
+        seed (int): semilla para reproducibilidad
+        perfilar (bool): incluir memoria por etapa y cProfile en las estadísticas
+        config (ConfiguracionPipeline, optional): parámetros del pipeline
+        asignacion_previa (str, optional): ZIP de resultados a reparar
+
+    Returns:
+        dict: estadísticas devueltas por run_pipeline o run_reparacion
+    """
+    # Se escribe a un temporal y se renombra para no servir nunca un ZIP a medias
+    ruta_tmp = ruta_zip + ".tmp"
+    try:
+        if asignacion_previa is not None:
+            stats = run_reparacion(input_dir + "/", asignacion_previa, None, config=config,
+                                   zip_salida=ruta_tmp, perfilar=perfilar)
+        else:
+            stats = run_pipeline(input_dir + "/", None, seed=seed, config=config,
+                                 zip_salida=ruta_tmp, perfilar=perfilar)
+        os.replace(ruta_tmp, ruta_zip)
+        return stats
+    finally:
+        if os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+        shutil.rmtree(input_dir, ignore_errors=True)
+
+
+def _leer_estadisticas(ruta_zip):
+    """Lee estadisticas.json de un ZIP de resultados ya generado."""
+    with zipfile.ZipFile(ruta_zip) as zipf:
+        return json.loads(zipf.read("estadisticas.json"))
+
+
+class GestorTrabajos:
+    """
+    Gestiona los trabajos de la API: los encola en un ProcessPoolExecutor,
+    guarda su estado en memoria y sus resultados en una CacheResultados.
+    Los trabajos terminados se olvidan pasados `ttl_trabajos` segundos.
+    """
+
+    def __init__(self, cache, max_workers=2, ttl_trabajos=3600):
+        """
+        Args:
+            cache (CacheResultados): caché donde se guardan los ZIP de resultados
+            max_workers (int): procesos que ejecutan trabajos a la vez
+            ttl_trabajos (float): segundos que se conserva el estado de un trabajo
+                                  terminado; después /jobs/{job_id} responde 404
+        """
+        self.cache = cache
+        self.max_workers = max_workers
+        self.ttl_trabajos = ttl_trabajos
+        self._executor = None
+        self._trabajos = {}
+        self._terminados = OrderedDict()   # job_id → instante en que terminó, en orden
+        self._en_curso = {}   # clave → futuro de un trabajo aún sin terminar
+        # RLock: add_done_callback llama a _terminado al momento si el futuro ya acabó
+        self._lock = threading.RLock()
+
+    def _get_executor(self):
+        # El pool se crea al llegar el primer trabajo (no al importar la API)
+        if self._executor is None:
+            # Los procesos configuran su logging igual que la API (TRIBUNALES_LOG)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 initializer=configurar_logging)
+        return self._executor
+
+    def nuevo_directorio_entrada(self):
+        """Crea un directorio temporal para los ficheros de un trabajo."""
+        return tempfile.mkdtemp(prefix="tribunales_entrada_")
+
+    def enviar(self, input_dir, seed, clave, perfilar=False, config=None, asignacion_previa=None):
+        """
+        Encola un trabajo, o lo resuelve al momento si su resultado ya está en
+        la caché o hay otro trabajo idéntico en curso.
+
+        Args:
+            input_dir (str): directorio con disponibilidad_TFG.xlsx y TFGs_presentados_enviar.xlsx
+            seed (int): semilla para reproducibilidad
+            clave (str): clave de caché (cache.clave_resultado) de esta ejecución
+            perfilar (bool): medir memoria por etapa y funciones (ver run_pipeline)
+            config (ConfiguracionPipeline, optional): parámetros del pipeline (deben
+                                                      formar parte de `clave`)
+            asignacion_previa (str, optional): ZIP dentro de input_dir a reparar en lugar
+                                               de ejecutar el pipeline completo
+
+        Returns:
+            str: identificador del trabajo
+        """
+        job_id = uuid.uuid4().hex
+        desde_cache = False
+        with self._lock:
+            self._purgar()
+            ruta_zip = self.cache.obtener(clave)
+            if ruta_zip is not None:
+                futuro = Future()
+                futuro.set_result(_leer_estadisticas(ruta_zip))
+                desde_cache = True
+            elif clave in self._en_curso:
+                futuro = self._en_curso[clave]
+            else:
+                futuro = self._get_executor().submit(
+                    _ejecutar_trabajo, input_dir, self.cache.ruta(clave), seed, perfilar, config,
+                    asignacion_previa
+                )
+                self._en_curso[clave] = futuro
+                futuro.add_done_callback(lambda f, clave=clave: self._terminado(clave, f))
+                input_dir = None
+            self._trabajos[job_id] = {'futuro': futuro, 'clave': clave, 'desde_cache': desde_cache}
+            futuro.add_done_callback(lambda f, job_id=job_id: self._marcar_terminado(job_id))
+        # Si no se ha encolado, el trabajador no borrará los ficheros subidos
+        if input_dir is not None:
+            shutil.rmtree(input_dir, ignore_errors=True)
+        return job_id
+
+    def _terminado(self, clave, futuro):
+        with self._lock:
+            self._en_curso.pop(clave, None)
+        if not futuro.cancelled() and futuro.exception() is None:
+            self.cache.registrar(clave)
+
+    def _marcar_terminado(self, job_id):
+        with self._lock:
+            self._terminados[job_id] = time.monotonic()
+
+    def _purgar(self):
+        # Se llama con el lock tomado; _terminados está ordenado por instante de fin
+        limite = time.monotonic() - self.ttl_trabajos
+        while self._terminados:
+            job_id, fin = next(iter(self._terminados.items()))
+            if fin > limite:
+                break
+            del self._terminados[job_id]
+            self._trabajos.pop(job_id, None)
+
+    def estado(self, job_id):
+        """
+        Devuelve el estado de un trabajo.
+
+        Returns:
+            dict or None: {'job_id', 'estado', 'estadisticas', 'error'} o None si no
+                          existe o ya se ha olvidado (ver ttl_trabajos)
+        """
+        with self._lock:
+            self._purgar()
+            trabajo = self._trabajos.get(job_id)
+        if trabajo is None:
+            return None
+        futuro = trabajo['futuro']
+        info = {'job_id': job_id, 'estado': PENDIENTE, 'estadisticas': None, 'error': None,
+                'desde_cache': trabajo['desde_cache']}
+        if futuro.cancelled():
+            info['estado'] = ERROR
+            info['error'] = "Trabajo cancelado"
+        elif futuro.done():
+            error = futuro.exception()
+            if error is not None:
+                info['estado'] = ERROR
+                info['error'] = str(error)
+            else:
+                info['estado'] = COMPLETADO
+                info['estadisticas'] = futuro.result()
+        elif futuro.running():
+            info['estado'] = EN_PROCESO
+        return info
+
+    def ruta_resultado(self, job_id):
+        """Ruta del ZIP de un trabajo (exista o no todavía)."""
+        with self._lock:
+            self._purgar()
+            trabajo = self._trabajos.get(job_id)
+        return self.cache.ruta(trabajo['clave']) if trabajo else None
+
+    def cerrar(self):
+        """Detiene el pool de procesos."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
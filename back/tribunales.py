@@ -1,5 +1,9 @@
-import random as rnd
+import logging
 import math
+import heapq
+import numpy as np
+
+logger = logging.getLogger(__name__)
 
 def distribuir_tribunales(num_tribunales_necesarios, num_franjas):
     """
@@ -18,23 +22,23 @@ def distribuir_tribunales(num_tribunales_necesarios, num_franjas):
     return dist
 
 
-def agrupar_profesores_en_tribunales(profesores_set):
+def agrupar_profesores_en_tribunales(profesores_set, miembros_tribunal=3):
     """
-    Agrupa profesores en tribunales de 3 miembros.
+    Agrupa profesores en tribunales de `miembros_tribunal` miembros.
     
     Args:
-        profesores_set (set): conjunto de profesores asignados a un turno
-        num_tribunales (int): número de tribunales esperados en este turno
+        profesores_set (list or set): profesores asignados a un turno (se respeta su orden)
+        miembros_tribunal (int): profesores por tribunal
     
     Returns:
-        list: lista de sets, cada uno con 3 profesores
+        list: lista de sets, cada uno con `miembros_tribunal` profesores
     """
     profesores_list = list(profesores_set)
     tribunales = []
 
-    for i in range(len(profesores_list) // 3):
-        inicio = i * 3
-        fin = min(inicio + 3, len(profesores_list))
+    for i in range(len(profesores_list) // miembros_tribunal):
+        inicio = i * miembros_tribunal
+        fin = min(inicio + miembros_tribunal, len(profesores_list))
         if inicio < len(profesores_list):
             tribunal = set(profesores_list[inicio:fin])
             tribunales.append(tribunal)
@@ -42,127 +46,118 @@ def agrupar_profesores_en_tribunales(profesores_set):
     return tribunales
 
 
-def crear_tribunales_depto(df_depto, init_franja, num_trib_por_franja):
+def crear_tribunales_depto(disp_depto, num_trib_por_franja, rng, miembros_tribunal=3):
     """
     Crea tribunales para un departamento específico.
-    Agrupa profesores de 3 en 3 por tribunal.
+    Agrupa profesores de `miembros_tribunal` en `miembros_tribunal` por tribunal.
     
     Args:
-        df_depto (pd.DataFrame): datos de disponibilidad del departamento
-        init_franja (int): columna donde comienzan las franjas
+        disp_depto (DisponibilidadDepto): matriz de disponibilidad del departamento
         num_trib_por_franja (list): número de tribunales por franja
+        rng (random.Random): generador aleatorio propio de la ejecución (no se usa
+                             el estado global del módulo random)
+        miembros_tribunal (int): profesores por tribunal
     
     Returns:
         dict: diccionario turno → list[set de profesores]
               Ejemplo: {"9:00": [{p1,p2,p3}, {p4,p5,p6}]}
     """
-    keys = df_depto.keys()
-    turnos = keys[init_franja:init_franja + len(num_trib_por_franja)]
-    
-    # Debug: mostrar turnos que se están considerando
-    # print(f"    Turnos a considerar: {list(turnos)}")
+    num_turnos = len(num_trib_por_franja)
+    turnos = disp_depto.turnos[:num_turnos]
+    # Los avisos usan los nombres de departamento y franja, no los ids internados
+    departamento = disp_depto.hoja
+    nombres_turnos = disp_depto.nombres_turnos[:num_turnos]
+    correos = disp_depto.correos
+    matriz = disp_depto.matriz[:, :num_turnos]
     
-    # Construir disponibilidad y participación
-    disponibilidad = {}
-    participacion = {}
-    peso_profesor = {}
-    for i in range(df_depto.shape[0]):
-        correo = df_depto[keys[1]][i]
-        participacion[correo] = df_depto[keys[2]][i]
-        valor_peso = df_depto[keys[3]][i] if len(keys) > 3 else 0
-        peso_profesor[correo] = valor_peso
-        disp = set()
-        for turno in turnos:
-            valor = df_depto[turno][i]
-            if valor == "Sí":
-                disp.add(turno)
-            # Debug para primer profesor
-            '''
-            if i == 0:
-                print(f"      df_depto[{turno}][{i}] = {repr(valor)}")
-            '''
-        disponibilidad[correo] = disp
+    # Peso de cada profesor: participación previa + peso dado en Excel
+    pesos = disp_depto.participacion + disp_depto.peso
+    num_disponibles = matriz.sum(axis=1)
+    # Profesores que aún no han sido asignados a ningún tribunal
+    activos = np.ones(len(correos), dtype=bool)
 
     # Calcular profesores necesarios por turno
-    num_prof = {turnos[i]: 3*num_trib_por_franja[i] for i in range(len(num_trib_por_franja))}
-    profesores_por_turno = {turno: set() for turno in turnos}
-
-    def compute_holgura():
-        """Calcula holgura (disponibles - necesarios) por turno"""
-        return {turno: sum(1 for p in disponibilidad if turno in disponibilidad[p]) - num_prof[turno]
-                for turno in num_prof}
-
-    holgura = compute_holgura()
-    if (min([holgura[turno] for turno in holgura])<0):
-        print("Atención: No hay suficientes profesores para cubrir los tribunales necesarios.")
-        print("  Detalles de holgura por turno:")
-        for turno in holgura:
-            disponibles = sum(1 for p in disponibilidad if turno in disponibilidad[p])
-            necesarios = num_prof[turno]
-            print(f"    {turno}: {disponibles} disponibles - {necesarios} necesarios = {holgura[turno]}")
-            # Listar profesores disponibles en este turno
-            profes_turno = [p for p in disponibilidad if turno in disponibilidad[p]]
-            print(f"      Profesores: {profes_turno[:5]}...")  # mostrar primeros 5
+    num_prof = {j: miembros_tribunal*num_trib_por_franja[j] for j in range(num_turnos)}
+    # Listas (no sets) para que la agrupación dependa solo del orden de selección
+    profesores_por_turno = {turno: [] for turno in turnos}
+
+    # Holgura (disponibles - necesarios) por turno. Se calcula una vez y luego
+    # se mantiene de forma incremental al retirar cada profesor.
+    disponibles = matriz.sum(axis=0)
+    holgura = {j: int(disponibles[j]) - num_prof[j] for j in num_prof}
+    if (min([holgura[j] for j in holgura])<0):
+        logger.warning("%s: No hay suficientes profesores para cubrir los tribunales necesarios.", departamento)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("  Detalles de holgura por turno:")
+            for j in holgura:
+                profes_turno = list(correos[matriz[:, j]])
+                necesarios = num_prof[j]
+                logger.debug("    %s: %d disponibles - %d necesarios = %d",
+                             nombres_turnos[j], len(profes_turno), necesarios, holgura[j])
+                # Listar profesores disponibles en este turno
+                logger.debug("      Profesores: %s...", profes_turno[:5])  # mostrar primeros 5
 
     prof_needed = sum(num_prof.values())
 
-    def peso_prof(correo):
-        #Calcula peso: participación previa + peso dado en Excel.
-        return participacion[correo] + peso_profesor.get(correo, 0)
+    # Cola de prioridad de candidatos por turno: (peso, disponibilidad, desempate, fila).
+    # El desempate aleatorio equivale a elegir al azar entre los empatados.
+    # Los profesores ya asignados se descartan de forma perezosa al llegar a la cabeza.
+    desempate = [rng.random() for _ in range(len(correos))]
+    colas = {}
+    for j in num_prof:
+        filas = np.flatnonzero(matriz[:, j])
+        cola = [(pesos[f], num_disponibles[f], desempate[f], f) for f in filas.tolist()]
+        heapq.heapify(cola)
+        colas[j] = cola
 
     # Algoritmo greedy de asignación de profesores
     # Priorizar turnos que aún necesitan profesores, asignando primero a los que más lo necesitan
     while prof_needed > 0 and num_prof:
         # Turnos con mayor déficit de profesores (menor holgura)
         menor = min(holgura.values())
-        turnos_criticos = [t for t in holgura if holgura[t] == menor]
-        turno_activo = rnd.choice(turnos_criticos)
-        # print(f"    Holgura actual: {menor}, turno {turno_activo}")
-
-        # Profesores disponibles en este turno
-        select_prof = [p for p in disponibilidad if turno_activo in disponibilidad[p]]
-        if not select_prof:
-            print(f"    [WARN] No hay profesores disponibles para el turno {turno_activo}. Saltando turno.")
+        turnos_criticos = [j for j in holgura if holgura[j] == menor]
+        j_activo = rng.choice(turnos_criticos)
+        turno_activo = turnos[j_activo]
+
+        # Candidato de menor peso (participación + carga de tutorías) y menor disponibilidad
+        cola = colas[j_activo]
+        while cola and not activos[cola[0][3]]:
+            heapq.heappop(cola)
+        if not cola:
+            logger.warning("%s: No hay profesores disponibles para el turno %s. Saltando turno.",
+                           departamento, nombres_turnos[j_activo])
             break
-        
-        # Filtrar por menor peso (participación + carga de tutorías)
-        min_peso = min(peso_prof(p) for p in select_prof)
-        select_prof = [p for p in select_prof if peso_prof(p) == min_peso]
-        
-        # Filtrar por menor disponibilidad
-        min_disp = min(len(disponibilidad[p]) for p in select_prof)
-        select_prof = [p for p in select_prof if len(disponibilidad[p]) == min_disp]
-
-        # Seleccionar profesor aleatorio
-        prof = rnd.choice(select_prof)
-        profesores_por_turno[turno_activo].add(prof)
-        num_prof[turno_activo] -= 1
+        fila = heapq.heappop(cola)[3]
+
+        profesores_por_turno[turno_activo].append(correos[fila])
+        activos[fila] = False
+
+        # Actualizar holgura: el profesor deja de estar disponible en sus turnos
+        # y el turno activo necesita un profesor menos
+        for j in np.flatnonzero(matriz[fila]).tolist():
+            if j in holgura:
+                holgura[j] -= 1
+        holgura[j_activo] += 1
+        num_prof[j_activo] -= 1
         
         # Limpiar turno si está completo
-        if num_prof[turno_activo] == 0:
-            del num_prof[turno_activo]
-            del holgura[turno_activo]
+        if num_prof[j_activo] == 0:
+            del num_prof[j_activo]
+            del holgura[j_activo]
+            del colas[j_activo]
         
-        # Quitar profesor de disponibles
-        del disponibilidad[prof]
-        participacion[prof] += 1
-
-        # Recalcular holgura
-        if num_prof:
-            holgura = compute_holgura()
         prof_needed -= 1
 
-    # Agrupar profesores en tribunales de 3
+    # Agrupar profesores en tribunales de `miembros_tribunal`
     tribunales_agrupados = {}
-    for i, turno in enumerate(turnos):
+    for j, turno in enumerate(turnos):
         profesores = profesores_por_turno[turno]
-        # print(profesores)
-        tribunales_agrupados[turno] = agrupar_profesores_en_tribunales(profesores)
-        # Debug: mostrar si se crearon menos tribunales de los esperados
-
-    tribunales_creados = len(tribunales_agrupados[turno])
-
-    if tribunales_creados < prof_needed // 3:
-        print(f"    [WARN] {turno}: Esperado {prof_needed // 3} tribunales, creado {tribunales_creados} (profesores disponibles: {len(profesores)})")
+        tribunales_agrupados[turno] = agrupar_profesores_en_tribunales(profesores, miembros_tribunal)
+        # Avisar si en la franja se han creado menos tribunales de los esperados
+        tribunales_creados = len(tribunales_agrupados[turno])
+        if tribunales_creados < num_trib_por_franja[j]:
+            logger.warning("%s, turno %s: Esperado %d tribunales, creado %d (profesores asignados: %d)",
+                           departamento, nombres_turnos[j], num_trib_por_franja[j], tribunales_creados,
+                           len(profesores))
     
     return tribunales_agrupados
\ No newline at end of file
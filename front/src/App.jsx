@@ -1,6 +1,9 @@
 import { useState } from 'react'
 import './App.css'
 
+const API_URL = 'http://localhost:8000'
+const INTERVALO_SONDEO_MS = 1000
+
 function App() {
   const [disponibilidad, setDisponibilidad] = useState(null)
   const [tfgs, setTfgs] = useState(null)
@@ -37,7 +40,8 @@ function App() {
     formData.append('seed', 42)
 
     try {
-      const response = await fetch('http://localhost:8000/procesar', {
+      // 1. Encolar el trabajo
+      const response = await fetch(`${API_URL}/procesar`, {
         method: 'POST',
         body: formData,
       })
@@ -47,8 +51,30 @@ function App() {
         throw new Error(errorData.detail || 'Error en el servidor')
       }
 
-      // Descargar ZIP
-      const blob = await response.blob()
+      const { job_id } = await response.json()
+
+      // 2. Consultar el estado hasta que termine
+      let estado
+      do {
+        await new Promise((resolve) => setTimeout(resolve, INTERVALO_SONDEO_MS))
+        const estadoResponse = await fetch(`${API_URL}/jobs/${job_id}`)
+        if (!estadoResponse.ok) {
+          throw new Error('No se pudo consultar el estado del trabajo')
+        }
+        estado = await estadoResponse.json()
+      } while (estado.estado === 'pendiente' || estado.estado === 'en_proceso')
+
+      if (estado.estado === 'error') {
+        throw new Error(estado.error || 'Error procesando')
+      }
+
+      // 3. Descargar ZIP
+      const resultado = await fetch(`${API_URL}/jobs/${job_id}/resultado`)
+      if (!resultado.ok) {
+        const errorData = await resultado.json()
+        throw new Error(errorData.detail || 'Error descargando resultados')
+      }
+      const blob = await resultado.blob()
       const url = window.URL.createObjectURL(blob)
       const a = document.createElement('a')
       a.href = url
@@ -58,14 +84,8 @@ function App() {
       window.URL.revokeObjectURL(url)
       document.body.removeChild(a)
 
-      // Mostrar estadísticas (aquí podríamos parsear el JSON del ZIP)
-      setStats({
-        total_tribunales: 'Descargado',
-        tribunales_optimos: 'Ver archivo',
-        tribunales_vacios: 'CSV adjunto',
-        total_alumnos_asignados: '✓',
-        promedio_alumnos_tribunal: 'Completado'
-      })
+      // Mostrar estadísticas devueltas por el trabajo
+      setStats(estado.estadisticas)
     } catch (err) {
       setError(`Error: ${err.message}`)
     } finally {